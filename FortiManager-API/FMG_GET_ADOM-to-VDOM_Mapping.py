@@ -3,9 +3,16 @@
 '''Project: FortiManager - With device name of FortiGate, return VDOM to ADOM mapping in FortiManager
    Details: Example functions that can be used to pull from a device name in FortiManager the device VDOM to ADOM mapping. Example - to upgrade ADOMs that have VDOMs from a FortiGate Device.
    Date: 2024
-   Functions: def fmg_login, fmg_logout, get_adom, get_vdom, list_filtered_adom_vdom
+   Functions: def get_adom, get_vdoms, mapping_rows, adom_vdom_mapping, topology_mapping, split_root_vdoms, list_filtered_adom_vdom, write_mapping
    Python Version: 3.10.11
    FortiManager Version: v7.0.8, should be compatible with 7.x branch.
+   Usage: Interactive, prompts for FortiManager, API User & Device Name (* for every device):
+                python FMG_GET_ADOM-to-VDOM_Mapping.py
+          Non interactive, password from FMG_PASSWD or prompted, mapping written to a .json or .csv file:
+                python FMG_GET_ADOM-to-VDOM_Mapping.py --host 1.1.1.1 --user apiuser --device FGT-01 --output mapping.json
+                python FMG_GET_ADOM-to-VDOM_Mapping.py --host 1.1.1.1 --user apiuser --device "*" --snapshot fmg_topology.db --output mapping.csv
+          Offline, the mapping as stored in the snapshot file at its last refresh, no FortiManager login:
+                python FMG_GET_ADOM-to-VDOM_Mapping.py --device "*" --snapshot fmg_topology.db --offline
    Instructions for Creating API User Account, Read Only api is the minimum requirement: 
         - Add an API user in your FortiManager
             -Log into FortiManager with admin account, Go To:
@@ -20,105 +27,28 @@
 '''
 
 ## Define Modules
-#For system calls like exit system, etc.
-import sys
 #To use getpass to hide passwd when user is inputting it
 import getpass
-#For making HTTPS Connections to the FortiManager API Server
-import requests
-import urllib3
-#To ignore the FortiManager Self Signed Certificate warnings.
-urllib3.disable_warnings(urllib3.exceptions.InsecureRequestWarning)
-#To receive and format JSON requests
+#For FMG_PASSWD
+import os
+#Command line options
+import argparse
+#Mapping output files
 import json
+import csv
+#Last refresh time of an offline snapshot
+import time
+#Shared FortiManager API client, pooled HTTPS connection & session handling
+from fmg_client import FMGClient
+#Fleet wide Device -> VDOM -> ADOM index from bulk API calls
+from fmg_topology import TopologyIndex, TopologySnapshot
 
 
 ## Functions
-def fmg_login(host_apiuser, host_passwd, host_ip):
-    '''FortiManager Login & Create Session
-    Arguments:
-    hostAPIUSER - API User Account Name
-    hostPASSWD - API User Passwd
-    hostIP - IP addres of FortiManager. Note, if not on default HTTPS(443) port can input: 1.1.1.1:8080
-    '''
-    #Global Save Session ID
-    global session
-    #Create HTTPS URL
-    global url
-    url = 'https://' + host_ip + '/jsonrpc'
-    #JSON Body to sent to API request
-    body = {
-    "id": 1,
-            "method": "exec",
-            "params": [{
-                    "url": "sys/login/user",
-                    "data": [{
-                            "user": host_apiuser,
-                            "passwd": host_passwd
-                    }]
-            }],
-            "session": 1
-    }
-    #Test HTTPS connection to host then Capture and output any errors
-    try:
-        r = requests.post(url, json=body, verify=False)
-    except requests.exceptions.RequestException as e: 
-        print (SystemError(e))
-        #Exit Program, Connection was not Successful
-        sys.exit(1)
-    #Save JSON response from FortiManager
-    json_resp = json.loads(r.text)
-    #Check if User & Passwd was valid, no code -11 means invalid
-    if json_resp['result'][0]['status']['code'] != -11:
-        session = json_resp['session']
-        print ('--> Logging into FortiManager: %s' % host_ip)
-        #HTTP & JSON code & message
-        print ('<-- HTTPcode: %d JSONmesg: %s \n' % (r.status_code, json_resp['result'][0]['status']['message']))
-        print
-    else:
-        print ('<--Username or password is not valid, please try again, exiting...')
-        #HTTP & JSON code & message
-        print ('<-- HTTPcode: %d JSONmesg: %s\n' % (r.status_code, json_resp['result'][0]['status']['message']))
-        print
-        #Exit Program, Username or Password is not valided or internal FortiManager error review Hcode & Jmesg
-        sys.exit(1)
-
-def fmg_logout(host_ip):
-    '''FortiManager logout
-    Arguments:
-    hostIP - IP addres of FortiManager. Note, if not on default HTTPS(443) port can input: 1.1.1.1:8080
-    '''
-    body = {
-       "id": 1,
-        "method": "exec",
-        "params": [{
-                "url": "sys/logout"
-        }],
-        "session": session
-    }
-    #Test HTTPS connection to host then Capture and output any errors
-    try:
-        r = requests.post(url, json=body, verify=False)
-    except requests.exceptions.RequestException as e:
-        print (SystemError(e))
-        #Exit Program, Connection was not Successful
-        sys.exit(1)
-    #Save JSON response from FortiManager    
-    json_resp = json.loads(r.text)
-    #Check if any API Errors returned
-    if json_resp['result'][0]['status']['code'] != -11:    
-        print ('\n--> Logging out of FMG: %s' % host_ip)
-        #HTTP & JSON code & message
-        print ('<-- HTTPcode: %d JSONmesg: %s \n' % (r.status_code, json_resp['result'][0]['status']['message']))
-    else:
-        print ('\n<--Error Occured, check Hcode & Jmesg')
-        #Exit Program, internal FortiManager error review Hcode & Jmesg
-        print ('<-- HTTPcode: %d JSONmesg: %s \n' % (r.status_code, json_resp['result'][0]['status']['message']))
-        sys.exit(1)   
-
-def get_adom(fgt_device_name):
+def get_adom(fmg, fgt_device_name):
     '''Get ADOMs
     Arguments:
+    fmg - Logged in FMGClient
     fgt_device_name - Device Name of the Fortigate(or cluster) listed in FortiManager under Device Manager
 
     Returns:
@@ -126,31 +56,23 @@ def get_adom(fgt_device_name):
     '''
     adom_list = []
     json_url = "dvmdb/adom"
-    body = {
-            "id": 1,
-            "method": "get",
-            "params": [{
-                    "expand member": [
-                        {
-                            "fields": [
-                                "name",
-                            ],
-                            "filter": [
-                                "name", "==", fgt_device_name
-                            ],
-                            "url": "/device"
-                        }
-                    ],
-                    "fields": [
-                        "name",
-                    ],
-                    "url": json_url
-            }],
-            "session": session,
-            #"verbose": 1
+    params = {
+        "expand member": [
+            {
+                "fields": [
+                    "name",
+                ],
+                "filter": [
+                    "name", "==", fgt_device_name
+                ],
+                "url": "/device"
+            }
+        ],
+        "fields": [
+            "name",
+        ],
     }
-    r = requests.post(url, json=body, verify=False)
-    json_resp = json.loads(r.text)
+    http_code, json_resp = fmg.get(json_url, **params)
     # print(json.dumps(json_resp, indent=2))
     for entry in json_resp['result'][0]['data']:
         #print(entry);
@@ -159,116 +81,203 @@ def get_adom(fgt_device_name):
             #print(entry)
     return adom_list
 
-def get_vdom(fgt_device_name, adom_name):
-    '''Get ADOMs
+def get_vdoms(fmg, fgt_device_name, adom_list):
+    '''Get the VDOMs of a device in many ADOMs, one dvmdb VDOM request per ADOM sent together in one multi-params request
     Arguments:
+    fmg - Logged in FMGClient
     fgt_device_name - Device Name of the Fortigate(or cluster) listed in FortiManager under Device Manager
-    adom_name - Pass the ADOM name
+    adom_list - ADOM names, ex: from get_adom
 
     Returns:
-    vdom_list - returns vdom(s) from the ADOM and FortiGate Device
+    vdom_lists - {adom: [vdom, ...]} in adom_list order, an ADOM not found for the device has an empty list
     '''
-    vdom_list = []
-    json_url = "dvmdb/adom/" + adom_name + "/device/" + fgt_device_name + "/vdom"
-    body = {
-        "id": 1,
-        "method": "get",
-        "params": [{
-            "url": json_url
-         }],
-        "session": session
-    }
-    r = requests.post(url, json=body, verify=False)
-    json_resp = json.loads(r.text)
-    json_mesg = json_resp['result'][0]['status']['message']
-    # print(json.dumps(json_resp, indent=2))
-    print ('<-- Hcode: %d Jmesg: %s' % (r.status_code, json_resp['result'][0]['status']['message']))
-    print ('-->Searching for VDOM...')
-    if json_resp['result'][0]['status']['code'] < 0:
-        print(f'-->ERROR: Invalid or not found ADOM: {adom_name} for device: {fgt_device_name}\n')
-    else:
-        for entry in json_resp['result'][0]['data']:
-            vdom_list.append(entry['name'])	
-    return vdom_list
+    with fmg.batch() as batch:
+        results = [(adom, batch.get("dvmdb/adom/" + adom + "/device/" + fgt_device_name + "/vdom")) for adom in adom_list]
+    vdom_lists = {}
+    for adom, result in results:
+        if result.code is None or result.code < 0:
+            print(f'-->ERROR: Invalid or not found ADOM: {adom} for device: {fgt_device_name}')
+            vdom_lists[adom] = []
+        else:
+            vdom_lists[adom] = [entry['name'] for entry in result.data or []]
+    return vdom_lists
+
+def mapping_rows(fgt_device_name, vdom_lists):
+    '''Structured VDOM to ADOM mapping rows of a device
+    Arguments:
+    fgt_device_name - Device Name of the Fortigate
+    vdom_lists - {adom: [vdom, ...]}, ex: from get_vdoms
+
+    Returns:
+    rows - List of {'device', 'vdom', 'adom', 'root_vdom'} sorted by device, ADOM & VDOM so every run gives the same order
+    '''
+    rows = []
+    for adom, vdom_list in vdom_lists.items():
+        for vdom in vdom_list:
+            rows.append({'device': fgt_device_name, 'vdom': vdom, 'adom': adom, 'root_vdom': vdom == 'root'})
+    return sorted(rows, key=lambda row: (row['device'], row['adom'], row['vdom']))
+
+def adom_vdom_mapping(fmg, fgt_device_name):
+    '''VDOM to ADOM mapping rows of one device, get_adom then the VDOMs of every ADOM in one multi-params request
+    Arguments:
+    fmg - Logged in FMGClient
+    fgt_device_name - Device Name of the Fortigate(or cluster) listed in FortiManager under Device Manager
 
-def list_filtered_adom_vdom(fgt_device_name):
+    Returns:
+    rows - See mapping_rows
+    '''
+    adom_list = get_adom(fmg, fgt_device_name)
+    return mapping_rows(fgt_device_name, get_vdoms(fmg, fgt_device_name, adom_list))
+
+def topology_mapping(topology, device_names=None):
+    '''VDOM to ADOM mapping rows of many devices from a fmg_topology TopologyIndex, no API call
+    Arguments:
+    topology - TopologyIndex, ex: TopologyIndex.fetch(fmg) or TopologySnapshot.index()
+    device_names - Devices to list, None lists every device
+
+    Returns:
+    rows - See mapping_rows
+    '''
+    rows = []
+    for device_name in device_names if device_names is not None else topology.devices:
+        vdom_lists = {}
+        for vdom, adom in topology.device_vdoms(device_name).items():
+            if adom is not None:
+                vdom_lists.setdefault(adom, []).append(vdom)
+        rows.extend(mapping_rows(device_name, vdom_lists))
+    return sorted(rows, key=lambda row: (row['device'], row['adom'], row['vdom']))
+
+def split_root_vdoms(rows):
+    '''Mapping rows in the list_filtered_adom_vdom format
+
+    Returns:
+    root_vdom2adom_list - list of root VDOMs with their associated ADOMs, ex: ['root:ADOM1']
+    vdom2adom_list - list of non-root VDOMs with their associated ADOMs, ex: ['vdom2:ADOM2']
+    '''
+    root_vdom2adom_list = [row['vdom'] + ":" + row['adom'] for row in rows if row['root_vdom']]
+    vdom2adom_list = [row['vdom'] + ":" + row['adom'] for row in rows if not row['root_vdom']]
+    return root_vdom2adom_list, vdom2adom_list
+
+def list_filtered_adom_vdom(fmg, fgt_device_name):
     '''Get ADOMs
     Arguments:
+    fmg - Logged in FMGClient
     fgt_device_name - Device Name of the Fortigate(or cluster) listed in FortiManager under Device Manager
 
     Function calls:
-    get_adom
-    get_vdom
+    adom_vdom_mapping
 
     Returns:
     root_vdom2adom_list - list of root VDOMs with their associated ADOMs
     vdom2adom_list - list of non-root VDOMs with their associated ADOMs
     '''
-    vdom2adom_list = []
-    root_vdom2adom_list = []
-    adom_list = get_adom(fgt_device_name)    
-    for adom  in adom_list:
-        vdom_list = get_vdom(fgt_device_name, adom)
-		##print(vdomLIST)
-        for vdom in vdom_list:
-            if vdom == 'root':
-                root_vdom2adom_list.append(vdom + ":" + adom)
-                print ('>>>>>>>>> Cluster Root VDOM to ADOM found: %s <<<<<<<' % adom )
-                print ('\n')
-				#print(rootvdom2adomLIST)    
-            else:
-                vdom2adom_list.append(vdom + ":" + adom)
-                print ('>>>>>>>>> Match found VDOM: %s to ADOM: %s <<<<<<<' % (vdom, adom) )
-                print ('\n')
-    return root_vdom2adom_list, vdom2adom_list
+    return split_root_vdoms(adom_vdom_mapping(fmg, fgt_device_name))
+
+def write_mapping(rows, file_name):
+    '''Write mapping rows to a .json file (list of objects), any other extension is written as CSV'''
+    with open(file_name, 'w', newline='') as mapping_file:
+        if file_name.lower().endswith('.json'):
+            json.dump(rows, mapping_file, indent=2)
+            return
+        writer = csv.writer(mapping_file)
+        writer.writerow(['Device', 'VDOM', 'ADOM', 'Root VDOM'])
+        for row in rows:
+            writer.writerow([row['device'], row['vdom'], row['adom'], row['root_vdom']])
 		
 def main():
     ''' The main function/program '''
+    ## Command line options, no options keeps the interactive prompts
+    parser = argparse.ArgumentParser(description='FortiManager FortiGate Device VDOM to ADOM mapping')
+    parser.add_argument('--host', help='FortiManager IP Address, ex: 1.1.1.1 or 1.1.1.1:8080')
+    parser.add_argument('--user', help='FortiManager API User name, password is read from FMG_PASSWD or prompted')
+    parser.add_argument('--device', help='FortiGate Device Name, or * for every device')
+    parser.add_argument('--output', help='Write the mapping to a .json or .csv file')
+    parser.add_argument('--snapshot', help='SQLite topology snapshot file (fmg_topology.py), refreshed incrementally then used for the mapping')
+    parser.add_argument('--offline', action='store_true', help='Read the mapping from the --snapshot file as stored, no FortiManager login')
+    args = parser.parse_args()
+    if args.offline and not args.snapshot:
+        parser.error('--offline needs --snapshot')
+
     ## User Input Section ##
-    # Prompt for IP Address of FortiManager
-    print('Please Enter FortiManager IP Address:')
-    host_ip = input()
-    #Check User put in data
-    while not host_ip:
-        print('Error, Please Enter FortiManager IP Address:')
-        host_ip = input()
+    # FortiManager & API User are not needed to read a stored snapshot
+    if not args.offline:
+        # Prompt for IP Address of FortiManager
+        host_ip = args.host
+        if not host_ip:
+            print('Please Enter FortiManager IP Address:')
+            host_ip = input()
+        #Check User put in data
+        while not host_ip:
+            print('Error, Please Enter FortiManager IP Address:')
+            host_ip = input()
     
-    # Prompt for API User Name
-    print('Please Enter FortiManager API User name:')
-    host_apiuser = input()
-    #Check User put in data
-    while not host_apiuser:
-        print('Error, Please Enter FortiManager API User name:')
-        host_apiuser = input()
+        # Prompt for API User Name
+        host_apiuser = args.user
+        if not host_apiuser:
+            print('Please Enter FortiManager API User name:')
+            host_apiuser = input()
+        #Check User put in data
+        while not host_apiuser:
+            print('Error, Please Enter FortiManager API User name:')
+            host_apiuser = input()
     
-    # Prompt for API User password. use getpass() module to hide it being displayed
-    host_passwd = getpass.getpass('Please Enter FortiManager API User password:')
-    #Check User put in data
-    while not host_passwd:
-        host_passwd = getpass.getpass('Error, Please Enter FortiManager API User password:')
+        # Prompt for API User password. use getpass() module to hide it being displayed
+        host_passwd = os.environ.get('FMG_PASSWD')
+        if not host_passwd:
+            host_passwd = getpass.getpass('Please Enter FortiManager API User password:')
+        #Check User put in data
+        while not host_passwd:
+            host_passwd = getpass.getpass('Error, Please Enter FortiManager API User password:')
     
     # Prompt for FortiGate Device Name
-    print('Please Enter the Device Name for the FortiGate listed in FortiManager:')
-    fgt_device_name = input()
+    fgt_device_name = args.device
+    if not fgt_device_name:
+        print('Please Enter the Device Name for the FortiGate listed in FortiManager, or * for every device:')
+        fgt_device_name = input()
     while not fgt_device_name:
         print('Error, Please Enter the Device name for the FortiGate:')
         fgt_device_name = input()
     ## End User Input Section ##
 
-    ## Call fmg_login Function
-    fmg_login(host_apiuser, host_passwd, host_ip)
+    if args.offline:
+        ## Stored topology snapshot as of its last refresh, no login & no API call
+        snapshot = TopologySnapshot(args.snapshot)
+        refreshed = snapshot.refreshed
+        print('--> Reading topology snapshot %s, refreshed %s' % (args.snapshot, time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(refreshed)) if refreshed else 'never'))
+        topology = snapshot.index()
+        snapshot.close()
+        rows = topology_mapping(topology, None if fgt_device_name == '*' else [fgt_device_name])
+    else:
+        ## Login to FortiManager
+        fmg = FMGClient(host_ip)
+        fmg.login(host_apiuser, host_passwd)
 
-    ## Get ADOM from FortiGate Device
-    adom_list = get_adom(fgt_device_name)
-    print(f'ADOM List for device {fgt_device_name}: {adom_list}\n')
-    
-    ## Get VDOM to ADOM
-    root_vdom2adom_list, vdom2adom_list = list_filtered_adom_vdom(fgt_device_name, )
-    print(f'root VDOM:ADOM LIST for device {fgt_device_name}: {root_vdom2adom_list}')
-    print(f'VDOM:ADOM LIST for device {fgt_device_name}: {vdom2adom_list}\n')
+        if args.snapshot:
+            ## Topology snapshot, only new/changed devices & ADOMs are pulled, the mapping is read from the snapshot
+            snapshot = TopologySnapshot(args.snapshot)
+            print('--> Refreshing topology snapshot %s: %s' % (args.snapshot, snapshot.refresh(fmg)))
+            topology = snapshot.index()
+            snapshot.close()
+            rows = topology_mapping(topology, None if fgt_device_name == '*' else [fgt_device_name])
+        elif fgt_device_name == '*':
+            ## Every device, one bulk pull of all devices, VDOMs & ADOM members instead of get_adom/get_vdoms per device
+            rows = topology_mapping(TopologyIndex.fetch(fmg))
+        else:
+            ## Get VDOM to ADOM, every ADOM of the device in one multi-params request
+            rows = adom_vdom_mapping(fmg, fgt_device_name)
 
-    ## Call fmg_logout Function
-    fmg_logout(host_ip)
+        ## Logout of FortiManager
+        fmg.logout()
+
+    if args.output:
+        write_mapping(rows, args.output)
+        print(f'--> VDOM:ADOM mapping of {len(set(row["device"] for row in rows))} devices written to {args.output}')
+    else:
+        devices = sorted(set(row['device'] for row in rows)) if fgt_device_name == '*' else [fgt_device_name]
+        for device_name in devices:
+            root_vdom2adom_list, vdom2adom_list = split_root_vdoms([row for row in rows if row['device'] == device_name])
+            print(f'root VDOM:ADOM LIST for device {device_name}: {root_vdom2adom_list}')
+            print(f'VDOM:ADOM LIST for device {device_name}: {vdom2adom_list}\n')
 
     ''' End main function/program '''
 
@@ -0,0 +1,160 @@
+#!/usr/bin/python
+'''Project: FortiManager asyncio JSON-RPC Client
+   Details: asyncio version of the FMGClient login/request/logout functions so fleet-wide jobs can keep N requests
+            in flight against one FortiManager instead of running strictly one after the other.
+            Sends the same JSON-RPC bodies as FMGClient (fmg_client.py). Each request runs on the pooled keep-alive
+            requests.Session in a worker thread, an asyncio.Semaphore sets how many requests are in flight at once.
+            Every request can be given its own timeout & can be cancelled. Cancelling stops waiting for the answer right away,
+            the worker thread is freed when the HTTP timeout (timeout argument) expires or the FortiManager answers.
+   Date: 2026
+   Classes: AsyncFMGClient
+   Python Version: 3.10.11
+   FortiManager Version: v7.0.8, should be compatible with 6.x & 7.x branch.
+   Usage:
+        import asyncio
+        from fmg_async_client import AsyncFMGClient
+
+        async def sweep(hostIP, hostAPIUSER, hostPASSWD, url_list):
+            async with AsyncFMGClient(hostIP, concurrency=10) as fmg:
+                await fmg.login(hostAPIUSER, hostPASSWD)
+                results = await fmg.gather([('get', json_url, {}) for json_url in url_list])
+                await fmg.logout()
+            return results
+
+        asyncio.run(sweep(hostIP, hostAPIUSER, hostPASSWD, url_list))
+
+        #Or wrap a logged in FMGClient, it is not closed with the AsyncFMGClient
+        async with AsyncFMGClient(fmg=fmg, concurrency=10) as afmg:
+            results = await afmg.batch(calls)
+'''
+
+## Define Modules
+#asyncio event loop, semaphore & timeouts
+import asyncio
+#To pass keyword arguments to functions running in the worker threads
+import functools
+#Worker threads that run the HTTPS requests
+from concurrent.futures import ThreadPoolExecutor
+#Shared FortiManager API client, pooled HTTPS connection & session handling
+from fmg_client import FMGClient, FMGBatch
+
+#Default of the timeout arguments, use the client timeout. None is no timeout
+CLIENT_TIMEOUT = object()
+
+
+class AsyncFMGClient:
+    '''asyncio FortiManager JSON-RPC API Client with bounded concurrency
+    Arguments:
+    hostIP - IP addres of FortiManager. Note, if not on default HTTPS(443) port can input: 1.1.1.1:8080
+    concurrency - Max number of requests in flight at once against the FortiManager
+    timeout - Default seconds to wait for each request, None waits forever. Also used as the HTTP timeout of the worker threads
+    verify - Verify the FortiManager HTTPS certificate, default False as most FortiManagers use the self signed certificate
+    fmg - Optional FMGClient to send the requests with instead of a new one, ex: already logged in with a debug sink.
+          Create it with pool_maxsize=concurrency, it is left open when the AsyncFMGClient is closed
+    '''
+    def __init__(self, hostIP=None, concurrency=10, timeout=60, verify=False, fmg=None):
+        self.concurrency = concurrency
+        self.timeout = timeout
+        self.owns_client = fmg is None
+        if fmg is None:
+            #Pool as many connections as requests in flight so no request waits for a free connection
+            fmg = FMGClient(hostIP, pool_maxsize=concurrency, timeout=timeout, verify=verify)
+        self.fmg = fmg
+        self.semaphore = asyncio.Semaphore(concurrency)
+        self.executor = ThreadPoolExecutor(max_workers=concurrency)
+
+    @property
+    def session(self):
+        return self.fmg.session
+
+    async def run(self, func, *args, timeout=CLIENT_TIMEOUT, **kwargs):
+        '''Run a blocking FMGClient function in a worker thread, waiting for a free concurrency slot first
+        Arguments:
+        func - Function to run, ex: self.fmg.request
+        timeout - Seconds to wait for this call, default is the client timeout, None waits forever.
+                  Raises asyncio.TimeoutError when expired
+        '''
+        if timeout is CLIENT_TIMEOUT:
+            timeout = self.timeout
+        loop = asyncio.get_running_loop()
+        async with self.semaphore:
+            future = loop.run_in_executor(self.executor, functools.partial(func, *args, **kwargs))
+            return await asyncio.wait_for(future, timeout)
+
+    async def login(self, hostAPIUSER, hostPASSWD):
+        '''FortiManager Login & Create Session, see FMGClient.login'''
+        await self.run(self.fmg.login, hostAPIUSER, hostPASSWD)
+
+    async def logout(self):
+        '''FortiManager logout, see FMGClient.logout'''
+        await self.run(self.fmg.logout)
+
+    async def request(self, method, json_url, timeout=CLIENT_TIMEOUT, **params):
+        '''Send one JSON-RPC request to the FortiManager, see FMGClient.request
+        Arguments:
+        timeout - Seconds to wait for this request, default is the client timeout, None waits forever
+
+        Returns:
+        http_code - HTTP status code of the response
+        json_resp - JSON response from FortiManager
+        '''
+        return await self.run(self.fmg.request, method, json_url, timeout=timeout, **params)
+
+    async def get(self, json_url, timeout=CLIENT_TIMEOUT, **params):
+        '''JSON-RPC get, see request'''
+        return await self.request('get', json_url, timeout=timeout, **params)
+
+    async def execute(self, json_url, timeout=CLIENT_TIMEOUT, **params):
+        '''JSON-RPC exec, see request'''
+        return await self.request('exec', json_url, timeout=timeout, **params)
+
+    async def gather(self, calls, timeout=CLIENT_TIMEOUT, return_exceptions=True):
+        '''Send many JSON-RPC requests concurrently, at most concurrency in flight at once
+        Arguments:
+        calls - List of (method, json_url, params) tuples, params is a dict of extra keys for the params entry
+        timeout - Seconds to wait for each request, default is the client timeout, None waits forever
+        return_exceptions - Return a failed/timed out request's exception in its slot instead of raising it
+
+        Returns:
+        results - List of (http_code, json_resp) in the same order as calls
+        '''
+        tasks = [self.request(method, json_url, timeout=timeout, **params) for method, json_url, params in calls]
+        return await asyncio.gather(*tasks, return_exceptions=return_exceptions)
+
+    async def batch(self, calls, max_batch_size=50, max_payload_bytes=1048576, timeout=CLIENT_TIMEOUT):
+        '''Send many JSON-RPC calls as multi-params requests, with the requests themselves sent concurrently
+        Arguments:
+        calls - List of (method, json_url, params) tuples, params is a dict of extra keys for the params entry
+        max_batch_size - Max number of params entries sent in one request, see FMGBatch
+        max_payload_bytes - Max JSON size of the params entries sent in one request, see FMGBatch
+        timeout - Seconds to wait for each multi-params request, default is the client timeout, None waits forever
+
+        Returns:
+        results - List of BatchResult in the same order as calls. The calls of a multi-params request that failed or
+                  timed out get status code -1 with the error as message
+        '''
+        batch = FMGBatch(self.fmg, max_batch_size, max_payload_bytes)
+        results = [batch.add(method, json_url, **params) for method, json_url, params in calls]
+        chunks = batch.split()
+        #Send each multi-params request concurrently instead of one after the other, one failed request does not stop the others
+        errors = await asyncio.gather(*[self.run(batch.send_chunk, method, chunk, timeout=timeout) for method, chunk in chunks],
+                                      return_exceptions=True)
+        for (method, chunk), error in zip(chunks, errors):
+            if isinstance(error, BaseException):
+                for entry, result in chunk:
+                    result.result = {}
+                    result.status = {'code': -1, 'message': '%s: %s' % (type(error).__name__, error)}
+        batch.pending = []
+        return results
+
+    def close(self):
+        '''Close the worker threads & pooled connections, a FMGClient passed with fmg= is left open'''
+        self.executor.shutdown(wait=False, cancel_futures=True)
+        if self.owns_client:
+            self.fmg.http.close()
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, exc_type, exc_value, traceback):
+        self.close()
@@ -0,0 +1,93 @@
+#!/usr/bin/python
+'''Project: FortiManager API Cache
+   Details: Small thread safe LRU cache with a time to live, shared by the scripts that look up the same FortiManager
+            data again & again (device name to OID, etc.). Entries expire ttl seconds after they were set, the least recently
+            used entries are dropped when the cache holds maxsize entries.
+   Date: 2026
+   Classes: TTLCache
+   Python Version: 3.10.11
+   Usage:
+        from fmg_cache import TTLCache
+        cache = TTLCache(maxsize=10000, ttl=300)
+        cache.set('FGT-01', 123)
+        cache.get('FGT-01')                     #123 until it expires, then None
+'''
+
+## Define Modules
+#Entry expiry times
+import time
+#Cache shared between threads
+import threading
+#LRU order of the entries
+from collections import OrderedDict
+
+#Returned by get when the key is not cached, so a cached None can be told apart
+MISSING = object()
+
+
+class TTLCache:
+    '''LRU cache with a time to live per entry
+    Arguments:
+    maxsize - Max number of entries, the least recently used entry is dropped first
+    ttl - Default seconds an entry stays valid, None never expires
+    '''
+    def __init__(self, maxsize=10000, ttl=300):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.lock = threading.Lock()
+        #key: (expiry time or None, value), most recently used last
+        self.entries = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key, default=None):
+        '''Cached value of key, default if not cached or expired'''
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is not None:
+                expires, value = entry
+                if expires is None or expires > time.monotonic():
+                    self.entries.move_to_end(key)
+                    self.hits += 1
+                    return value
+                del self.entries[key]
+            self.misses += 1
+            return default
+
+    def set(self, key, value, ttl=MISSING):
+        '''Cache a value
+        Arguments:
+        key - Cache key, must be hashable
+        value - Value to cache, None can be cached
+        ttl - Seconds this entry stays valid, default is the cache ttl, None never expires
+        '''
+        if ttl is MISSING:
+            ttl = self.ttl
+        expires = time.monotonic() + ttl if ttl is not None else None
+        with self.lock:
+            self.entries[key] = (expires, value)
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.maxsize:
+                self.entries.popitem(last=False)
+
+    def invalidate(self, key):
+        '''Drop one entry, no error if it is not cached'''
+        with self.lock:
+            self.entries.pop(key, None)
+
+    def invalidate_if(self, match):
+        '''Drop every entry whose key matches, match is a function called with the key'''
+        with self.lock:
+            for key in [key for key in self.entries if match(key)]:
+                del self.entries[key]
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+
+    def __contains__(self, key):
+        return self.get(key, MISSING) is not MISSING
+
+    def __len__(self):
+        with self.lock:
+            return len(self.entries)
@@ -0,0 +1,454 @@
+#!/usr/bin/python
+'''Project: FortiManager JSON-RPC Client
+   Details: Shared FortiManager API client used by the example scripts in this folder. Replaces the fmg_login, fmg_logout,
+            workspace_lock, workspace_unlock & workspace_commit functions that were copied into every script.
+            The client keeps one persistent requests.Session (HTTP keep-alive) with a tunable urllib3 connection pool,
+            so every API call re-uses an open TCP+TLS connection to the FortiManager instead of doing a new handshake.
+            Session ID & URL are stored on the client instance instead of the old global session / global url.
+   Date: 2026
+   Classes: FMGClient, FMGBatch, BatchResult, FMGError
+   Python Version: 3.10.11
+   FortiManager Version: v7.0.8, should be compatible with 6.x & 7.x branch.
+   Usage:
+        from fmg_client import FMGClient
+        fmg = FMGClient(hostIP)
+        fmg.login(hostAPIUSER, hostPASSWD)
+        http_code, json_resp = fmg.get("dvmdb/adom")
+        with fmg.batch() as batch:
+            results = [batch.get(json_url) for json_url in url_list]
+        for result in results:
+            print(result.code, result.data)
+        fmg.logout()
+'''
+
+## Define Modules
+#For system calls like exit system, etc.
+import sys
+#To measure the JSON payload size of batched requests
+import json
+#Level of the raw API responses written to the debug sink
+from logging import DEBUG
+#For making HTTPS Connections to the FortiManager API Server
+import requests
+from requests.adapters import HTTPAdapter
+import urllib3
+#To ignore the FortiManager Self Signed Certificate warnings.
+urllib3.disable_warnings(urllib3.exceptions.InsecureRequestWarning)
+
+
+class FMGError(Exception):
+    '''FortiManager API returned an error status code for a request
+    Attributes:
+    code - JSON status code returned by FortiManager, ex: -6 object does not exist, -11 no permission/invalid
+    message - JSON status message returned by FortiManager
+    url - API URL of the request that failed
+    '''
+    def __init__(self, code, message, url=''):
+        self.code = code
+        self.message = message
+        self.url = url
+        super().__init__('FortiManager API error code %s: %s (%s)' % (code, message, url))
+
+
+class FMGClient:
+    '''FortiManager JSON-RPC API Client with a pooled keep-alive HTTPS connection
+    Arguments:
+    hostIP - IP addres of FortiManager. Note, if not on default HTTPS(443) port can input: 1.1.1.1:8080
+    pool_connections - Number of connection pools to cache (one per host), default 1 as we only talk to one FortiManager
+    pool_maxsize - Max number of open connections kept in the pool, raise this when calling the client from many threads
+    timeout - Seconds to wait for the FortiManager to answer a request, None waits forever like the original scripts
+    verify - Verify the FortiManager HTTPS certificate, default False as most FortiManagers use the self signed certificate
+    debug_sink - Optional fmg_debug.DebugSink, raw API responses are written to it when its DEBUG level is enabled
+    '''
+    def __init__(self, hostIP, pool_connections=1, pool_maxsize=10, timeout=None, verify=False, debug_sink=None):
+        self.host = hostIP
+        #Create HTTPS URL
+        self.url = 'https://' + hostIP + '/jsonrpc'
+        #Session ID returned by FortiManager on login
+        self.session = None
+        self.timeout = timeout
+        self.debug_sink = debug_sink
+        #Persistent HTTP session, keeps TCP+TLS connections open between API calls
+        self.http = requests.Session()
+        self.http.verify = verify
+        adapter = HTTPAdapter(pool_connections=pool_connections, pool_maxsize=pool_maxsize)
+        self.http.mount('https://', adapter)
+
+    def post(self, body, stream=False):
+        '''Send a JSON-RPC body to the FortiManager
+        Arguments:
+        body - JSON body to send, session is added if not set
+        stream - Leave the response body on the connection to be read in chunks, see stream
+
+        Returns:
+        r - requests Response, raises requests.exceptions.RequestException on connection errors
+        '''
+        if 'session' not in body:
+            body['session'] = self.session
+        r = self.http.post(self.url, json=body, timeout=self.timeout, stream=stream)
+        #Raw response bytes to the debug sink, only written when its DEBUG level is enabled. Login response is skipped, it has the session ID.
+        #Streamed responses are skipped, reading r.content would load the whole body
+        if not stream and self.debug_sink is not None and self.debug_sink.enabled(DEBUG):
+            urls = [str(entry.get('url')) for entry in body.get('params', [])]
+            if 'sys/login/user' not in urls:
+                self.debug_sink.write(DEBUG, '%s %s' % (body.get('method'), ', '.join(urls)), r.content)
+        return r
+
+    def request(self, method, json_url, **params):
+        '''Send one JSON-RPC request to the FortiManager
+        Arguments:
+        method - JSON-RPC method: get, add, set, update, delete, exec, etc.
+        json_url - API URL, ex: dvmdb/adom
+        params - Any extra keys for the params entry, ex: data, fields, filter, option. Keys with a space like
+                 "scope member" can be passed with a dict: request('get', url, **{'scope member': [...]})
+
+        Returns:
+        http_code - HTTP status code of the response
+        json_resp - JSON response from FortiManager
+        '''
+        entry = dict(params)
+        entry['url'] = json_url
+        body = {
+            "id": 1,
+            "method": method,
+            "params": [entry],
+            "session": self.session
+        }
+        r = self.post(body)
+        return r.status_code, r.json()
+
+    def get(self, json_url, **params):
+        '''JSON-RPC get, see request'''
+        return self.request('get', json_url, **params)
+
+    def execute(self, json_url, **params):
+        '''JSON-RPC exec, see request'''
+        return self.request('exec', json_url, **params)
+
+    def stream(self, method, json_url, **params):
+        '''Send one JSON-RPC request & return the response without reading its body, for responses too large to load at once
+        Arguments:
+        method, json_url, params - See request
+
+        Returns:
+        r - requests Response sent with stream=True, read it with fmg_stream.iter_response_list or r.iter_content & close it
+        '''
+        entry = dict(params)
+        entry['url'] = json_url
+        body = {
+            "id": 1,
+            "method": method,
+            "params": [entry],
+            "session": self.session
+        }
+        return self.post(body, stream=True)
+
+    def batch(self, max_batch_size=50, max_payload_bytes=1048576):
+        '''Create a FMGBatch to send many get/exec calls in multi-params requests, see FMGBatch'''
+        return FMGBatch(self, max_batch_size, max_payload_bytes)
+
+    def login(self, hostAPIUSER, hostPASSWD):
+        '''FortiManager Login & Create Session
+        Arguments:
+        hostAPIUSER - API User Account Name
+        hostPASSWD - API User Passwd
+        '''
+        #JSON Body to sent to API request
+        body = {
+            "id": 1,
+            "method": "exec",
+            "params": [{
+                "url": "sys/login/user",
+                "data": [{
+                    "user": hostAPIUSER,
+                    "passwd": hostPASSWD
+                }]
+            }],
+            "session": 1
+        }
+        #Test HTTPS connection to host then Capture and output any errors
+        try:
+            r = self.post(body)
+        except requests.exceptions.RequestException as e:
+            print (SystemError(e))
+            #Exit Program, Connection was not Successful
+            sys.exit(1)
+        #Save JSON response from FortiManager
+        json_resp = r.json()
+        #Check if User & Passwd was valid, no code -11 means invalid
+        if json_resp['result'][0]['status']['code'] != -11:
+            self.session = json_resp['session']
+            print ('--> Logging into FortiManager: %s' % self.host)
+            #HTTP & JSON code & message
+            print ('<-- HTTPcode: %d JSONmesg: %s' % (r.status_code, json_resp['result'][0]['status']['message']))
+        else:
+            print ('<--Username or password is not valid, please try again, exiting...')
+            #HTTP & JSON code & message
+            print ('<-- HTTPcode: %d JSONmesg: %s' % (r.status_code, json_resp['result'][0]['status']['message']))
+            #Exit Program, Username or Password is not valided or internal FortiManager error review Hcode & Jmesg
+            sys.exit(1)
+
+    def logout(self):
+        '''FortiManager logout, then close the pooled connections'''
+        body = {
+            "id": 1,
+            "method": "exec",
+            "params": [{
+                "url": "sys/logout"
+            }],
+            "session": self.session
+        }
+        #Test HTTPS connection to host then Capture and output any errors
+        try:
+            r = self.post(body)
+        except requests.exceptions.RequestException as e:
+            print (SystemError(e))
+            #Exit Program, Connection was not Successful
+            sys.exit(1)
+        finally:
+            self.http.close()
+        #Save JSON response from FortiManager
+        json_resp = r.json()
+        #Check if any API Errors returned
+        if json_resp['result'][0]['status']['code'] != -11:
+            print ('--> Logging out of FMG: %s' % self.host)
+            #HTTP & JSON code & message
+            print ('<-- HTTPcode: %d JSONmesg: %s' % (r.status_code, json_resp['result'][0]['status']['message']))
+            self.session = None
+        else:
+            print ('<--Error Occured, check Hcode & Jmesg')
+            #Exit Program, internal FortiManager error review Hcode & Jmesg
+            print ('<-- HTTPcode: %d JSONmesg: %s' % (r.status_code, json_resp['result'][0]['status']['message']))
+            sys.exit(1)
+
+    def workspace_lock(self, lADOM):
+        '''FortiManager Lock/Acquire ADOM, exits if ADOM does not exist or is locked by another user
+        Arguments:
+        lADOM - ADOM Name to Lock/Acquire
+        '''
+        try:
+            http_code, json_resp = self.execute("pm/config/adom/" + lADOM + "/_workspace/lock")
+        except requests.exceptions.RequestException as e:
+            print (SystemError(e))
+            #Exit Program, Connection was not Successful
+            sys.exit(1)
+        if json_resp['result'][0]['status']['code'] == -6:
+            print(f'<-- Unable to Lock ADOM, ADOM name {lADOM} does not exist. Please check name & case sensitivity')
+            print('<-- JSONmesg API output %s' % json_resp['result'][0]['status'])
+            #Exit Program, Unable to Lock ADOM
+            sys.exit(1)
+        elif json_resp['result'][0]['status']['code'] != -11:
+            print ('--> Locking ADOM %s' % lADOM)
+            print ('<-- HTTPcode: %d JSONmesg: %s' % (http_code, json_resp['result'][0]['status']['message']))
+        else:
+            print (f'<-- Unable to Lock ADOM {lADOM}, ADOM might be locked by a user, please check following JSONmesg for reason, exiting...')
+            #HTTP & JSON code & message
+            print ('<-- HTTPcode: %d JSONmesg: %s' % (http_code, json_resp['result'][0]['status']['message']))
+            #Exit Program, Unable to Lock ADOM
+            sys.exit(1)
+
+    def workspace_unlock(self, uADOM):
+        '''FortiManager unlock ADOM
+        Arguments:
+        uADOM - ADOM Name to unlock
+        '''
+        try:
+            http_code, json_resp = self.execute("pm/config/adom/" + uADOM + "/_workspace/unlock")
+        except requests.exceptions.RequestException as e:
+            print (SystemError(e))
+            #Exit Program, Connection was not Successful
+            sys.exit(1)
+        if json_resp['result'][0]['status']['code'] != -11:
+            print ('--> UnLocking ADOM %s' % uADOM)
+            print ('<-- HTTPcode: %d JSONmesg: %s' % (http_code, json_resp['result'][0]['status']['message']))
+        else:
+            print (f'<--Unable to unlock ADOM {uADOM}, please check following JSONmesg for reason, exiting...')
+            #HTTP & JSON code & message
+            print ('<-- HTTPcode: %d JSONmesg: %s' % (http_code, json_resp['result'][0]['status']['message']))
+            #Exit Program, Unable to unlock ADOM
+            sys.exit(1)
+
+    def workspace_commit(self, cADOM):
+        '''FortiManager Commit/Save Changes to ADOM
+        Arguments:
+        cADOM - ADOM Name to Save Changes
+        '''
+        try:
+            http_code, json_resp = self.execute("pm/config/adom/" + cADOM + "/_workspace/commit")
+        except requests.exceptions.RequestException as e:
+            print (SystemError(e))
+            #Exit Program, Connection was not Successful
+            sys.exit(1)
+        if json_resp['result'][0]['status']['code'] != -11:
+            print ('--> Saving Changes to ADOM %s' % cADOM)
+            print ('<-- HTTPcode: %d JSONmesg: %s' % (http_code, json_resp['result'][0]['status']['message']))
+        else:
+            print (f'<--Unable to Save Changes to ADOM {cADOM}, please check following JSONmesg for reason, will continue...')
+            #HTTP & JSON code & message
+            print ('<-- HTTPcode: %d JSONmesg: %s' % (http_code, json_resp['result'][0]['status']['message']))
+
+    def workspace_call(self, adom, action):
+        '''FortiManager ADOM workspace lock, unlock or commit that raises FMGError instead of exiting,
+           for jobs that must keep running when one ADOM fails
+        Arguments:
+        adom - ADOM Name
+        action - Workspace action: lock, unlock or commit
+
+        Returns:
+        json_resp - JSON response from FortiManager. Raises FMGError on a JSON error code, ex: -11 ADOM locked by another user
+        '''
+        json_url = "pm/config/adom/" + adom + "/_workspace/" + action
+        http_code, json_resp = self.execute(json_url)
+        status = json_resp['result'][0]['status']
+        if status['code'] != 0:
+            raise FMGError(status['code'], status['message'], json_url)
+        return json_resp
+
+
+class BatchResult:
+    '''Result of one call queued in a FMGBatch, filled in when the batch is sent
+    Attributes:
+    method - JSON-RPC method of the call
+    url - API URL of the call
+    http_code - HTTP status code of the multi-params request that carried this call
+    status - JSON status of this call, ex: {'code': 0, 'message': 'OK'}
+    code - JSON status code, None until the batch is sent
+    message - JSON status message
+    data - JSON data returned for this call
+    result - The full result[i] entry FortiManager returned for this call
+    '''
+    def __init__(self, method, json_url):
+        self.method = method
+        self.url = json_url
+        self.http_code = None
+        self.status = None
+        self.result = None
+
+    @property
+    def done(self):
+        return self.status is not None
+
+    @property
+    def code(self):
+        return self.status['code'] if self.status is not None else None
+
+    @property
+    def message(self):
+        return self.status['message'] if self.status is not None else None
+
+    @property
+    def data(self):
+        return self.result.get('data') if self.result is not None else None
+
+    @property
+    def ok(self):
+        return self.code == 0
+
+
+class FMGBatch:
+    '''Collect many JSON-RPC calls then send them to FortiManager as multi-params requests.
+       FortiManager /jsonrpc accepts several entries in params per request and returns result[i] for params[i],
+       so N calls take N / max_batch_size round-trips instead of N. Calls are grouped per method as one request
+       only carries one method. Use as a context manager to send the batch when the block ends.
+    Arguments:
+    fmg - Logged in FMGClient
+    max_batch_size - Max number of params entries sent in one request
+    max_payload_bytes - Max JSON size of the params entries sent in one request, a single larger entry is sent alone
+    '''
+    def __init__(self, fmg, max_batch_size=50, max_payload_bytes=1048576):
+        self.fmg = fmg
+        self.max_batch_size = max_batch_size
+        self.max_payload_bytes = max_payload_bytes
+        #Queued calls not yet sent, list of (params entry, BatchResult)
+        self.pending = []
+
+    def add(self, method, json_url, **params):
+        '''Queue one JSON-RPC call, same arguments as FMGClient.request
+
+        Returns:
+        result - BatchResult filled in when the batch is sent
+        '''
+        entry = dict(params)
+        entry['url'] = json_url
+        result = BatchResult(method, json_url)
+        self.pending.append((entry, result))
+        return result
+
+    def get(self, json_url, **params):
+        '''Queue a JSON-RPC get, see add'''
+        return self.add('get', json_url, **params)
+
+    def execute(self, json_url, **params):
+        '''Queue a JSON-RPC exec, see add'''
+        return self.add('exec', json_url, **params)
+
+    def chunks(self, calls):
+        '''Split calls of one method into lists no bigger than max_batch_size & max_payload_bytes'''
+        chunk = []
+        chunk_bytes = 0
+        for entry, result in calls:
+            entry_bytes = len(json.dumps(entry))
+            if chunk and (len(chunk) >= self.max_batch_size or chunk_bytes + entry_bytes > self.max_payload_bytes):
+                yield chunk
+                chunk = []
+                chunk_bytes = 0
+            chunk.append((entry, result))
+            chunk_bytes += entry_bytes
+        if chunk:
+            yield chunk
+
+    def split(self):
+        '''Split the queued calls into multi-params requests, grouped per method
+
+        Returns:
+        requests_list - List of (method, chunk), chunk is a list of (params entry, BatchResult) sent in one request
+        '''
+        by_method = {}
+        for entry, result in self.pending:
+            by_method.setdefault(result.method, []).append((entry, result))
+        return [(method, chunk) for method, calls in by_method.items() for chunk in self.chunks(calls)]
+
+    def send_chunk(self, method, chunk):
+        '''Send one multi-params request, then fill in each BatchResult with its own result[i] & status code
+        Arguments:
+        method - JSON-RPC method of the request
+        chunk - List of (params entry, BatchResult) from split
+        '''
+        body = {
+            "id": 1,
+            "method": method,
+            "params": [entry for entry, result in chunk],
+            "session": self.fmg.session
+        }
+        r = self.fmg.post(body)
+        resp_results = r.json().get('result', [])
+        for i, (entry, result) in enumerate(chunk):
+            result.http_code = r.status_code
+            if i < len(resp_results):
+                result.result = resp_results[i]
+                result.status = resp_results[i]['status']
+            else:
+                result.result = {}
+                result.status = {'code': -1, 'message': 'No result returned for batched request'}
+
+    def send(self):
+        '''Send all queued calls, then fill in each BatchResult with its own result[i] & status code.
+           Raises requests.exceptions.RequestException on connection errors, calls not sent stay queued.
+
+        Returns:
+        results - List of BatchResult in the order the calls were queued
+        '''
+        results = [result for entry, result in self.pending]
+        for method, chunk in self.split():
+            self.send_chunk(method, chunk)
+            sent = set(id(result) for entry, result in chunk)
+            self.pending = [call for call in self.pending if id(call[1]) not in sent]
+        return results
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        #Only send when the with block finished without an error
+        if exc_type is None:
+            self.send()
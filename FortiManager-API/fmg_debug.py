@@ -0,0 +1,102 @@
+#!/usr/bin/python
+'''Project: FortiManager API Debug Output
+   Details: Debug sink for the FortiManager API scripts. Replaces printing json.dumps(json_resp, indent=2) of every response
+            to a DEBUG-CONSOLE-OUTPUT file. Nothing is serialized or written unless the sink is enabled for that level,
+            responses are written as the raw bytes FortiManager sent (no decode & re-encode) and the file is rotated
+            & gzip compressed when it reaches max_bytes. Safe to share between threads.
+   Date: 2026
+   Classes: DebugSink
+   Python Version: 3.10.11
+   Usage:
+        from fmg_debug import DebugSink, DEBUG
+        debug_sink = DebugSink('FMG-DEBUG.log', level=DEBUG)
+        fmg = FMGClient(hostIP, debug_sink=debug_sink)     #Every raw API response is written to FMG-DEBUG.log
+        debug_sink.write(DEBUG, 'profiles', lambda: json.dumps(data, indent=2))   #Lambda only runs when DEBUG is enabled
+'''
+
+## Define Modules
+#For rotating the debug file
+import os
+#To compress rotated debug files
+import gzip
+import shutil
+#Timestamp of each debug entry
+import time
+#Debug file is shared by threads
+import threading
+#Same level numbers as the logging module
+from logging import DEBUG, ERROR
+
+#Level that turns the sink off completely
+OFF = ERROR + 10
+
+
+class DebugSink:
+    '''Debug output file with levels, lazy serialization & size based rotation
+    Arguments:
+    file_name - Debug file to write to, None turns the sink off
+    level - Lowest level written, DEBUG writes raw API responses, OFF writes nothing
+    max_bytes - Rotate the file when it reaches this size, 0 never rotates
+    backup_count - Number of rotated gzip files kept, file_name.1.gz is the newest
+    compress - gzip rotated files
+    '''
+    def __init__(self, file_name=None, level=DEBUG, max_bytes=10485760, backup_count=5, compress=True):
+        self.file_name = file_name
+        self.level = level if file_name else OFF
+        self.max_bytes = max_bytes
+        self.backup_count = backup_count
+        self.compress = compress
+        self.lock = threading.Lock()
+        #Debug file is only created when the first entry is written
+        self.debug_file = None
+
+    def enabled(self, level=DEBUG):
+        '''True if entries of this level are written, check before building an expensive payload'''
+        return level >= self.level
+
+    def write(self, level, label, payload):
+        '''Write one debug entry
+        Arguments:
+        level - Entry level, ex: DEBUG
+        label - Short text header of the entry, ex: the API URL
+        payload - bytes written as is, str, or a function returning bytes/str that is only called when the level is enabled
+        '''
+        if not self.enabled(level):
+            return
+        if callable(payload):
+            payload = payload()
+        if isinstance(payload, str):
+            payload = payload.encode()
+        header = ('### %s %s\n' % (time.strftime("%Y-%m-%d %H:%M:%S"), label)).encode()
+        with self.lock:
+            if self.debug_file is None:
+                self.debug_file = open(self.file_name, 'ab')
+            self.debug_file.write(header)
+            self.debug_file.write(payload)
+            self.debug_file.write(b'\n')
+            if self.max_bytes and self.debug_file.tell() >= self.max_bytes:
+                self.rotate()
+
+    def rotate(self):
+        '''Move the debug file to file_name.1(.gz), older files shift up by one, oldest is removed. Called with lock held'''
+        self.debug_file.close()
+        self.debug_file = None
+        suffix = '.gz' if self.compress else ''
+        for index in range(self.backup_count - 1, 0, -1):
+            older = '%s.%d%s' % (self.file_name, index, suffix)
+            if os.path.exists(older):
+                os.replace(older, '%s.%d%s' % (self.file_name, index + 1, suffix))
+        if self.backup_count < 1:
+            os.remove(self.file_name)
+        elif self.compress:
+            with open(self.file_name, 'rb') as src, gzip.open(self.file_name + '.1.gz', 'wb') as dst:
+                shutil.copyfileobj(src, dst)
+            os.remove(self.file_name)
+        else:
+            os.replace(self.file_name, self.file_name + '.1')
+
+    def close(self):
+        with self.lock:
+            if self.debug_file is not None:
+                self.debug_file.close()
+                self.debug_file = None
@@ -1,173 +1,284 @@
 #Quick & dirty python script to test API FortiManager 7.6.3 pull device psirt/vuln list that is displayed in the FortiManager -> Device for each FortiGate
 # Change the Global VAR below for your environment.
+# Set scan_adoms to scan every device of those ADOMs (fleet PSIRT scan) instead of the single device below,
+# device OIDs are pulled per ADOM in one multi-params request & _psirt/data is queried for psirt_chunk_size devices at a time.
+# The scan is written to a CSV with one row per device & advisory.
+# Set psirt_store to keep the scans in a SQLite file keyed by (device serial/OID, advisory, firmware), each scan is compared
+# with the previous one & only the delta (new & fixed exposures) is written to the CSV.
 
-import os
-import os.path
-import sys
-import time
-import requests
-import urllib3
-urllib3.disable_warnings(urllib3.exceptions.InsecureRequestWarning)
 import json
-
-requests.packages.urllib3.disable_warnings()
+#Fleet scan CSV
+import csv
+import time
+#PSIRT scan store, delta against the previous scan
+import sqlite3
+#Shared FortiManager API client, pooled HTTPS connection & session handling
+from fmg_client import FMGClient, FMGError
+#Device name to OID resolver with a shared cache
+from fmg_topology import DeviceResolver
 
 ###Global VARs, change to match your local
 hostADMIN = 'admin'
 hostPASSWD = 'pwd'
 hostIP = '192.168.1.1'
 device = 'FGTFWNAME'
+#Fleet PSIRT scan, ex: ['root', 'ADOM1'], empty list only looks up the device above
+scan_adoms = []
+#Number of devices per _psirt/data request
+psirt_chunk_size = 50
+#SQLite file of the previous fleet scan, ex: 'fmg_psirt.db', empty string writes the full scan instead of the delta
+psirt_store = ''
 ###END GLOBAL
 
-url = 'https://' + hostIP + '/jsonrpc'
-session = ''
-
-def fmg_login():
-        global session
-        body = {
-        "id": 1,
-                "method": "exec",
-                "params": [{
-                        "url": "sys/login/user",
-                        "data": [{
-                                "user": hostADMIN,
-                                "passwd": hostPASSWD
-                        }]
-                }],
-                "session": 1
-        }
-        r = requests.post(url, json=body, verify=False)
-        json_resp = json.loads(r.text)
-        session = json_resp['session']
-        print ('--> Logging into FMG: %s' % hostIP)
-        print ('<-- Hcode: %d Jmesg: %s' % (r.status_code, json_resp['result'][0]['status']['message']))
-
-def fmg_logout():
-        body = {
-        "id": 1,
-                "method": "exec",
-                "params": [{
-                        "url": "sys/logout"
-                }],
-                "session": session
-        }
-        r = requests.post(url, json=body, verify=False)
-        json_resp = json.loads(r.text)
-        print ('--> Logging out of FMG: %s' % hostIP)
-        print ('<-- Hcode: %d Jmesg: %s' % (r.status_code, json_resp['result'][0]['status']['message']))
-        print
-
-def workspace_lock(fmgADOM):
-        json_url = "pm/config/adom/" + fmgADOM + "/_workspace/lock"
-        body = {
-                "id": 1,
-                "method": "exec",
-                "params": [{
-                        "url": json_url
-                }],
-                "session": session
-        }
-        r = requests.post(url, json=body, verify=False)
-        json_resp = json.loads(r.text)
-        #print ('--> Locking ADOM %s' % fmgADOM)
-        #print ('<-- Hcode: %d Jmesg: %s' % (r.status_code, json_resp['result'][0]['status']['message']))
-        #print
-
-def workspace_unlock(fmgADOM):
-        json_url = "pm/config/adom/" + fmgADOM + "/_workspace/unlock"
-        body = {
-                "id": 1,
-                "method": "exec",
-                "params": [{
-                        "url": json_url
-                }],
-                "session": session
-        }
-        r = requests.post(url, json=body, verify=False)
-        json_resp = json.loads(r.text)
-        #print ('--> Unlocking ADOM %s' % fmgADOM)
-        #print ('<-- Hcode: %d Jmesg: %s' % (r.status_code, json_resp['result'][0]['status']['message']))
-        #print
-
-def workspace_commit(fmgADOM):
-        json_url = "pm/config/adom/" + fmgADOM + "/_workspace/commit"
-        body = {
-                "id": 1,
-                "method": "exec",
-                "params": [{
-                        "url": json_url
-                }],
-                "session": session
-        }
-        r = requests.post(url, json=body, verify=False)
-        json_resp = json.loads(r.text)
-        print('--Saved All Changes in ADOM %s' % (fmgADOM))
+#Device fields pulled for the fleet scan
+DEVICE_FIELDS = ["name", "oid", "sn", "os_ver", "mr", "patch", "build", "platform_str"]
+#Key of a _psirt/data advisory with its FortiGuard IR number (ex: FG-IR-24-015) & key of the devices it affects.
+#_psirt/data is not in the published JSON API reference, the keys are the ones seen in 7.6.3 responses: a request with
+#a "scope member" list returns each advisory with the "scope member" entries ({"oid"} or {"name"}) it affects.
+#If an advisory does not list them the chunk can not be split per device & falls back to one request per device,
+#scan_psirt counts & prints those fallbacks, a scan where every chunk falls back means the schema is different.
+ADVISORY_ID_KEY = "irnum"
+ADVISORY_DEVICE_KEY = "scope member"
+#Columns of the normalized device x advisory table
+PSIRT_COLUMNS = ["adom", "device", "oid", "sn", "platform", "firmware", "advisory", "severity", "cve", "title"]
+#Columns of the delta table, change is new or fixed
+PSIRT_DELTA_COLUMNS = ["change"] + PSIRT_COLUMNS
 
 
-def get_device(device):
+def get_device(fmg, device):
         json_url = 'pm/config/'
-        body = {
-                "id": 1,
-                "method": "get",
-                "params": [{
-                        "url": json_url
-                }],
-                "session": session
-        }
-        r = requests.post(url, json=body, verify=False)
-        json_resp = json.loads(r.text)
+        http_code, json_resp = fmg.get(json_url)
         print(json.dumps(json_resp, indent=4))
 
-def get_oid(device):
-        json_url = 'dvmdb/device'
-        body = {
-                "method": "get",
-                "params": [{
-                        "fields": [
-                                "name"
-                        ],
-                        "filter": [
-                                "name",
-                                "==",
-                                device
-                        ],
-                        "option": [
-                                "no loadsub"
-                        ],
-                        "url": json_url
-                }],
-                "session": session
+def get_oid(fmg, device):
+        '''OID of the device, None if it is not in the FortiManager. Resolved through the shared DeviceResolver cache'''
+        return DeviceResolver(fmg).oid(device)
+
+def get_psirt(fmg, oid, adom='root'):
+        json_url = 'pm/config/adom/' + adom + "/_psirt/data"
+        params = {
+                "scope member": [
+                {
+                        "oid": oid
+                }]
         }
-        r = requests.post(url, json=body, verify=False)
-        json_resp = json.loads(r.text)
+        http_code, json_resp = fmg.get(json_url, **params)
         print(json.dumps(json_resp, indent=4))      
-        return json_resp['result'][0]['data'][0]['oid']
 
-def get_psirt( oid, adom='root'):
+def get_adom_devices(fmg, adoms):
+        '''Devices of many ADOMs, one dvmdb/adom/<adom>/device request per ADOM sent in one multi-params request
+        Returns:
+        adom_devices - {adom: [device data with DEVICE_FIELDS]}, raises FMGError if an ADOM returned an error
+        '''
+        with fmg.batch() as batch:
+                results = [(adom, batch.get("dvmdb/adom/" + adom + "/device", fields=DEVICE_FIELDS, option=["no loadsub"])) for adom in adoms]
+        adom_devices = {}
+        for adom, result in results:
+                if not result.ok:
+                        raise FMGError(result.code, result.message, result.url)
+                adom_devices[adom] = result.data or []
+        return adom_devices
+
+def firmware(device_data):
+        '''Firmware of a device, ex: v7.2.8 build1639'''
+        return 'v%s.%s.%s build%s' % (device_data.get('os_ver'), device_data.get('mr'), device_data.get('patch'), device_data.get('build'))
+
+def psirt_advisories(data):
+        '''Advisories of a _psirt/data response, data can be a list of advisories or a dict keyed by advisory ID'''
+        if isinstance(data, dict):
+                for advisory_id, advisory in data.items():
+                        if isinstance(advisory, dict):
+                                advisory = dict(advisory)
+                                advisory.setdefault(ADVISORY_ID_KEY, advisory_id)
+                                yield advisory
+        elif isinstance(data, list):
+                for advisory in data:
+                        if isinstance(advisory, dict):
+                                yield advisory
+
+def advisory_id(advisory):
+        '''IR number of an advisory, empty string if it has none'''
+        return str(advisory.get(ADVISORY_ID_KEY) or '')
+
+def advisory_devices(advisory):
+        '''Device OIDs/names of the scope member list of an advisory, empty set if it does not list them'''
+        found = set()
+        value = advisory.get(ADVISORY_DEVICE_KEY)
+        for entry in value if isinstance(value, list) else [value]:
+                if isinstance(entry, dict):
+                        entry = entry.get('oid', entry.get('name'))
+                if entry is not None:
+                        found.add(str(entry))
+        return found
+
+def get_psirt_chunk(fmg, adom, devices):
+        '''_psirt/data of many devices in one request
+        Returns:
+        advisories - {oid: [advisory]} for the devices, None when an advisory has no ADVISORY_DEVICE_KEY & there are
+                     many devices in the request. Raises FMGError on a JSON error code
+        '''
         json_url = 'pm/config/adom/' + adom + "/_psirt/data"
-        body = {
-                "method": "get",
-                "params": [{
-                        "scope member": [
-                        {
-                                "oid": oid
-                        }],
-                        "url": json_url
-                }],
-                "session": session
+        params = {
+                "scope member": [{"oid": device_data['oid']} for device_data in devices]
         }
-        r = requests.post(url, json=body, verify=False)
-        json_resp = json.loads(r.text)
-        print(json.dumps(json_resp, indent=4))      
+        http_code, json_resp = fmg.get(json_url, **params)
+        status = json_resp['result'][0]['status']
+        if status['code'] != 0:
+                raise FMGError(status['code'], status['message'], json_url)
+        advisories = {str(device_data['oid']): [] for device_data in devices}
+        names = {device_data['name']: str(device_data['oid']) for device_data in devices}
+        for advisory in psirt_advisories(json_resp['result'][0].get('data')):
+                if not advisory_id(advisory):
+                        #No IR number, the advisory can not be told apart from the other ones of the device
+                        print('<-- Skipping _psirt/data advisory without ' + ADVISORY_ID_KEY + ' in ADOM ' + adom + ': ' + json.dumps(advisory)[:200])
+                        continue
+                if ADVISORY_DEVICE_KEY not in advisory:
+                        if len(devices) > 1:
+                                #Advisory does not say which device it is for, ask again one device at a time
+                                return None
+                        affected = set(advisories)
+                else:
+                        #An empty list or other devices only, the advisory does not affect the devices of the request
+                        affected = set(names.get(entry, entry) for entry in advisory_devices(advisory)) & set(advisories)
+                for oid in affected:
+                        advisories[oid].append(advisory)
+        return advisories
+
+def scan_psirt(fmg, adoms, chunk_size=50):
+        '''Fleet PSIRT scan of every device in the ADOMs
+        Arguments:
+        fmg - Logged in FMGClient
+        adoms - ADOM names
+        chunk_size - Number of devices in the scope member list of one _psirt/data request
+
+        Returns:
+        rows - Normalized device x advisory table, list of dicts with PSIRT_COLUMNS, sorted by ADOM, device & advisory
+        '''
+        rows = []
+        requests_sent = 0
+        chunks = 0
+        fallbacks = 0
+        for adom, devices in get_adom_devices(fmg, adoms).items():
+                devices = [device_data for device_data in devices if device_data.get('oid') is not None]
+                for start in range(0, len(devices), chunk_size):
+                        chunk = devices[start:start + chunk_size]
+                        chunks += 1
+                        advisories = get_psirt_chunk(fmg, adom, chunk)
+                        requests_sent += 1
+                        if advisories is None:
+                                fallbacks += 1
+                                print('<-- ADOM %s _psirt/data advisory without %s, querying the %d devices of the chunk one by one' % (adom, ADVISORY_DEVICE_KEY, len(chunk)))
+                                advisories = {}
+                                for device_data in chunk:
+                                        advisories.update(get_psirt_chunk(fmg, adom, [device_data]))
+                                requests_sent += len(chunk)
+                        for device_data in chunk:
+                                for advisory in advisories[str(device_data['oid'])]:
+                                        cve = advisory.get('cve', '')
+                                        rows.append({
+                                                "adom": adom,
+                                                "device": device_data['name'],
+                                                "oid": device_data['oid'],
+                                                "sn": device_data.get('sn', ''),
+                                                "platform": device_data.get('platform_str', ''),
+                                                "firmware": firmware(device_data),
+                                                "advisory": advisory_id(advisory),
+                                                "severity": advisory.get('threat_severity', advisory.get('severity', advisory.get('risk', ''))),
+                                                "cve": ' '.join(cve) if isinstance(cve, list) else cve,
+                                                "title": advisory.get('title', '')
+                                        })
+        print('--> PSIRT scan: %d _psirt/data requests, %d of %d chunks fell back to one request per device' % (requests_sent, fallbacks, chunks))
+        if chunks > 1 and fallbacks == chunks:
+                print('<-- Every chunk fell back, _psirt/data advisories do not list their %s, set psirt_chunk_size = 1' % ADVISORY_DEVICE_KEY)
+        return sorted(rows, key=lambda row: (row['adom'], row['device'], row['advisory']))
+
+def exposure_key(row):
+        '''Store key of a device advisory, the serial identifies the device across OID changes (device deleted & added again)'''
+        return (row['sn'] or 'oid:%s' % row['oid'], row['advisory'], row['firmware'])
+
+def open_psirt_store(file_name):
+        db = sqlite3.connect(file_name)
+        with db:
+                db.executescript('''
+                        CREATE TABLE IF NOT EXISTS exposure (device_key TEXT, advisory TEXT, firmware TEXT, adom TEXT, data TEXT,
+                                                             first_seen REAL, last_seen REAL, PRIMARY KEY (device_key, advisory, firmware));
+                        CREATE INDEX IF NOT EXISTS exposure_adom ON exposure (adom);
+                ''')
+        return db
+
+def diff_psirt(db, adoms, rows):
+        '''Compare a fleet scan with the exposures stored by the previous scan, then store the scan
+        Arguments:
+        db - open_psirt_store connection
+        adoms - ADOM names of the scan, exposures of other ADOMs are not touched
+        rows - scan_psirt rows
+
+        Returns:
+        delta - {'new': [rows], 'fixed': [rows], 'unchanged': [rows]}, rows sorted by ADOM, device & advisory.
+                A firmware upgrade that is still exposed shows as fixed on the old firmware & new on the new one
+        '''
+        now = time.time()
+        placeholders = ','.join('?' * len(adoms))
+        previous = {}
+        for device_key, advisory, firmware, data in db.execute('SELECT device_key, advisory, firmware, data FROM exposure WHERE adom IN (%s)' % placeholders, list(adoms)):
+                previous[(device_key, advisory, firmware)] = json.loads(data)
+        current = {}
+        for row in rows:
+                if not row['advisory']:
+                        print('<-- Not storing exposure without advisory ID: ' + row['device'] + ' ' + row['firmware'])
+                        continue
+                current[exposure_key(row)] = row
+        delta = {
+                "new": [row for key, row in current.items() if key not in previous],
+                "fixed": [row for key, row in previous.items() if key not in current],
+                "unchanged": [row for key, row in current.items() if key in previous]
+        }
+        with db:
+                db.executemany('DELETE FROM exposure WHERE device_key = ? AND advisory = ? AND firmware = ?',
+                               [key for key in previous if key not in current])
+                #Upsert, an exposure already stored (device moved from an ADOM outside the scan, advisory details updated)
+                #keeps its first_seen & gets the ADOM & data of this scan
+                db.executemany('''INSERT INTO exposure VALUES (?, ?, ?, ?, ?, ?, ?)
+                                  ON CONFLICT (device_key, advisory, firmware) DO UPDATE SET
+                                  adom = excluded.adom, data = excluded.data, last_seen = excluded.last_seen''',
+                               [key + (row['adom'], json.dumps(row), now, now) for key, row in current.items()])
+        for change in delta:
+                delta[change].sort(key=lambda row: (row['adom'], row['device'], row['advisory']))
+        return delta
+
+def write_psirt_csv(rows, file_name, columns=PSIRT_COLUMNS):
+        with open(file_name, 'w', newline='') as csv_file:
+                writer = csv.DictWriter(csv_file, fieldnames=columns)
+                writer.writeheader()
+                writer.writerows(rows)
 
 
 #############MAIN
 
 
-fmg_login()
+fmg = FMGClient(hostIP)
+fmg.login(hostADMIN, hostPASSWD)
 
-device_oid = get_oid(device)
-print(f'Device OID {device_oid}')
-get_psirt(device_oid)
+if scan_adoms and psirt_store:
+        rows = scan_psirt(fmg, scan_adoms, psirt_chunk_size)
+        db = open_psirt_store(psirt_store)
+        delta = diff_psirt(db, scan_adoms, rows)
+        db.close()
+        changes = [dict(row, change=change) for change in ("new", "fixed") for row in delta[change]]
+        file_name = time.strftime("%Y%m%d-%H%M%S") + "_FMG_PSIRT-Delta.csv"
+        write_psirt_csv(changes, file_name, PSIRT_DELTA_COLUMNS)
+        print(f'PSIRT scan: {len(delta["new"])} new, {len(delta["fixed"])} fixed, {len(delta["unchanged"])} unchanged device advisories, delta written to {file_name}')
+elif scan_adoms:
+        rows = scan_psirt(fmg, scan_adoms, psirt_chunk_size)
+        file_name = time.strftime("%Y%m%d-%H%M%S") + "_FMG_PSIRT-Scan.csv"
+        write_psirt_csv(rows, file_name)
+        print(f'PSIRT scan of {len(set((row["adom"], row["device"]) for row in rows))} exposed devices, {len(rows)} device advisories written to {file_name}')
+else:
+        device_oid = get_oid(fmg, device)
+        if device_oid is None:
+                print(f'Device {device} not found')
+        else:
+                print(f'Device OID {device_oid}')
+                get_psirt(fmg, device_oid)
 
-fmg_logout()
+fmg.logout()
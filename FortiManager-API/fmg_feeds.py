@@ -0,0 +1,139 @@
+#!/usr/bin/python
+'''Project: FortiManager Threat Feed Entry Comparison
+   Details: Compare the entry lists of one Threat Feed across many FortiGates without holding a full copy per FortiGate.
+            FeedDigest hashes an entry list while it is streamed, in any order, so devices are grouped by digest first.
+            EntrySet keeps one entry list compact (IPv4 addresses as a sorted array of 32 bit integers, other entries in a set)
+            & gives the entries missing/extra against a reference list, only needed for the groups that differ.
+   Date: 2026
+   Classes: FeedDigest, EntrySet
+   Functions: entry_value, entry_key
+   Python Version: 3.10.11
+   Usage:
+        from fmg_feeds import FeedDigest, EntrySet
+        digest = FeedDigest()
+        for entry in entries:
+            digest.add(entry)
+        digest.hexdigest(), digest.count                   #Same for the same entries in any order
+        missing, extra = EntrySet(entries).diff(EntrySet(reference_entries))
+'''
+
+## Define Modules
+#Entry hashes
+import hashlib
+#IPv4/IPv6 entries as integers
+import ipaddress
+#Compact sorted IPv4 integers
+from array import array
+#Merge of sorted IPv4 integers
+from bisect import bisect_left
+from heapq import merge
+
+#Array typecode of 32 bit unsigned integers
+IPV4_TYPECODE = 'I' if array('I').itemsize >= 4 else 'L'
+#Digests are added modulo 2**128, order of the entries does not change the sum
+DIGEST_BITS = 128
+#IPv4 integers sorted at a time, only one run is a list of Python ints while sorting
+SORT_RUN_SIZE = 65536
+
+
+def entry_value(entry):
+    '''Text of an entry-list entry, entries are plain strings or objects like {"entry": "1.1.1.1", "valid": true}'''
+    if isinstance(entry, dict):
+        entry = entry.get('entry', entry.get('name', ''))
+    return str(entry).strip()
+
+
+def entry_key(entry):
+    '''Canonical form of an entry, int for an IPv4 address, ('6', int) for IPv6, lower case text for networks/ranges/domains'''
+    value = entry_value(entry)
+    try:
+        address = ipaddress.ip_address(value)
+    except ValueError:
+        return value.lower()
+    if address.version == 4:
+        return int(address)
+    return ('6', int(address))
+
+
+def key_text(key):
+    '''Entry text of a canonical key'''
+    if isinstance(key, int):
+        return str(ipaddress.IPv4Address(key))
+    if isinstance(key, tuple):
+        return str(ipaddress.IPv6Address(key[1]))
+    return key
+
+
+class FeedDigest:
+    '''Order insensitive digest of an entry list, fed one entry at a time
+    Attributes:
+    count - Number of entries added
+    '''
+    def __init__(self):
+        self.total = 0
+        self.count = 0
+
+    def add(self, entry):
+        key = entry_key(entry)
+        #Hash of the canonical key, an IPv6 address hashes the same however it is written
+        data = repr(key).encode()
+        self.total = (self.total + int.from_bytes(hashlib.blake2b(data, digest_size=DIGEST_BITS // 8).digest(), 'big')) % (1 << DIGEST_BITS)
+        self.count += 1
+
+    def hexdigest(self):
+        return '%0*x-%d' % (DIGEST_BITS // 4, self.total, self.count)
+
+
+class EntrySet:
+    '''Compact set of the entries of one list
+    Arguments:
+    entries - Iterable of entry-list entries, ex: a stream from fmg_stream.iter_response_list
+    '''
+    def __init__(self, entries=()):
+        ipv4 = array(IPV4_TYPECODE)
+        self.other = set()
+        for entry in entries:
+            key = entry_key(entry)
+            if isinstance(key, int):
+                ipv4.append(key)
+            else:
+                self.other.add(key)
+        #Sorted & deduplicated, 4 bytes per IPv4 address. Runs of SORT_RUN_SIZE are sorted into arrays & merged,
+        #so the whole list is never a list of Python ints
+        runs = [array(IPV4_TYPECODE, sorted(ipv4[start:start + SORT_RUN_SIZE])) for start in range(0, len(ipv4), SORT_RUN_SIZE)]
+        del ipv4
+        self.ipv4 = array(IPV4_TYPECODE)
+        for key in merge(*runs):
+            if not self.ipv4 or self.ipv4[-1] != key:
+                self.ipv4.append(key)
+
+    def __len__(self):
+        return len(self.ipv4) + len(self.other)
+
+    def __contains__(self, entry):
+        key = entry_key(entry)
+        if isinstance(key, int):
+            index = bisect_left(self.ipv4, key)
+            return index < len(self.ipv4) and self.ipv4[index] == key
+        return key in self.other
+
+    def ipv4_minus(self, other):
+        '''IPv4 integers of this set not in other, merge of the two sorted arrays'''
+        index = 0
+        for key in self.ipv4:
+            while index < len(other.ipv4) and other.ipv4[index] < key:
+                index += 1
+            if index >= len(other.ipv4) or other.ipv4[index] != key:
+                yield key
+
+    def diff(self, reference):
+        '''Entries missing from this set & extra in this set compared to a reference set
+        Returns:
+        missing - Sorted entry texts of reference not in this set, ex: a failed or stale feed refresh
+        extra - Sorted entry texts of this set not in reference
+        '''
+        missing = [key_text(key) for key in reference.ipv4_minus(self)]
+        missing += sorted(key_text(key) for key in reference.other - self.other)
+        extra = [key_text(key) for key in self.ipv4_minus(reference)]
+        extra += sorted(key_text(key) for key in self.other - reference.other)
+        return missing, extra
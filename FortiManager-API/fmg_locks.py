@@ -0,0 +1,312 @@
+#!/usr/bin/python
+'''Project: FortiManager ADOM Workspace Lock Manager
+   Details: Shared ADOM workspace locks for jobs that run many operations against the same ADOMs. FMGClient.workspace_lock
+            exits the whole program when the ADOM is locked by someone else (JSON code -11) & every job locked/unlocked on its own.
+            ADOMLockManager waits for a locked ADOM with backoff (one thread retries, other threads wanting the same ADOM queue
+            behind it), holds one lease per ADOM shared by every job using it (released when the last one is done),
+            sends a heartbeat for every held lease to keep the session & lock alive, and always unlocks through
+            context managers, even when the job raised an exception.
+   Date: 2026
+   Classes: ADOMLockManager, ADOMLease, LockTimeout, LockLost, LockShared
+   Python Version: 3.10.11
+   FortiManager Version: v7.0.8, should be compatible with 6.x & 7.x branch.
+   Usage:
+        from fmg_locks import ADOMLockManager
+        with ADOMLockManager(fmg, wait_timeout=600) as locks:
+            with locks.lock('ADOM1') as lease:
+                ...                                      #ADOM1 is locked, unlocked when the last user of the lease is done
+'''
+
+## Define Modules
+#For sleep between lock retries & lease times
+import time
+#Heartbeat thread & waiters per ADOM
+import threading
+#Context manager of a held lock
+from contextlib import contextmanager
+#For making HTTPS Connections to the FortiManager API Server
+import requests
+#Shared FortiManager API client
+from fmg_client import FMGError
+
+#JSON code returned when the ADOM is locked by another user/session
+LOCKED_CODE = -11
+#Fields of a _workspace/lockinfo entry identifying the lock holder, a lock lost & taken again (even by the same user) has a new lock_time
+LOCK_OWNER_FIELDS = ("lock_user", "lock_time")
+
+
+class LockTimeout(Exception):
+    '''ADOM stayed locked by another user longer than the wait timeout
+    Attributes:
+    adom - ADOM Name
+    error - Last FMGError returned by the lock request
+    '''
+    def __init__(self, adom, error=None):
+        self.adom = adom
+        self.error = error
+        super().__init__('ADOM %s is still locked by another user: %s' % (adom, error))
+
+
+class LockLost(Exception):
+    '''ADOM workspace lock of a lease is not held by this client anymore, ex: unlocked by an admin or taken over
+    Attributes:
+    adom - ADOM Name
+    owner - Lock holder when the lease locked the ADOM, tuple of LOCK_OWNER_FIELDS
+    current - Lock holder read by the heartbeat, None if the ADOM is not locked
+    '''
+    def __init__(self, adom, owner, current):
+        self.adom = adom
+        self.owner = owner
+        self.current = current
+        super().__init__('ADOM %s lock is not held anymore, locked by %s, now %s' % (adom, owner, current or 'not locked'))
+
+
+class LockShared(Exception):
+    '''ADOM can not be unlocked & locked again while other jobs share its lease, it would discard their changes too
+    Attributes:
+    adom - ADOM Name
+    refcount - Number of jobs using the lease
+    '''
+    def __init__(self, adom, refcount):
+        self.adom = adom
+        self.refcount = refcount
+        super().__init__('ADOM %s lease is shared by %d jobs, not relocking' % (adom, refcount))
+
+
+class ADOMLease:
+    '''A held ADOM workspace lock
+    Attributes:
+    adom - ADOM Name
+    refcount - Number of jobs using the lease, the ADOM is unlocked when it drops to 0
+    acquired - time.monotonic() when the lock was taken
+    renewed - time.monotonic() of the last successful heartbeat
+    error - Exception of the last failed heartbeat, None while the lease is healthy
+    owner - Lock holder read right after the lock was taken, tuple of LOCK_OWNER_FIELDS, None if it could not be read
+    '''
+    def __init__(self, adom):
+        self.adom = adom
+        self.refcount = 0
+        self.acquired = time.monotonic()
+        self.renewed = self.acquired
+        self.error = None
+        self.owner = None
+
+    @property
+    def healthy(self):
+        return self.error is None
+
+
+class ADOMLockManager:
+    '''Queue, share & renew ADOM workspace locks of one FortiManager session
+    Arguments:
+    fmg - Logged in FMGClient, shared with the jobs
+    retry_interval - Seconds before the first retry when the ADOM is locked by someone else
+    max_interval - Longest wait between retries
+    backoff - Multiply the wait by this after every retry
+    wait_timeout - Seconds to wait for a locked ADOM before raising LockTimeout, None waits forever
+    heartbeat - Seconds between heartbeats of the held leases, None turns the heartbeat thread off
+    '''
+    def __init__(self, fmg, retry_interval=1, max_interval=30, backoff=2, wait_timeout=None, heartbeat=60):
+        self.fmg = fmg
+        self.retry_interval = retry_interval
+        self.max_interval = max_interval
+        self.backoff = backoff
+        self.wait_timeout = wait_timeout
+        self.heartbeat = heartbeat
+        #Held leases, adom: ADOMLease
+        self.leases = {}
+        #ADOMs a thread is currently trying to lock, other threads wanting them wait for it
+        self.acquiring = set()
+        self.condition = threading.Condition()
+        self.closed = threading.Event()
+        self.thread = None
+
+    def try_lock(self, adom, wait_timeout):
+        '''Lock the ADOM on the FortiManager, retrying with backoff while it is locked by someone else.
+           Raises LockTimeout after wait_timeout, FMGError for any other error, ex: -6 ADOM does not exist
+        '''
+        start = time.monotonic()
+        interval = self.retry_interval
+        while True:
+            try:
+                self.fmg.workspace_call(adom, 'lock')
+                return
+            except FMGError as e:
+                if e.code != LOCKED_CODE:
+                    raise
+                elapsed = time.monotonic() - start
+                if wait_timeout is not None and elapsed >= wait_timeout:
+                    raise LockTimeout(adom, e)
+                wait = interval if wait_timeout is None else min(interval, wait_timeout - elapsed)
+                print ('--> ADOM %s is locked by another user, retrying in %.1f seconds' % (adom, wait))
+                if self.closed.wait(wait):
+                    raise LockTimeout(adom, e)
+                interval = min(interval * self.backoff, self.max_interval)
+
+    def acquire(self, adom, wait_timeout=None):
+        '''Take a lease on the ADOM, locking it on the FortiManager if no job holds it yet
+        Arguments:
+        adom - ADOM Name
+        wait_timeout - Seconds to wait for a locked ADOM, default is the manager wait_timeout
+
+        Returns:
+        lease - ADOMLease, give it back with release. Raises LockTimeout, FMGError or requests.exceptions.RequestException
+        '''
+        if wait_timeout is None:
+            wait_timeout = self.wait_timeout
+        with self.condition:
+            #Queue behind the thread already locking this ADOM
+            while adom in self.acquiring:
+                self.condition.wait()
+            lease = self.leases.get(adom)
+            if lease is not None:
+                lease.refcount += 1
+                return lease
+            self.acquiring.add(adom)
+        try:
+            self.try_lock(adom, wait_timeout)
+        except BaseException:
+            with self.condition:
+                self.acquiring.discard(adom)
+                self.condition.notify_all()
+            raise
+        #Lease is added before the queued threads wake up, so they share it instead of locking again
+        lease = ADOMLease(adom)
+        lease.owner = self.read_owner(adom)
+        with self.condition:
+            lease.refcount = 1
+            self.leases[adom] = lease
+            self.acquiring.discard(adom)
+            self.condition.notify_all()
+            print ('--> Locking ADOM %s' % adom)
+            self.start_heartbeat()
+        return lease
+
+    def release(self, adom):
+        '''Give back a lease, the ADOM is unlocked when the last job using it is done.
+           Raises FMGError or requests.exceptions.RequestException if the unlock failed, the lease is dropped anyway
+        '''
+        with self.condition:
+            lease = self.leases.get(adom)
+            if lease is None:
+                return
+            lease.refcount -= 1
+            if lease.refcount > 0:
+                return
+            del self.leases[adom]
+        print ('--> UnLocking ADOM %s' % adom)
+        self.fmg.workspace_call(adom, 'unlock')
+
+    def relock(self, adom):
+        '''Unlock then lock a held ADOM again, discards the changes not committed yet. The lease stays held.
+           Raises LockShared while other jobs share the lease, the unlock would discard their changes too.
+           Raises FMGError or requests.exceptions.RequestException if the ADOM could not be locked again
+        '''
+        with self.condition:
+            lease = self.leases.get(adom)
+            if lease is not None and lease.refcount > 1:
+                raise LockShared(adom, lease.refcount)
+        self.fmg.workspace_call(adom, 'unlock')
+        self.fmg.workspace_call(adom, 'lock')
+        owner = self.read_owner(adom)
+        with self.condition:
+            if lease is not None:
+                lease.owner = owner
+                lease.renewed = time.monotonic()
+                lease.error = None
+
+    @contextmanager
+    def lock(self, adom, wait_timeout=None):
+        '''Hold a lease on the ADOM for the with block, released even when the block raises
+        Arguments:
+        adom, wait_timeout - See acquire
+        '''
+        lease = self.acquire(adom, wait_timeout)
+        try:
+            yield lease
+        finally:
+            try:
+                self.release(adom)
+            except (requests.exceptions.RequestException, FMGError) as e:
+                print ('<-- Unable to unlock ADOM %s: %s' % (adom, e))
+
+    def lock_owner(self, adom):
+        '''Holder of the ADOM workspace lock from _workspace/lockinfo
+        Returns:
+        owner - Tuple of the LOCK_OWNER_FIELDS values, None if the ADOM is not locked.
+                Raises FMGError or requests.exceptions.RequestException
+        '''
+        json_url = "pm/config/adom/" + adom + "/_workspace/lockinfo"
+        http_code, json_resp = self.fmg.get(json_url)
+        status = json_resp['result'][0]['status']
+        if status['code'] != 0:
+            raise FMGError(status['code'], status['message'], json_url)
+        data = json_resp['result'][0].get('data')
+        for entry in data if isinstance(data, list) else [data]:
+            if isinstance(entry, dict) and entry.get(LOCK_OWNER_FIELDS[0]):
+                return tuple(entry.get(field) for field in LOCK_OWNER_FIELDS)
+        return None
+
+    def read_owner(self, adom):
+        '''lock_owner right after this client locked the ADOM, None if it could not be read (the first heartbeat reads it)'''
+        try:
+            return self.lock_owner(adom)
+        except (requests.exceptions.RequestException, FMGError) as e:
+            print ('<-- Unable to read ADOM %s lock info: %s' % (adom, e))
+            return None
+
+    def renew(self, lease):
+        '''Heartbeat of one lease, reads the ADOM lock info which keeps the session alive & checks the lock is still held by
+           the holder recorded when this client locked it. A lock lost or taken over sets lease.error to LockLost
+        '''
+        try:
+            owner = self.lock_owner(lease.adom)
+        except (requests.exceptions.RequestException, FMGError) as e:
+            lease.error = e
+            print ('<-- Heartbeat of ADOM %s lock failed: %s' % (lease.adom, e))
+            return
+        if lease.owner is None and owner is not None and lease.error is None:
+            #Lock info not read when the lock was taken, the lock is still held by this client
+            lease.owner = owner
+        if owner is None or owner != lease.owner:
+            lease.error = LockLost(lease.adom, lease.owner, owner)
+            print ('<-- Heartbeat of ADOM %s lock failed: %s' % (lease.adom, lease.error))
+            return
+        lease.error = None
+        lease.renewed = time.monotonic()
+
+    def start_heartbeat(self):
+        '''Start the heartbeat thread with the first lease, called with the condition held'''
+        if self.heartbeat is None or self.thread is not None:
+            return
+        self.thread = threading.Thread(target=self.run_heartbeat, name='fmg-adom-lock-heartbeat', daemon=True)
+        self.thread.start()
+
+    def run_heartbeat(self):
+        '''Heartbeat thread, renews every held lease each heartbeat seconds until close'''
+        while not self.closed.wait(self.heartbeat):
+            with self.condition:
+                leases = list(self.leases.values())
+            for lease in leases:
+                self.renew(lease)
+
+    def close(self):
+        '''Stop the heartbeat & lock waits, then unlock every ADOM still held'''
+        self.closed.set()
+        if self.thread is not None:
+            self.thread.join()
+        with self.condition:
+            adoms = list(self.leases)
+            self.leases = {}
+        for adom in adoms:
+            try:
+                print ('--> UnLocking ADOM %s' % adom)
+                self.fmg.workspace_call(adom, 'unlock')
+            except (requests.exceptions.RequestException, FMGError) as e:
+                print ('<-- Unable to unlock ADOM %s: %s' % (adom, e))
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
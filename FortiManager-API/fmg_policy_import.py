@@ -4,6 +4,14 @@
    Python Version: 3.7.4
    FortiManager Version: v6.2.3 on Azure, compatible and tested with v6.0.9 GA
    Purpose: Program to Import in a Fortigate/VDOM Device Policy into a FortiManager ADOM
+   Usage: Interactive, prompts for FortiManager, API User, ADOM, Device, VDOM & Policy Package:
+                python fmg_policy_import.py
+          Fleet import, every adom,device,vdom,package row of a CSV (or YAML) inventory. ADOMs are imported in parallel,
+          imports in the same ADOM one after the other, --max-tasks caps the import tasks running on the FortiManager.
+          Password from FMG_PASSWD or prompted, results are written to a Policy-Import-Results CSV:
+                python fmg_policy_import.py --host 1.1.1.1 --user apiuser --inventory imports.csv --adom-workers 4 --max-tasks 8
+          Add --checkpoint imports.jsonl to record every step & Task ID, rerun with the same file to resume after a failure:
+          saved imports are skipped, imports not saved yet are imported again after their running tasks finished.
 
    Instructions for Creating API User Account: 
         - Add an API user in your FortiManager
@@ -21,469 +29,674 @@
 ## Define Modules
 #For system calls like exit system, etc.
 import sys
-#For sleep command between tasks
+#For FMG_PASSWD & the results file timestamp
+import os
 import time
+#Command line options for the fleet import
+import argparse
+#Inventory & results files
+import csv
+#Checkpoint records of the import steps
+import json
+#ADOMs imported in parallel, global cap of running FortiManager tasks
+import threading
+from concurrent.futures import ThreadPoolExecutor
 #To use getpass to hide passwd when user is inputting it
 import getpass
 #For making HTTPS Connections to the FortiManager API Server
 import requests
-import urllib3
-#To ignore the FortiManager Self Signed Certificate warnings.
-urllib3.disable_warnings(urllib3.exceptions.InsecureRequestWarning)
-#To receive and format JSON requests as FortiManager uses JSON formatting in their API
-import json
+#Shared FortiManager API client, pooled HTTPS connection, session handling & ADOM workspace lock/unlock/commit
+from fmg_client import FMGClient, FMGError
+#Adaptive polling of FortiManager tasks
+from fmg_tasks import TaskWatcher, TaskMultiplexer, TaskTimeout, TaskFailed, TaskMissing, TASK_DONE, TASK_WARNING, task_state_name
+#Shared ADOM workspace locks of the fleet import, waits for locked ADOMs & always unlocks
+from fmg_locks import ADOMLockManager, LockTimeout, LockLost, LockShared
+#Optional, only needed for YAML inventory files
+try:
+    import yaml
+except ImportError:
+    yaml = None
 
+#Default seconds the fleet import waits for each step task, an unattended import must not hold its ADOM locks forever
+FLEET_STEP_DEADLINE = 3600
 
 ## Functions
-def fmg_login(hostAPIUSER, hostPASSWD, hostIP):
-    '''FortiManager Login & Create Session
+def print_task_status(taskID, task):
+    ''' Print the FortiManager task state & percentage, used as TaskWatcher on_progress callback
     Arguments:
-    hostAPIUSER - API User Account Name
-    hostPASSWD - API User Passwd
-    hostIP - IP addres of FortiManager. Note, if not on default HTTPS(443) port can input: 1.1.1.1:8080
+    taskID - The Task ID returned from JSON API Response json_resp['result'][0]['data']['task']
+    task - Task data returned by /task/task/<taskID>
+    '''
+    print ('<-- Task %s' % taskID)
+    print ('    Current task state (%d): %s' % (task['state'], task_state_name(task['state'])))
+    print (f'    Current task percentage: {task.get("tot_percent")}')
+
+def print_task_error(taskID, e):
+    ''' Print a failed task poll, used as TaskWatcher on_error callback. Polling continues '''
+    print (f'Request for Task ID {taskID} failed {SystemError(e)}')
+
+def status_taskid(fmg, taskID):
+    ''' FortiManager Status TaskID, print & return the task state
+    Arguments:
+    fmg - Logged in FMGClient
+    taskID - The Task ID returned from JSON API Response json_resp['result'][0]['data']['task']
+
+    Returns:
+    task - Task data, task['state'] & task['tot_percent'], None if the request failed
     '''
-    #Global Save Session ID
-    global session
-    #Create HTTPS URL
-    global url
-    url = 'https://' + hostIP + '/jsonrpc'
-    #JSON Body to sent to API request
-    body = {
-    "id": 1,
-            "method": "exec",
-            "params": [{
-                    "url": "sys/login/user",
-                    "data": [{
-                            "user": hostAPIUSER,
-                            "passwd": hostPASSWD
-                    }]
-            }],
-            "session": 1
-    }
-    #Test HTTPS connection to host then Capture and output any errors
     try:
-        r = requests.post(url, json=body, verify=False)
-    except requests.exceptions.RequestException as e: 
-        print (SystemError(e))
-        #Exit Program, Connection was not Successful
-        sys.exit(1)
-    #Save JSON response from FortiManager
-    json_resp = json.loads(r.text)
-    #Check if User & Passwd was valid, no code -11 means invalid
-    if json_resp['result'][0]['status']['code'] != -11:
-        session = json_resp['session']
-        print ('--> Logging into FortiManager: %s' % hostIP)
-        #HTTP & JSON code & message
-        print ('<-- HTTPcode: %d JSONmesg: %s' % (r.status_code, json_resp['result'][0]['status']['message']))
-        print
-    else:
-        print ('<--Username or password is not valid, please try again, exiting...')
-        #HTTP & JSON code & message
-        print ('<-- HTTPcode: %d JSONmesg: %s' % (r.status_code, json_resp['result'][0]['status']['message']))
-        print
-        #Exit Program, Username or Password is not valided or internal FortiManager error review Hcode & Jmesg
-        sys.exit(1)
-
-def fmg_logout(hostIP):
-    '''FortiManager logout
+        task = TaskWatcher(fmg).status(taskID)
+    except (requests.exceptions.RequestException, FMGError) as e:
+        print_task_error(taskID, e)
+        return None
+    print_task_status(taskID, task)
+    return task
+
+def poll_taskid (fmg, taskID, deadline=None):
+    ''' FortiManager poll task until it is finished, polls fast at first then backs off for long tasks.
     Arguments:
-    hostIP - IP addres of FortiManager. Note, if not on default HTTPS(443) port can input: 1.1.1.1:8080
+    fmg - Logged in FMGClient
+    taskID - The Task ID returned from JSON API Response json_resp['result'][0]['data']['task']
+    deadline - Seconds to wait for the task, None waits until it finishes
+
+    Returns:
+    state - Final task state, 4 is done
     '''
-    body = {
-       "id": 1,
-        "method": "exec",
-        "params": [{
-                "url": "sys/logout"
-        }],
-        "session": session
-    }
-    #Test HTTPS connection to host then Capture and output any errors
+    print ('--> Polling task: %s' % taskID)
+    watcher = TaskWatcher(fmg, deadline=deadline, on_progress=print_task_status, on_error=print_task_error)
     try:
-        r = requests.post(url, json=body, verify=False)
-    except requests.exceptions.RequestException as e:
-        print (SystemError(e))
-        #Exit Program, Connection was not Successful
-        sys.exit(1)
-    #Save JSON response from FortiManager    
-    json_resp = json.loads(r.text)
-    #Check if any API Errors returned
-    if json_resp['result'][0]['status']['code'] != -11:
+        task = watcher.wait(taskID)
+    except TaskTimeout:
+        print ('--> Task %s did not finish in %s seconds, check FMG task manager for details!' % (taskID, deadline))
         print ()
-        print ('--> Logging out of FMG: %s' % hostIP)
-        #HTTP & JSON code & message
-        print ('<-- HTTPcode: %d JSONmesg: %s' % (r.status_code, json_resp['result'][0]['status']['message']))
+        return None
+    if task['state'] == TASK_DONE:
+        print ('--> Task %s is done!' % taskID)
         print ()
     else:
+        print ('--> Task %s is DIRTY, check FMG task manager for details!' % taskID)
         print ()
-        print ('<--Error Occured, check Hcode & Jmesg')
-        #Exit Program, internal FortiManager error review Hcode & Jmesg
-        print ('<-- HTTPcode: %d JSONmesg: %s' % (r.status_code, json_resp['result'][0]['status']['message']))
-        print ()
-        sys.exit(1)   
+    return task['state']
 
-def workspace_lock(lADOM):
-    '''FortiManager Lock/Acquire ADOM 
-    Arguments:
-    lADOM - ADOM Name to Lock/Acquire
-    '''
-    #API Call
-    json_url = "pm/config/adom/" + lADOM + "/_workspace/lock"
-    body = {
-    	"id": 1,
-    	"method": "exec",
-    	"params": [{
-    		"url": json_url
-    	}],
-    	"session": session
-    }
-    try:
-        r = requests.post(url, json=body, verify=False)
-    except requests.exceptions.RequestException as e: 
-        print (SystemError(e))
-        #Exit Program, Connection was not Successful
-        sys.exit(1)
-    #Save JSON response from FortiManager
-    json_resp = json.loads(r.text)
-    #Check no code -11 means valid
-    if json_resp['result'][0]['status']['code'] == -6:
-        print(f'<-- Unable to Lock ADOM, ADOM name {lADOM} does not exist. Please check name & case sensitivity')
-        print('<-- JSONmesg API output %s' % json_resp['result'][0]['status'])
-        print
-        #Exit Program, Unable to Lock ADOM
-        sys.exit(1)
-    elif json_resp['result'][0]['status']['code'] != -11:
-        print ('--> Locking ADOM %s' % lADOM)
-        print ('<-- HTTPcode: %d JSONmesg: %s' % (r.status_code, json_resp['result'][0]['status']['message']))
-        print
-    else:
-        print (f'<-- Unable to Lock ADOM {lADOM}, ADOM might be locked by a user, please check following JSONmesg for reason, exiting...')
-        #HTTP & JSON code & message
-        print ('<-- HTTPcode: %d JSONmesg: %s' % (r.status_code, json_resp['result'][0]['status']['message']))
-        print
-        #Exit Program, Unable to Lock ADOM
-        sys.exit(1)
-
-def workspace_unlock(uADOM):
-    '''FortiManager unlock  ADOM 
-    Arguments:
-    uADOM - ADOM Name to unlock
-    '''
-    #API Call
-    json_url = "pm/config/adom/" + uADOM + "/_workspace/unlock"
-    body = {
-    	"id": 1,
-    	"method": "exec",
-    	"params": [{
-    		"url": json_url
-    	}],
-    	"session": session
-    }
-    try:
-        r = requests.post(url, json=body, verify=False)
-    except requests.exceptions.RequestException as e: 
-        print (SystemError(e))
-        #Exit Program, Connection was not Successful
-        sys.exit(1)
-    #Save JSON response from FortiManager
-    json_resp = json.loads(r.text)
-    #Check if no code -11 means valid
-    if json_resp['result'][0]['status']['code'] != -11:
-        print ('--> UnLocking ADOM %s' % uADOM)
-        print ('<-- HTTPcode: %d JSONmesg: %s' % (r.status_code, json_resp['result'][0]['status']['message']))
-        print
-    else:
-        print (f'<--Unable to unlock ADOM {uADOM}, please check following JSONmesg for reason, exiting...')
-        #HTTP & JSON code & message
-        print ('<-- HTTPcode: %d JSONmesg: %s' % (r.status_code, json_resp['result'][0]['status']['message']))
-        print
-        #Exit Program, Unable to Lock ADOM
-        sys.exit(1)
-
-def workspace_commit(cADOM):
-    '''FortiManager Commit/Save Changes to ADOM
-    Arguments:
-    cADOM - ADOM Name to Save Changes
-    '''
-    #API Call
-    json_url = "pm/config/adom/" + cADOM + "/_workspace/commit"
-    body = {
-    	"id": 1,
-    	"method": "exec",
-    	"params": [{
-    		"url": json_url
-    	}],
-    	"session": session
-    }
-    try:
-        r = requests.post(url, json=body, verify=False)
-    except requests.exceptions.RequestException as e: 
-        print (SystemError(e))
-        #Exit Program, Connection was not Successful
-        sys.exit(1)
-    #Save JSON response from FortiManager
-    json_resp = json.loads(r.text)
-    #Check if no code -11 means valid
-    if json_resp['result'][0]['status']['code'] != -11:
-        print ('--> Saving Changes to ADOM %s' % cADOM)
-        print ('<-- HTTPcode: %d JSONmesg: %s' % (r.status_code, json_resp['result'][0]['status']['message']))
-        print
-    else:
-        print (f'<--Unable to Save Changes to ADOM {cADOM}, please check following JSONmesg for reason, will continue...')
-        #HTTP & JSON code & message
-        print ('<-- HTTPcode: %d JSONmesg: %s' % (r.status_code, json_resp['result'][0]['status']['message']))
-        print
-        pass
-
-def status_taskid(taskID):
-    ''' FortiManager Status TaskID Definiations & Actions
+#Policy Package import steps in order: (import_action, step message, add_mappings)
+IMPORT_STEPS = [
+    ('policy_search', 'Step 1 - Policy Search for all Objects', True),
+    ('obj_search', 'Step 2 - Import in Dynamic Object Mappings', True),
+    ('do', 'Step 3 - Import policy & dependant dynamic interfaces & objects', False)
+]
+
+def start_import_step(fmg, piADOM, piDEVICE, piPACKNAME, piVDOM, import_action, add_mappings=True):
+    ''' Start one step of the Policy Package import, raises FMGError instead of exiting so many imports can run
     Arguments:
-    taskID - The Task ID returned from JSON API Response json_resp['result'][0]['data']['task']
+    fmg - Logged in FMGClient
+    piADOM, piDEVICE, piPACKNAME, piVDOM - See policy_import
+    import_action - Import step: policy_search, obj_search or do
+    add_mappings - Add dynamic interface & object mappings, used by the policy_search & obj_search steps
+
+    Returns:
+    taskID - Task ID of the step, poll it with poll_taskid or a TaskMultiplexer
     '''
-    #Set Global State in order to track the State of the task
-    global state
-    #API Call to pull Task Status based on taskID
-    json_url = "/task/task/" + str(taskID)
-    body = {
-        "id": 1,
-        "method": "get",
-        "params": [{
-            "url": json_url
-        }],
-        "session": session
+    # API URL to start Import Object
+    json_url = "/securityconsole/import/dev/objs"
+    data = {
+        "adom": piADOM,
+        "dst_name": piPACKNAME,
+        "if_all_policy": "enable",
+        "import_action": import_action,
+        "name": piDEVICE,
+        "vdom": piVDOM,
+        "if_all_objs": "all"
     }
-    #Test HTTPS connection to host then Capture and output any errors
-    try:
-        r = requests.post(url, json=body, verify=False)
-    except requests.exceptions.RequestException as e:
-                print (f'Request for Task ID failed {SystemError(e)}')
-    #Save Response from JSON Request
-    json_resp = json.loads(r.text)
-    #No code -11 means valid
-    if json_resp['result'][0]['status']['code'] != -11:
-        print ('<-- HTTPcode: %d JSONmesg: %s' % (r.status_code, json_resp['result'][0]['status']['message']))
-        print
-        state = json_resp['result'][0]['data']['state']
-        totalPercent = json_resp['result'][0]['data']['tot_percent']
-        if state == 0:
-            print ('    Current task state (%d): pending' % state)
-        if state == 1:
-            print ('    Current task state (%d): running' % state)
-        if state == 2:
-            print ('    Current task state (%d): cancelling' % state)
-        if state == 3:
-            print ('    Current task state (%d): cancelled' % state)
-        if state == 4:
-            print ('    Current task state (%d): done' % state)
-        if state == 5:
-            print ('    Current task state (%d): error' % state)
-        if state == 6:
-            print ('    Current task state (%d): aborting' % state)
-        if state == 7:
-            print ('    Current task state (%d): aborted' % state)
-        if state == 8:
-            print ('    Current task state (%d): warning' % state)
-        if state == 9:
-            print ('    Current task state (%d): to_continue' % state)
-        if state == 10:
-            print ('    Current task state (%d): unknown' % state)
-        if json_resp['result'][0]['status']['message'] == 'OK':
-            print (f'    Current task percentage: {totalPercent}')
-            print
-    else:
-        print ('Error, Request for Task ID failed JSON code -11')
-        print ('<-- HTTPcode: %d JSONmesg: %s' % (r.status_code, json_resp['result'][0]['status']['message']))
-        print        
+    if add_mappings:
+        data['add_mappings'] = 'enable'
+    http_code, json_resp = fmg.execute(json_url, data=data)
+    status = json_resp['result'][0]['status']
+    if status['code'] != 0:
+        raise FMGError(status['code'], status['message'], json_url)
+    return json_resp['result'][0]['data']['task']
 
-def poll_taskid (taskID):
-    ''' FortiManager poll task, then call function status_taskid to check the message.
+
+class ImportCheckpoint:
+    '''JSON-lines checkpoint of the import steps, so a rerun after a failure or network blip continues where it stopped.
+       Every step start (with its Task ID), step finish, failed import, import waiting for the ADOM commit, ADOM commit
+       & rollback is appended as one JSON line & flushed.
+       On a rerun, imports already committed are skipped & failed imports run again. The changes of an import not committed were lost with the
+       workspace of the earlier run, so it is rolled back when the checkpoint is read & all its steps run again, after
+       waiting for its tasks the earlier run left running. Safe to share between threads.
     Arguments:
-    taskID - The Task ID returned from JSON API Response json_resp['result'][0]['data']['task']
+    file_name - Checkpoint file, read if it exists then appended to
     '''
-    global state
-    state = 0
-    while state not in [3,4,5,7]:
-        print ('--> Polling task: %s' % taskID)
-        time.sleep( 3 )
-        status_taskid(taskID)
-    if state == 4:
-        print ('--> Task %s is done!' % taskID)
-        print
-    else:
-        print ('--> Task %s is DIRTY, check FMG task manager for details!' % taskID)
-        print
+    def __init__(self, file_name):
+        self.file_name = file_name
+        self.lock = threading.Lock()
+        #(adom, device, vdom, package): {'steps': {import_action: {'task': taskID, 'state': task state}}, 'imported': bool, 'committed': bool,
+        #                                'failed': import_action or None}
+        #imported is an import whose steps finished, waiting for a deferred ADOM commit (CommitCoalescer)
+        #failed is the step that did not finish (error, aborted, etc.), its changes were discarded
+        self.imports = {}
+        records = ''
+        if os.path.exists(file_name):
+            with open(file_name) as checkpoint_file:
+                records = checkpoint_file.read()
+        for line in records.splitlines():
+            try:
+                self.apply(json.loads(line))
+            except ValueError:
+                #Empty line or last line cut short when the run was stopped while writing it
+                continue
+        self.checkpoint_file = open(file_name, 'a')
+        #Start the next record on its own line after a line cut short
+        if records and not records.endswith('\n'):
+            self.checkpoint_file.write('\n')
+        #Steps of the imports not committed are not done, only their running tasks are kept to wait for them
+        self.stale_tasks = {}
+        lost = [key for key, entry in self.imports.items() if entry['imported'] and not entry['committed']]
+        if lost:
+            print ('--> %d imports were waiting for their ADOM commit when the earlier run stopped, importing them again' % len(lost))
+        failed = [key for key, entry in self.imports.items() if entry['failed']]
+        if failed:
+            print ('--> %d imports failed in an earlier run, importing them again' % len(failed))
+        for key, entry in list(self.imports.items()):
+            if entry['steps'] and not entry['committed']:
+                tasks = [step.get('task') for step in entry['steps'].values() if step.get('state') is None and step.get('task') is not None]
+                if tasks:
+                    self.stale_tasks[key] = tasks
+                self.record(key, 'rolled_back', reason='not committed by an earlier run')
 
-def policy_import(piADOM, piDEVICE,  piPACKNAME, piVDOM):
+    def apply(self, record):
+        '''Update the import states with one checkpoint record'''
+        key = (record['adom'], record['device'], record['vdom'], record['package'])
+        entry = self.imports.setdefault(key, {'steps': {}, 'imported': False, 'committed': False, 'failed': None})
+        event = record['event']
+        if event == 'started':
+            entry['steps'][record['step']] = {'task': record['task'], 'state': None}
+            entry['committed'] = False
+            entry['failed'] = None
+        elif event == 'finished':
+            entry['steps'].setdefault(record['step'], {'task': record.get('task')})['state'] = record['state']
+        elif event == 'failed':
+            #Changes of the failed import are discarded, nothing of it is kept
+            entry['steps'] = {}
+            entry['imported'] = False
+            entry['committed'] = False
+            entry['failed'] = record['step']
+        elif event == 'imported':
+            entry['imported'] = True
+        elif event == 'committed':
+            entry['imported'] = False
+            entry['committed'] = True
+        elif event == 'rolled_back':
+            entry['steps'] = {}
+            entry['imported'] = False
+            entry['committed'] = False
+
+    def record(self, key, event, **fields):
+        '''Append one checkpoint record & flush it to disk'''
+        adom, device, vdom, package = key
+        record = {'time': time.strftime("%Y-%m-%d %H:%M:%S"), 'adom': adom, 'device': device, 'vdom': vdom, 'package': package, 'event': event}
+        record.update(fields)
+        with self.lock:
+            self.apply(record)
+            self.checkpoint_file.write(json.dumps(record) + '\n')
+            self.checkpoint_file.flush()
+            os.fsync(self.checkpoint_file.fileno())
+
+    def started(self, key, import_action, taskID):
+        self.record(key, 'started', step=import_action, task=taskID)
+
+    def finished(self, key, import_action, taskID, state):
+        self.record(key, 'finished', step=import_action, task=taskID, state=state)
+
+    def failed(self, key, import_action, taskID, state):
+        self.record(key, 'failed', step=import_action, task=taskID, state=state)
+
+    def imported(self, key):
+        self.record(key, 'imported')
+
+    def committed(self, keys):
+        for key in keys:
+            self.record(key, 'committed')
+
+    def rolled_back(self, keys):
+        for key in keys:
+            self.record(key, 'rolled_back')
+
+    def stale(self, key):
+        '''Task IDs an earlier run started for the import & did not see finish, returned once'''
+        with self.lock:
+            return self.stale_tasks.pop(key, [])
+
+    def is_committed(self, key):
+        with self.lock:
+            return self.imports.get(key, {}).get('committed', False)
+
+    def close(self):
+        with self.lock:
+            self.checkpoint_file.close()
+
+
+def policy_import(fmg, piADOM, piDEVICE,  piPACKNAME, piVDOM, checkpoint=None):
     ''' FortiManager Import Policy, if existing with the same name will Overwrite by default
     Arguments:
+    fmg - Logged in FMGClient
     piADOM - ADOM where the device/VDOM exist you want to import policy
     piDEVICE - FortiGate Device 
     piVDOM - VDOM in ADOM if available, if not set value to 'root', FortiManager will ignore it.
     piPACKNAME - Policy Package Name you want to call. If an existing Policy Package name exist, it will overwrite by default.
+    checkpoint - Optional ImportCheckpoint, imports saved in an earlier run are skipped
     '''
-    ''' Step 1 - Policy Search Objects '''
+    key = (piADOM, piDEVICE, piVDOM, piPACKNAME)
+    if checkpoint is not None and checkpoint.is_committed(key):
+        print('--> Policy Package Import already done & saved in an earlier run, see checkpoint %s' % checkpoint.file_name)
+        return
+    #Import steps of an earlier run were not saved, wait for its tasks still running before importing again
+    for taskID in checkpoint.stale(key) if checkpoint is not None else []:
+        print ('--> Waiting for Task ID %s of an earlier run, its changes were not saved & are imported again' % taskID)
+        poll_taskid(fmg, taskID)
     print()
     print('--> Starting Policy Package Import...')
-    print('--> Step 1 - Policy Search for all Objects...')
-    # API URL to start Import Object
-    json_url = "/securityconsole/import/dev/objs"
-
-    body = {
-        "id": 1,
-        "method": "exec",
-        "params": [{
-                "url": json_url,
-                "data": {
-                    "adom": piADOM,
-                    "dst_name": piPACKNAME,
-                    "if_all_policy": "enable",
-                    "import_action": "policy_search",
-                    "name": piDEVICE,
-                    "vdom": piVDOM,
-                    "if_all_objs": "all",
-                    "add_mappings": "enable"
-                    }
-        }],
-        "session": session
-    }
-    try:
-        r = requests.post(url, json=body, verify=False)
-    except requests.exceptions.RequestException as e: 
-        print (SystemError(e))
-    json_resp = json.loads(r.text)
-    if json_resp['result'][0]['status']['code'] != -11:
-        taskID = json_resp['result'][0]['data']['task']
+    for import_action, step_message, add_mappings in IMPORT_STEPS:
         print ()
-        print ('--> Perform dynamic interface mapping for  VDOM %s to  ADOM %s' % (piVDOM, piADOM))
-        print ('<-- Hcode: %d Jmesg: %s' % (r.status_code, json_resp['result'][0]['status']['message']))
+        print ('--> %s...' % step_message)
+        try:
+            taskID = start_import_step(fmg, piADOM, piDEVICE, piPACKNAME, piVDOM, import_action, add_mappings)
+        except requests.exceptions.RequestException as e:
+            print (SystemError(e))
+            #Exit Program, Connection was not Successful
+            sys.exit(1)
+        except FMGError as e:
+            print ('<--Error, unable to get API Request %s, exiting...' % step_message)
+            #JSON code & message
+            print ('<-- JSONcode: %s JSONmesg: %s' % (e.code, e.message))
+            print ()
+            #Roll back the steps already done, unlock without Save/Commit discards them
+            fmg.workspace_unlock(piADOM)
+            if checkpoint is not None:
+                checkpoint.rolled_back([key])
+            #Exit Program
+            sys.exit(1)
+        if checkpoint is not None:
+            checkpoint.started(key, import_action, taskID)
+        print ('--> %s for VDOM %s to ADOM %s' % (import_action, piVDOM, piADOM))
         print ("Task ID: " + str(taskID))
         print ()
-        time.sleep( 0.3 )
-        poll_taskid(taskID)
-        workspace_commit(piADOM)
-    else:
-        print ('<--Error, unable to get API Request Step1 policy_search, existing...')
-        #HTTP & JSON code & message
-        print ('<-- HTTPcode: %d JSONmesg: %s' % (r.status_code, json_resp['result'][0]['status']['message']))
-        print ()
-        #Exit Program
-        sys.exit(1)
+        state = poll_taskid(fmg, taskID)
+        if checkpoint is not None and state is not None:
+            checkpoint.finished(key, import_action, taskID, state)
+        #Warning is a finished step with warnings, any other state (error, aborted, etc.) stops the import before the next step
+        if state not in (TASK_DONE, TASK_WARNING):
+            print ('<--Error, %s did not finish (%s), exiting...' % (step_message, task_state_name(state)))
+            print ()
+            #Roll back the steps already done, unlock without Save/Commit discards them
+            fmg.workspace_unlock(piADOM)
+            if checkpoint is not None:
+                checkpoint.failed(key, import_action, taskID, state)
+            #Exit Program
+            sys.exit(1)
+    #Save/Commit Changes once for the three steps
+    fmg.workspace_commit(piADOM)
+    if checkpoint is not None:
+        checkpoint.committed([key])
 
-    ''' Step 2 Import in Dynamic Object Mappings '''
-    print ()
-    print ('--> Step 2 Moving to import dynamic objects mappings...')
-    ##import dynamic objects mappings
-    body = {
-    "id": 1,
-            "method": "exec",
-            "params": [{
-                    "url": json_url,
-                    "data": {
-                            "adom": piADOM,
-                            "dst_name": piPACKNAME,
-                            "if_all_policy": "enable",
-                            "import_action": "obj_search",
-                            "name": piDEVICE,
-                            "vdom": piVDOM,
-                            "if_all_objs": "all",
-                            "add_mappings": "enable"
-                    }
-            }],
-            "session": session
-    }
-    try:
-        r = requests.post(url, json=body, verify=False)
-    except requests.exceptions.RequestException as e: 
-        print (SystemError(e))
-    # Save JSON Response
-    json_resp = json.loads(r.text)
-    if json_resp['result'][0]['status']['code'] != -11:
-        taskID = json_resp['result'][0]['data']['task']
-        print ()
-        print ('--> Perform dynamic object mappings for  VDOM %s to  ADOM %s' % (piVDOM, piADOM))
-        print ('<-- Hcode: %d Jmesg: %s' % (r.status_code, json_resp['result'][0]['status']['message']))
-        print ()
-        time.sleep( 0.3 )
-        poll_taskid(taskID)
-        workspace_commit(piADOM)
+
+## Fleet import, many Device/VDOMs from an inventory file
+class ImportJob:
+    '''One Device/VDOM Policy Package import of a fleet import
+    Attributes:
+    adom, device, vdom, package - Inventory entry, see policy_import
+    status - pending, running, imported (waiting for the ADOM commit), done or failed
+    step - Last import step started, ex: obj_search
+    error - Reason the import failed
+    '''
+    def __init__(self, adom, device, vdom='root', package=''):
+        self.adom = adom
+        self.device = device
+        self.vdom = vdom or 'root'
+        self.package = package
+        self.status = 'pending'
+        self.step = ''
+        self.error = ''
+
+    @property
+    def key(self):
+        '''Checkpoint key of the job'''
+        return (self.adom, self.device, self.vdom, self.package)
+
+    def __repr__(self):
+        return 'ImportJob(%s, %s, %s, %s)' % (self.adom, self.device, self.vdom, self.package)
+
+
+def load_inventory(file_name):
+    ''' Read the fleet import inventory, CSV or YAML file with the columns/keys adom, device, vdom & package
+        CSV:  adom,device,vdom,package
+              ADOM1,FGT-01,root,FGT-01_pkg
+        YAML: - {adom: ADOM1, device: FGT-01, vdom: root, package: FGT-01_pkg}
+    Arguments:
+    file_name - Inventory file, .yml/.yaml is read as YAML (needs PyYAML), anything else as CSV. vdom defaults to root
+
+    Returns:
+    jobs - List of ImportJob in inventory order
+    '''
+    if file_name.lower().endswith(('.yml', '.yaml')):
+        if yaml is None:
+            raise RuntimeError('PyYAML is needed for YAML inventory files, pip install pyyaml or use a CSV file')
+        with open(file_name) as inventory_file:
+            entries = yaml.safe_load(inventory_file) or []
+        #Allow the list under an imports key
+        if isinstance(entries, dict):
+            entries = entries.get('imports', [])
     else:
-        print ('<--Error, unable to get API Request Step2 mport in Dynamic Object Mappings, existing...')
-        #HTTP & JSON code & message
-        print ('<-- HTTPcode: %d JSONmesg: %s' % (r.status_code, json_resp['result'][0]['status']['message']))
-        print ()
-        #Exit Program
-        sys.exit(1)
+        with open(file_name, newline='') as inventory_file:
+            entries = list(csv.DictReader(inventory_file))
+    jobs = []
+    for entry in entries:
+        entry = {str(key).strip().lower(): str(value).strip() for key, value in entry.items() if value is not None}
+        if not entry.get('adom') or not entry.get('device') or not entry.get('package'):
+            raise ValueError('Inventory entry needs adom, device & package: %s' % entry)
+        jobs.append(ImportJob(entry['adom'], entry['device'], entry.get('vdom'), entry['package']))
+    return jobs
 
-    ''' Step 3 Moving to import policy & dependant dynamic interfaces & objects '''
-    print ()
-    print ('--> Step 3 - Moving to importing policy & dependant dynamic interfaces & objects...')
-	##importing policy & dependant dynamic interfaces & Objects
-    body = {
-    "id": 1,
-            "method": "exec",
-            "params": [{
-                    "url": json_url,
-                    "data": {
-                            "adom": piADOM,
-                            "dst_name": piPACKNAME,
-                            "if_all_policy": "enable",
-                            "import_action": "do",
-                            "name": piDEVICE,
-                            "vdom": piVDOM,
-                            "if_all_objs": "all"
-                    }
-            }],
-            "session": session
-    }
+
+class CommitCoalescer:
+    '''Defer & coalesce the ADOM workspace commits of the imports done under one ADOM lock.
+       Every commit is a FortiManager database write, committing after each import step does 3 commits per import.
+       Imports are added when their three steps finished, they are committed together once per lock session (flush),
+       or every every_imports imports / every_seconds seconds, checked when an import is added.
+       rollback discards the changes not committed yet by unlocking the ADOM without commit, then locks it again.
+    Arguments:
+    fmg - Logged in FMGClient
+    adom - ADOM Name, must already be locked
+    every_imports - Commit when this many imports are waiting, 0 only commits on flush
+    every_seconds - Commit when this many seconds passed since the last commit, None only commits on flush/every_imports
+    checkpoint - Optional ImportCheckpoint, commits & rollbacks are recorded in it
+    locks - Optional ADOMLockManager holding the ADOM lease, rollback relocks through it
+    '''
+    def __init__(self, fmg, adom, every_imports=0, every_seconds=None, checkpoint=None, locks=None):
+        self.fmg = fmg
+        self.checkpoint = checkpoint
+        self.locks = locks
+        self.adom = adom
+        self.every_imports = every_imports
+        self.every_seconds = every_seconds
+        #Imports done but not committed yet
+        self.pending = []
+        self.last_commit = time.monotonic()
+        self.commits = 0
+
+    def add(self, job):
+        '''Add an import whose steps finished, commits if every_imports or every_seconds is reached.
+           Raises FMGError or requests.exceptions.RequestException if the commit failed, the import stays pending
+        '''
+        job.status = 'imported'
+        self.pending.append(job)
+        #Pending commit, a rerun imports it again unless the commit record follows
+        if self.checkpoint is not None:
+            self.checkpoint.imported(job.key)
+        if self.every_imports and len(self.pending) >= self.every_imports:
+            self.flush()
+        elif self.every_seconds is not None and time.monotonic() - self.last_commit >= self.every_seconds:
+            self.flush()
+
+    def flush(self):
+        '''Commit the pending imports in one workspace commit, raises like add'''
+        if not self.pending:
+            return
+        self.fmg.workspace_call(self.adom, 'commit')
+        print ('--> Saving Changes to ADOM %s, %d imports' % (self.adom, len(self.pending)))
+        for job in self.pending:
+            job.status = 'done'
+        if self.checkpoint is not None:
+            self.checkpoint.committed([job.key for job in self.pending])
+        self.pending = []
+        self.last_commit = time.monotonic()
+        self.commits += 1
+
+    def rollback(self, failed=()):
+        '''Discard every change not committed yet, unlock the ADOM without commit then lock it again.
+           Raises FMGError or requests.exceptions.RequestException if the ADOM could not be locked again,
+           LockShared if other jobs share the ADOM lease as their changes would be discarded too
+        Arguments:
+        failed - Failed imports whose steps are discarded too, for the checkpoint
+
+        Returns:
+        jobs - The imports that were waiting for a commit & are now discarded
+        '''
+        #Recorded first, a rerun redoing imports that were not discarded is safe, skipping discarded ones is not
+        if self.checkpoint is not None:
+            self.checkpoint.rolled_back([job.key for job in self.pending + list(failed)])
+        if self.locks is not None:
+            self.locks.relock(self.adom)
+        else:
+            self.fmg.workspace_call(self.adom, 'unlock')
+            self.fmg.workspace_call(self.adom, 'lock')
+        discarded = self.pending
+        self.pending = []
+        print ('--> Rolled back ADOM %s, %d uncommitted imports discarded' % (self.adom, len(discarded)))
+        return discarded
+
+
+def run_import_job(fmg, job, mux, task_slots, deadline=None, checkpoint=None):
+    ''' Run the three import steps of one job, the ADOM must already be locked. Changes are not committed, see CommitCoalescer.
+        Raises FMGError, TaskFailed, TaskTimeout, TaskMissing or requests.exceptions.RequestException when a step fails
+    Arguments:
+    fmg - Logged in FMGClient
+    job - ImportJob
+    mux - TaskMultiplexer shared by all ADOMs, one task/task poll for every running step
+    task_slots - Semaphore capping the number of FortiManager tasks running at once
+    deadline - Seconds to wait for each step task, None waits until it finishes
+    checkpoint - Optional ImportCheckpoint, the steps are recorded in it
+    '''
+    job.status = 'running'
+    #Import steps of an earlier run were not saved, wait for its tasks still running before importing again
+    for taskID in checkpoint.stale(job.key) if checkpoint is not None else []:
+        print ('--> ADOM %s Device %s VDOM %s, waiting for Task ID %s of an earlier run' % (job.adom, job.device, job.vdom, taskID))
+        try:
+            mux.wait(taskID, deadline)
+        except TaskMissing:
+            #Task purged from the FortiManager, it is not running anymore
+            pass
+    for import_action, step_message, add_mappings in IMPORT_STEPS:
+        job.step = import_action
+        with task_slots:
+            taskID = start_import_step(fmg, job.adom, job.device, job.package, job.vdom, import_action, add_mappings)
+            if checkpoint is not None:
+                checkpoint.started(job.key, import_action, taskID)
+            print ('--> ADOM %s Device %s VDOM %s %s, Task ID: %s' % (job.adom, job.device, job.vdom, import_action, taskID))
+            task = mux.wait(taskID, deadline)
+        if checkpoint is not None:
+            checkpoint.finished(job.key, import_action, taskID, task['state'])
+        #Warning is a finished import with warnings, same as the interactive import it continues
+        if task['state'] not in (TASK_DONE, TASK_WARNING):
+            if checkpoint is not None:
+                checkpoint.failed(job.key, import_action, taskID, task['state'])
+            raise TaskFailed(taskID, task)
+
+
+def fail_jobs(jobs, error):
+    ''' Mark import jobs failed with the reason '''
+    for job in jobs:
+        job.status = 'failed'
+        job.error = error
+
+
+def run_adom_jobs(fmg, adom, jobs, mux, task_slots, locks, deadline=None, commit_every=0, commit_seconds=None, checkpoint=None):
+    ''' Lock an ADOM, run its import jobs one after the other, commit them through a CommitCoalescer, then unlock.
+        A failed import rolls back the uncommitted changes, the imports discarded with it are run again once.
+        A failed job does not stop the next one.
+    Arguments:
+    fmg - Logged in FMGClient
+    adom - ADOM Name
+    jobs - ImportJobs of this ADOM
+    mux, task_slots, deadline - See run_import_job
+    locks - ADOMLockManager, waits while the ADOM is locked by another user & always unlocks when done
+    commit_every, commit_seconds - See CommitCoalescer every_imports & every_seconds
+    checkpoint - Optional ImportCheckpoint, imports committed in an earlier run are skipped
+    '''
+    errors = (requests.exceptions.RequestException, FMGError, TaskFailed, TaskTimeout, TaskMissing)
+    if checkpoint is not None:
+        for job in jobs:
+            if checkpoint.is_committed(job.key):
+                job.status = 'done'
+                job.error = 'done in an earlier run'
+        jobs = [job for job in jobs if job.status != 'done']
+        if not jobs:
+            return
+    coalescer = CommitCoalescer(fmg, adom, commit_every, commit_seconds, checkpoint, locks)
+    queue = list(jobs)
+    #Jobs already run again after a rollback, a second rollback fails them instead of looping
+    rerun = set()
     try:
-        r = requests.post(url, json=body, verify=False)
-    except requests.exceptions.RequestException as e: 
-        print (SystemError(e))
-    # Save JSON Response
-    json_resp = json.loads(r.text)
-    if json_resp['result'][0]['status']['code'] != -11:
-        taskID = json_resp['result'][0]['data']['task']
-        print ()
-        print ('--> Perform importing policy & dynamic interfaces & objects for  VDOM %s to  ADOM %s' % (piVDOM, piADOM))
-        print ('<-- Hcode: %d Jmesg: %s' % (r.status_code, json_resp['result'][0]['status']['message']))
-        print ()
-        time.sleep( 0.3 )
-        poll_taskid(taskID)
-        #Save/Commit Changes
-        workspace_commit(piADOM)
-    else:
-        print ('<--Error, unable to get API Request Step 3 Moving to import policy & dependant dynamic interfaces & objects, existing...')
-        #HTTP & JSON code & message
-        print ('<-- HTTPcode: %d JSONmesg: %s' % (r.status_code, json_resp['result'][0]['status']['message']))
-        print ()
-        #Exit Program
-        sys.exit(1)
+        with locks.lock(adom) as lease:
+            while queue:
+                #Lock heartbeat failed, check once more before writing to the workspace
+                if not lease.healthy:
+                    locks.renew(lease)
+                    if not lease.healthy:
+                        raise lease.error
+                job = queue.pop(0)
+                try:
+                    run_import_job(fmg, job, mux, task_slots, deadline, checkpoint)
+                except errors as e:
+                    fail_jobs([job], str(e))
+                    print ('<-- ADOM %s Device %s VDOM %s import failed at %s: %s' % (adom, job.device, job.vdom, job.step, e))
+                    #The failed import may have half written the workspace, discard it with the imports not committed yet
+                    discarded = coalescer.rollback([job])
+                    fail_jobs([discarded_job for discarded_job in discarded if id(discarded_job) in rerun], 'rolled back twice after failed imports')
+                    retry = [discarded_job for discarded_job in discarded if id(discarded_job) not in rerun]
+                    for retry_job in retry:
+                        retry_job.status = 'pending'
+                        rerun.add(id(retry_job))
+                    queue = retry + queue
+                    continue
+                print ('--> ADOM %s Device %s VDOM %s import is done, waiting for commit' % (adom, job.device, job.vdom))
+                try:
+                    coalescer.add(job)
+                except (requests.exceptions.RequestException, FMGError) as e:
+                    print ('<-- Unable to Save Changes to ADOM %s: %s' % (adom, e))
+                    fail_jobs(coalescer.rollback(), 'commit: %s' % e)
+            try:
+                coalescer.flush()
+            except (requests.exceptions.RequestException, FMGError) as e:
+                print ('<-- Unable to Save Changes to ADOM %s: %s' % (adom, e))
+                #Unlock discards the uncommitted changes
+                fail_jobs(coalescer.pending, 'commit: %s' % e)
+    except (requests.exceptions.RequestException, FMGError, LockTimeout, LockLost, LockShared) as e:
+        #ADOM could not be locked, lost its lock or could not be rolled back
+        print ('<-- Unable to Lock ADOM %s, skipping its %d remaining imports: %s' % (adom, len(coalescer.pending + queue), e))
+        fail_jobs(coalescer.pending + queue, 'lock: %s' % e)
+
+
+def run_fleet_import(fmg, jobs, adom_workers=4, max_tasks=8, deadline=FLEET_STEP_DEADLINE, commit_every=0, commit_seconds=None, checkpoint=None,
+                     lock_timeout=300):
+    ''' Run many Policy Package imports. ADOMs run in parallel, imports in the same ADOM run one after the other
+        as they share the ADOM workspace lock.
+    Arguments:
+    fmg - Logged in FMGClient, pool_maxsize should be at least adom_workers + 2
+    jobs - List of ImportJob, see load_inventory
+    adom_workers - Number of ADOMs imported at the same time
+    max_tasks - Max number of import tasks running on the FortiManager at once, across all ADOMs
+    deadline - Seconds to wait for each step task, default FLEET_STEP_DEADLINE, None waits until it finishes. A task the
+               FortiManager does not return anymore fails its import with TaskMissing, see TaskMultiplexer
+    commit_every - Commit an ADOM every this many imports, 0 commits once per ADOM after all its imports
+    commit_seconds - Commit an ADOM when this many seconds passed since its last commit, None turns it off
+    checkpoint - Optional ImportCheckpoint to resume an interrupted run
+    lock_timeout - Seconds to wait for an ADOM locked by another user, None waits forever
+
+    Returns:
+    jobs - Same list, with status/step/error filled in
+    '''
+    #Jobs per ADOM in inventory order
+    adom_jobs = {}
+    for job in jobs:
+        adom_jobs.setdefault(job.adom, []).append(job)
+    task_slots = threading.BoundedSemaphore(max_tasks)
+    with TaskMultiplexer(fmg) as mux, ADOMLockManager(fmg, wait_timeout=lock_timeout) as locks, ThreadPoolExecutor(max_workers=adom_workers) as pool:
+        futures = [pool.submit(run_adom_jobs, fmg, adom, adom_list, mux, task_slots, locks, deadline, commit_every, commit_seconds, checkpoint)
+                   for adom, adom_list in adom_jobs.items()]
+        for future in futures:
+            future.result()
+    return jobs
+
+
+def write_import_results(jobs, file_name):
+    ''' Write one CSV row per import job with its status, last step & error '''
+    with open(file_name, 'w', newline='') as results_file:
+        writer = csv.writer(results_file)
+        writer.writerow(['ADOM', 'Device', 'VDOM', 'Package', 'Status', 'Step', 'Error'])
+        for job in jobs:
+            writer.writerow([job.adom, job.device, job.vdom, job.package, job.status, job.step, job.error])
+
 
 ## Main Function
 def main():
     ''' The main function/program '''
+    ## Command line options for the non interactive fleet import, no options keeps the interactive prompts
+    parser = argparse.ArgumentParser(description='FortiManager Policy Package Import from Device/VDOM')
+    parser.add_argument('--host', help='FortiManager IP Address, ex: 1.1.1.1 or 1.1.1.1:8080')
+    parser.add_argument('--user', help='FortiManager API User name, password is read from FMG_PASSWD or prompted')
+    parser.add_argument('--inventory', help='CSV or YAML file of adom, device, vdom, package to import many Device/VDOMs')
+    parser.add_argument('--adom-workers', type=int, default=4, help='Number of ADOMs imported at the same time (default 4)')
+    parser.add_argument('--max-tasks', type=int, default=8, help='Max import tasks running on the FortiManager at once (default 8)')
+    parser.add_argument('--deadline', type=float, default=FLEET_STEP_DEADLINE,
+                        help='Seconds to wait for each import step task (default %d), 0 waits until it finishes' % FLEET_STEP_DEADLINE)
+    parser.add_argument('--commit-every', type=int, default=0, help='Commit an ADOM every N imports, default commits once per ADOM')
+    parser.add_argument('--commit-seconds', type=float, help='Commit an ADOM when this many seconds passed since its last commit')
+    parser.add_argument('--lock-timeout', type=float, default=300, help='Seconds to wait for an ADOM locked by another user (default 300)')
+    parser.add_argument('--checkpoint', help='JSON-lines checkpoint file, rerun with the same file to resume an interrupted import')
+    args = parser.parse_args()
+
     ## User Input Section ##
     # Prompt for IP Address of FortiManager
-    print('Please Enter FortiManager IP Address:')
-    hostIP = input()
+    hostIP = args.host
+    if not hostIP:
+        print('Please Enter FortiManager IP Address:')
+        hostIP = input()
     #Check User put in data
     while not hostIP:
         print('Error, Please Enter FortiManager IP Address:')
         hostIP = input()
     
     # Prompt for API User Name
-    print('Please Enter FortiManager API User name:')
-    hostAPIUSER = input()
+    hostAPIUSER = args.user
+    if not hostAPIUSER:
+        print('Please Enter FortiManager API User name:')
+        hostAPIUSER = input()
     #Check User put in data
     while not hostAPIUSER:
         print('Error, Please Enter FortiManager API User name:')
         hostAPIUSER = input()
     
     # Prompt for API User password. use getpass() module to hide it being displayed
-    hostPASSWD = getpass.getpass('Please Enter FortiManager API User password:')
+    hostPASSWD = os.environ.get('FMG_PASSWD')
+    if not hostPASSWD:
+        hostPASSWD = getpass.getpass('Please Enter FortiManager API User password:')
     #Check User put in data
     while not hostPASSWD:
         hostPASSWD = getpass.getpass('Error, Please Enter FortiManager API User password:')
-    
+
+    if args.inventory:
+        ## Fleet import of every Device/VDOM in the inventory file
+        try:
+            jobs = load_inventory(args.inventory)
+        except (OSError, ValueError, RuntimeError) as e:
+            print ('<-- Unable to read inventory %s: %s' % (args.inventory, e))
+            sys.exit(1)
+        print ('--> %d imports in %d ADOMs from %s' % (len(jobs), len(set(job.adom for job in jobs)), args.inventory))
+
+        ## Login to FortiManager, one pooled connection per ADOM worker plus the task poller & lock heartbeat
+        fmg = FMGClient(hostIP, pool_maxsize=args.adom_workers + 2)
+        fmg.login(hostAPIUSER, hostPASSWD)
+        checkpoint = ImportCheckpoint(args.checkpoint) if args.checkpoint else None
+        run_fleet_import(fmg, jobs, args.adom_workers, args.max_tasks, args.deadline or None, args.commit_every, args.commit_seconds, checkpoint, args.lock_timeout)
+        if checkpoint is not None:
+            checkpoint.close()
+        results_name = time.strftime("%Y%m%d-%H%M%S") + "_FMG_Policy-Import-Results.csv"
+        write_import_results(jobs, results_name)
+        failed = [job for job in jobs if job.status != 'done']
+        print ('--> %d imports done, %d failed, results in %s' % (len(jobs) - len(failed), len(failed), results_name))
+        fmg.logout()
+        return
+
     # Prompt for ADOM
     print('Please Enter the ADOM Name where your Device and/or VDOM exists:')
     hostADOM = input()
@@ -517,23 +730,27 @@ def main():
 
     ## End User Input Section ##
 
-    ## Call fmg_login Function
-    fmg_login(hostAPIUSER, hostPASSWD, hostIP)
+    ## Login to FortiManager
+    fmg = FMGClient(hostIP)
+    fmg.login(hostAPIUSER, hostPASSWD)
 
     ## Locking ADOM
-    workspace_lock(hostADOM)
+    fmg.workspace_lock(hostADOM)
 
     ## Import Policy Package
-    policy_import(hostADOM, fgtDEVNAME, policyNAME, vdomNAME)
+    checkpoint = ImportCheckpoint(args.checkpoint) if args.checkpoint else None
+    policy_import(fmg, hostADOM, fgtDEVNAME, policyNAME, vdomNAME, checkpoint)
+    if checkpoint is not None:
+        checkpoint.close()
 
     ## UnLocking ADOM
-    workspace_unlock(hostADOM)
+    fmg.workspace_unlock(hostADOM)
 
-    ## Call fmg_logout Function
-    fmg_logout(hostIP)
+    ## Logout of FortiManager
+    fmg.logout()
 
     ''' End main function/program '''
 
 ## Run the main function/program
 if __name__ == '__main__':
-    main()
\ No newline at end of file
+    main()
@@ -0,0 +1,144 @@
+#!/usr/bin/python
+'''Project: FortiManager Proxy to FortiGate API
+   Details: Shared helpers of the FortiManager sys/proxy/json calls to the FortiGate local API, for the scripts that proxy
+            the same FortiGate reads more than once (ex: a fan-out pull then a compare of the same FortiGates).
+            proxy_fanout sends one resource to many FortiGates/VDOMs, the target list chunked to PROXY_CHUNK_SIZE targets, &
+            returns every target's result or error on its own.
+            Proxied reads are cached by (target, resource, vdom) in a size bounded LRU with a TTL per resource (PROXY_CACHE_TTLS),
+            so a read of the same FortiGate config does not go FortiManager -> FortiGate again. Clear it with invalidate_proxy_cache.
+   Date: 2026
+   Functions: proxy_cache_key, proxy_cache_ttl, cached_proxy_result, cache_proxy_result, invalidate_proxy_cache,
+              proxy_target_result, proxy_fanout
+   Python Version: 3.10.11
+   Usage:
+        from fmg_proxy import proxy_fanout, PROXY_CACHE
+        results = proxy_fanout(fmg, '/api/v2/cmdb/system/external-resource/?vdom=root', ['adom/root/device/FGT-01'])
+        results['adom/root/device/FGT-01']             #{'code', 'message', 'response'}
+        PROXY_CACHE.hits                                #Reads served from the cache
+'''
+
+## Define Modules
+#Failed proxy requests
+import requests
+#Split the proxy resource into path & query for the cache key
+from urllib.parse import parse_qsl
+#Proxy response cache
+from fmg_cache import TTLCache, MISSING
+
+#Max FortiGates/VDOMs in the target list of one proxy request
+PROXY_CHUNK_SIZE = 100
+#Seconds a proxied response stays cached, per resource path prefix (longest prefix wins), 0 is not cached
+PROXY_CACHE_TTL = 30
+PROXY_CACHE_TTLS = {
+    "/api/v2/cmdb/": 300,
+    "/api/v2/monitor/": 30,
+    #Entry Lists can be very large & are streamed, not cached
+    "/api/v2/monitor/system/external-resource/entry-list": 0,
+}
+#Proxied responses, (target, resource path, vdom, other query): {'code', 'message', 'response'}
+PROXY_CACHE = TTLCache(maxsize=2000, ttl=PROXY_CACHE_TTL)
+
+
+## Functions
+def proxy_cache_key(target, resource):
+    '''Cache key of a proxied resource, (target, resource path, vdom, other query parameters)'''
+    path, sep, query = resource.partition('?')
+    params = parse_qsl(query)
+    vdom = dict(params).get('vdom', 'root')
+    return (target, path.rstrip('/'), vdom, tuple(sorted((name, value) for name, value in params if name != 'vdom')))
+
+def proxy_cache_ttl(resource):
+    '''Seconds a proxied resource stays cached, from the longest matching PROXY_CACHE_TTLS prefix'''
+    path = resource.partition('?')[0].rstrip('/')
+    ttl = PROXY_CACHE_TTL
+    matched = ''
+    for prefix, prefix_ttl in PROXY_CACHE_TTLS.items():
+        if path.startswith(prefix.rstrip('/')) and len(prefix) > len(matched):
+            matched, ttl = prefix, prefix_ttl
+    return ttl
+
+def cached_proxy_result(target, resource, cache=PROXY_CACHE):
+    '''Cached result of a proxied resource, None when not cached, expired or the resource is not cached'''
+    if cache is None or not proxy_cache_ttl(resource):
+        return None
+    result = cache.get(proxy_cache_key(target, resource), MISSING)
+    return None if result is MISSING else result
+
+def cache_proxy_result(target, resource, result, cache=PROXY_CACHE):
+    '''Cache a proxied result, only successful results are cached'''
+    ttl = proxy_cache_ttl(resource)
+    if cache is not None and ttl and result['code'] == 0:
+        cache.set(proxy_cache_key(target, resource), result, ttl)
+
+def invalidate_proxy_cache(target=None, resource=None, vdom=None, cache=PROXY_CACHE):
+    '''Drop cached proxied responses, every one by default
+    Arguments:
+    target - Only this target, ex: adom/root/device/FGT-01
+    resource - Only this resource path, ex: /api/v2/cmdb/system/external-resource, query is ignored
+    vdom - Only this VDOM
+    '''
+    path = resource.partition('?')[0].rstrip('/') if resource is not None else None
+    cache.invalidate_if(lambda key: (target is None or key[0] == target) and (path is None or key[1] == path)
+                                    and (vdom is None or key[2] == vdom))
+
+def proxy_target_result(entry):
+    '''Result of one target of a proxy response, FortiManager status first then the FortiGate API status'''
+    status = entry.get('status') or {}
+    response = entry.get('response')
+    if status.get('code', 0) != 0:
+        return {'code': status.get('code'), 'message': status.get('message'), 'response': response}
+    if isinstance(response, dict) and response.get('status') == 'error':
+        return {'code': response.get('http_status', -1), 'message': response.get('error', 'FortiGate API error'), 'response': response}
+    return {'code': 0, 'message': status.get('message', 'OK'), 'response': response}
+
+def proxy_fanout(fmg, resource, targets, chunk_size=PROXY_CHUNK_SIZE, cache=PROXY_CACHE):
+    '''FortiManager Proxy one FortiGate API resource to many targets, chunk_size targets per proxy request
+    Arguments:
+    fmg - Logged in FMGClient
+    resource - The FortiGate local API, ex: /api/v2/cmdb/system/external-resource/?vdom=root
+    targets - Proxy targets, ex: adom/root/device/FGT-01
+    chunk_size - Max targets per proxy request
+    cache - TTLCache of proxied results, cached targets are not sent again, None always sends every target
+
+    Returns:
+    results - {target: {'code': 0 or error code, 'message': error message, 'response': FortiGate response}},
+              a failed request or a target missing from the response is an error of those targets only
+    '''
+    json_url = "/sys/proxy/json"
+    results = {}
+    for target in targets:
+        cached = cached_proxy_result(target, resource, cache)
+        if cached is not None:
+            results[target] = cached
+    targets = [target for target in targets if target not in results]
+    for start in range(0, len(targets), chunk_size):
+        chunk = targets[start:start + chunk_size]
+        data = {
+            "resource": resource,
+            "target": chunk,
+            "action": "get",
+        }
+        try:
+            http_code, json_resp = fmg.execute(json_url, data=data)
+            status = json_resp['result'][0]['status']
+            if status['code'] != 0:
+                raise ValueError('HTTPcode: %d JSONmesg: %s' % (http_code, status['message']))
+            entries = json_resp['result'][0].get('data') or []
+        except (requests.exceptions.RequestException, ValueError, KeyError, IndexError) as e:
+            for target in chunk:
+                results[target] = {'code': -1, 'message': str(e), 'response': None}
+            continue
+        #Response targets are device names (or the target sent), in the order of the target list when missing
+        names = {}
+        for target in chunk:
+            names[target] = target
+            names[target.rsplit('/', 1)[-1]] = target
+        for index, entry in enumerate(entries):
+            target = names.get(entry.get('target')) if entry.get('target') is not None else (chunk[index] if index < len(chunk) else None)
+            if target is not None:
+                results[target] = proxy_target_result(entry)
+                cache_proxy_result(target, resource, results[target], cache)
+        for target in chunk:
+            if target not in results:
+                results[target] = {'code': -1, 'message': 'No response for target', 'response': None}
+    return results
@@ -2,8 +2,18 @@
 '''Project: FortiManager Proxy commands to FortiGate that are not available on FortiManager. In this example Threat Feed.
    Details: This example could be used to install CERTS onto FortiGate, pull local Traffic Stats, etc. without having to keep track of each FortiGate IP
             update ACL to access each from your script. As long as you can reach the FortiManager and FortiGate is managed by it, you can proxy your API calls.
+            Fan-out mode sends one proxy request for many FortiGates/VDOMs (the proxy target is a list), chunked to
+            PROXY_CHUNK_SIZE targets, and reports every device's result or error on its own instead of exiting on the first error.
+            Streaming mode reads a large Threat Feed Entry List incrementally & writes the entries one per line to a file,
+            memory stays bounded whatever the feed size.
+            Compare mode hashes every FortiGate's Entry List while it is streamed, groups the FortiGates by digest & only pulls
+            one Entry List per differing group again to list the entries missing/extra against the reference group, ex: stale or
+            failed feed refreshes.
+            Compare mode reads the Threat Feed config of the FortiGates first, devices without the feed are not streamed. After
+            the fan-out pull that config read is served from the proxied read cache (fmg_proxy.py), not sent to the FortiGates again.
    Date: 12-16-2020
-   Functions: def threatfeedgetPROXYFMG, def threatfeedgetlistPROXYFMG
+   Functions: def threatfeedgetPROXYFMG, def threatfeedgetlistPROXYFMG, def threatfeedstreamPROXYFMG, def streamentriesPROXYFMG,
+              def threatfeedCOMPARE, def print_compare_results, def entry_line, def threatfeedFANOUT, def print_fanout_results, def main
    Python Version: 3.7.4
    FortiManager Version: v6.2.3 on Azure, compatible and tested with v6.0.9 GA
    IDE: Visual Studio
@@ -27,105 +37,28 @@ import sys
 import getpass
 #For making HTTPS Connections to the FortiManager API Server
 import requests
-import urllib3
-#To ignore the FortiManager Self Signed Certificate warnings.
-urllib3.disable_warnings(urllib3.exceptions.InsecureRequestWarning)
 #To receive and format JSON requests as FortiManager uses JSON formatting in their API
 import json
+#Shared FortiManager API client, pooled HTTPS connection & session handling
+from fmg_client import FMGClient
+#Incremental parser of large entry lists
+from fmg_stream import iter_response_list
+#Entry List digests & compact entry sets
+from fmg_feeds import FeedDigest, EntrySet
+#Proxy fan-out & the shared proxy response cache
+from fmg_proxy import PROXY_CHUNK_SIZE, PROXY_CACHE, cached_proxy_result, cache_proxy_result, proxy_fanout
 
 
 ## Functions
-def fmg_login(hostAPIUSER, hostPASSWD, hostIP):
-    '''FortiManager Login & Create Session
-    Arguments:
-    hostAPIUSER - API User Account Name
-    hostPASSWD - API User Passwd
-    hostIP - IP addres of FortiManager. Note, if not on default HTTPS(443) port can input: 1.1.1.1:8080
-    '''
-    #Global Save Session ID
-    global session
-    #Create HTTPS URL
-    global url
-    url = 'https://' + hostIP + '/jsonrpc'
-    #JSON Body to sent to API request
-    body = {
-    "id": 1,
-            "method": "exec",
-            "params": [{
-                    "url": "sys/login/user",
-                    "data": [{
-                            "user": hostAPIUSER,
-                            "passwd": hostPASSWD
-                    }]
-            }],
-            "session": 1
-    }
-    #Test HTTPS connection to host then Capture and output any errors
-    try:
-        r = requests.post(url, json=body, verify=False)
-    except requests.exceptions.RequestException as e: 
-        print (SystemError(e))
-        #Exit Program, Connection was not Successful
-        sys.exit(1)
-    #Save JSON response from FortiManager
-    json_resp = json.loads(r.text)
-    #Check if User & Passwd was valid, no code -11 means invalid
-    if json_resp['result'][0]['status']['code'] != -11:
-        session = json_resp['session']
-        print ('--> Logging into FortiManager: %s' % hostIP)
-        #HTTP & JSON code & message
-        print ('<-- HTTPcode: %d JSONmesg: %s' % (r.status_code, json_resp['result'][0]['status']['message']))
-        print
-    else:
-        print ('<--Username or password is not valid, please try again, exiting...')
-        #HTTP & JSON code & message
-        print ('<-- HTTPcode: %d JSONmesg: %s' % (r.status_code, json_resp['result'][0]['status']['message']))
-        print
-        #Exit Program, Username or Password is not valided or internal FortiManager error review Hcode & Jmesg
-        sys.exit(1)
-
-def fmg_logout(hostIP):
-    '''FortiManager logout
-    Arguments:
-    hostIP - IP addres of FortiManager. Note, if not on default HTTPS(443) port can input: 1.1.1.1:8080
-    '''
-    body = {
-       "id": 1,
-        "method": "exec",
-        "params": [{
-                "url": "sys/logout"
-        }],
-        "session": session
-    }
-    #Test HTTPS connection to host then Capture and output any errors
-    try:
-        r = requests.post(url, json=body, verify=False)
-    except requests.exceptions.RequestException as e:
-        print (SystemError(e))
-        #Exit Program, Connection was not Successful
-        sys.exit(1)
-    #Save JSON response from FortiManager    
-    json_resp = json.loads(r.text)
-    #Check if any API Errors returned
-    if json_resp['result'][0]['status']['code'] != -11:   
-        print () 
-        print ('--> Logging out of FMG: %s' % hostIP)
-        #HTTP & JSON code & message
-        print ('<-- HTTPcode: %d JSONmesg: %s' % (r.status_code, json_resp['result'][0]['status']['message']))
-        print ()
-    else:
-        print ('<--Error Occured, check Hcode & Jmesg')
-        #Exit Program, internal FortiManager error review Hcode & Jmesg
-        print ('<-- HTTPcode: %d JSONmesg: %s' % (r.status_code, json_resp['result'][0]['status']['message']))
-        print ()
-        sys.exit(1)   
-
-def threatfeedgetPROXYFMG(ADOM, fgtDEVNAME, VDOM):
+def threatfeedgetPROXYFMG(fmg, ADOM, fgtDEVNAME, VDOM):
     '''FortiManager Proxy to FortiGate pull Threat Feed Information
     Arguments:
+    fmg - Logged in FMGClient
     ADOM - ADOM that your FortiGate Exists in
     fgtDEVNAME- The FortiGate Device Name
     VDOM - If FortiGate has VDOM enabled, use this, if not, default to root vdom which is no VDOM enabled
+
+    Raises requests.exceptions.RequestException when the FortiManager can not be reached
     '''
     #Build API call Proxy JSON
     json_url = "/sys/proxy/json"
@@ -133,46 +66,40 @@ def threatfeedgetPROXYFMG(ADOM, fgtDEVNAME, VDOM):
     resource = "/api/v2/cmdb/system/external-resource/?vdom=" + VDOM
     #Build target, the location of the FortiGate device in the FortiManager. ADOM + Device name
     target = "adom/" + ADOM + "/device/" + fgtDEVNAME
-    body = {
-        "id": 1,
-        "method": "exec",
-        "params": [{
-                "data": {
-                        "resource": resource,
-                        "target": [target],
-                        "action": "get",
-                },
-                "url": json_url
-        }],
-        "session": session
+    data = {
+        "resource": resource,
+        "target": [target],
+        "action": "get",
     }
-    #Test HTTPS connection to host then Capture and output any errors
-    try:
-        r = requests.post(url, json=body, verify=False)
-    except requests.exceptions.RequestException as e:
-        print (SystemError(e))
-        #Exit Program, Connection was not Successful
-        sys.exit(1)
-    #Save JSON response from FortiManager    
-    json_resp = json.loads(r.text)
+    cached = cached_proxy_result(target, resource)
+    if cached is not None:
+        print('--> Retrieving FortiGate Device Name %s Threat Feed information... (cached)' % fgtDEVNAME)
+        print(json.dumps(cached['response']['results'], indent = 4, sort_keys=True))
+        return
+    #Connection errors are raised to the caller, main decides to exit
+    http_code, json_resp = fmg.execute(json_url, data=data)
     #print(json_resp['result'][0]['data'][0]['status']['code'])
     if json_resp['result'][0]['data'][0]['status']['code'] == 0:
+        cache_proxy_result(target, resource, proxy_target_result(json_resp['result'][0]['data'][0]))
         print('--> Retrieving FortiGate Device Name %s Threat Feed information...' % fgtDEVNAME)
         print(json.dumps(json_resp['result'][0]['data'][0]['response']['results'], indent = 4, sort_keys=True))
     else:
         print('--> Retrieving FortiGate Device Name %s Threat Feed information...' % fgtDEVNAME)
         print ('<-- ERROR! Occured, check Hcode & Jmesg')
         #Exit Program, internal FortiManager error review Hcode & Jmesg
-        print ('<-- HTTPcode: %d JSONmesg: %s' % (r.status_code, json_resp['result'][0]['data'][0]['status']['message']))
+        print ('<-- HTTPcode: %d JSONmesg: %s' % (http_code, json_resp['result'][0]['data'][0]['status']['message']))
         print
 
-def threatfeedgetlistPROXYFMG(ADOM, fgtDEVNAME, tfENTRYNAME, VDOM):
+def threatfeedgetlistPROXYFMG(fmg, ADOM, fgtDEVNAME, tfENTRYNAME, VDOM):
     '''FortiManager Proxy to FortiGate pull Threat Feed List/Entries
     Arguments:
+    fmg - Logged in FMGClient
     ADOM - ADOM that your FortiGate Exists in
     fgtDEVNAME- The FortiGate Device Name
     tfENTRYNAME - Name of the Threat Feed on the FortiGate you would like to pull the Populated Entry List from
     VDOM - If FortiGate has VDOM enabled, use this, if not, default to VDOM=root vdom which is no VDOM enabled
+
+    Raises requests.exceptions.RequestException when the FortiManager can not be reached
     '''
     #Build API call Proxy JSON
     json_url = "/sys/proxy/json"
@@ -180,28 +107,13 @@ def threatfeedgetlistPROXYFMG(ADOM, fgtDEVNAME, tfENTRYNAME, VDOM):
     resource = "/api/v2/monitor/system/external-resource/entry-list?mkey=" + tfENTRYNAME + "&vdom=" + VDOM
     #Build target, the location of the FortiGate device in the FortiManager. ADOM + Device name
     target = "adom/" + ADOM + "/device/" + fgtDEVNAME
-    body = {
-        "id": 1,
-        "method": "exec",
-        "params": [{
-                "data": {
-                        "resource": resource,
-                        "target": [target],
-                        "action": "get",
-                },
-                "url": json_url
-        }],
-        "session": session
-    }    
-    #Test HTTPS connection to host then Capture and output any errors
-    try:
-        r = requests.post(url, json=body, verify=False)
-    except requests.exceptions.RequestException as e:
-        print (SystemError(e))
-        #Exit Program, Connection was not Successful
-        sys.exit(1)
-    #Save JSON response from FortiManager    
-    json_resp = json.loads(r.text)
+    data = {
+        "resource": resource,
+        "target": [target],
+        "action": "get",
+    }
+    #Connection errors are raised to the caller, main decides to exit
+    http_code, json_resp = fmg.execute(json_url, data=data)
     print(json_resp['result'][0]['data'][0]['status']['code'])
     if json_resp['result'][0]['data'][0]['status']['code'] == 0:
         print('--> Retrieving FortiGate Device Name %s Threat Feed Entry %s information...' % (fgtDEVNAME, tfENTRYNAME))
@@ -211,9 +123,169 @@ def threatfeedgetlistPROXYFMG(ADOM, fgtDEVNAME, tfENTRYNAME, VDOM):
         print('--> Retrieving FortiGate Device Name %s Threat Feed Entry %s information...' % (fgtDEVNAME, tfENTRYNAME))
         print ('<-- ERROR! Occured, check Hcode & Jmesg')
         #Exit Program, internal FortiManager error review Hcode & Jmesg
-        print ('<-- HTTPcode: %d JSONmesg: %s' % (r.status_code, json_resp['result'][0]['data'][0]['status']['message']))
+        print ('<-- HTTPcode: %d JSONmesg: %s' % (http_code, json_resp['result'][0]['data'][0]['status']['message']))
         print   
 
+def threatfeedstreamPROXYFMG(fmg, ADOM, fgtDEVNAME, tfENTRYNAME, VDOM, callback):
+    '''FortiManager Proxy to FortiGate pull Threat Feed List/Entries, streamed one entry at a time
+    Arguments:
+    fmg - Logged in FMGClient
+    ADOM - ADOM that your FortiGate Exists in
+    fgtDEVNAME- The FortiGate Device Name
+    tfENTRYNAME - Name of the Threat Feed on the FortiGate you would like to pull the Populated Entry List from
+    VDOM - If FortiGate has VDOM enabled, use this, if not, default to VDOM=root vdom which is no VDOM enabled
+    callback - Called with every entry as it is read, ex: a file write
+
+    Returns:
+    count - Number of entries, None if the request or the entry list failed (error is printed)
+    '''
+    print('--> Streaming FortiGate Device Name %s Threat Feed Entry %s...' % (fgtDEVNAME, tfENTRYNAME))
+    count = 0
+    try:
+        for entry in streamentriesPROXYFMG(fmg, ADOM, fgtDEVNAME, tfENTRYNAME, VDOM):
+            callback(entry)
+            count += 1
+    except (requests.exceptions.RequestException, ValueError) as e:
+        print ('<-- ERROR! Occured after %d entries: %s' % (count, e))
+        return None
+    return count
+
+def streamentriesPROXYFMG(fmg, ADOM, fgtDEVNAME, tfENTRYNAME, VDOM):
+    '''Send the proxy Entry List request of one FortiGate & return the generator of its entries, see threatfeedstreamPROXYFMG.
+       Raises requests.exceptions.RequestException or ValueError while reading
+    '''
+    #Build API call Proxy JSON
+    json_url = "/sys/proxy/json"
+    #Build resource, the FortiGate local API
+    resource = "/api/v2/monitor/system/external-resource/entry-list?mkey=" + tfENTRYNAME + "&vdom=" + VDOM
+    #Build target, the location of the FortiGate device in the FortiManager. ADOM + Device name
+    target = "adom/" + ADOM + "/device/" + fgtDEVNAME
+    data = {
+        "resource": resource,
+        "target": [target],
+        "action": "get",
+    }
+    return iter_response_list(fmg.stream('exec', json_url, data=data), 'entries')
+
+def threatfeedCOMPARE(fmg, devices, tfENTRYNAME, reference=None):
+    '''Compare the Entry List of one Threat Feed across many FortiGates
+    Arguments:
+    fmg - Logged in FMGClient
+    devices - (ADOM, FortiGate Device Name, VDOM) of every FortiGate/VDOM
+    tfENTRYNAME - Name of the Threat Feed
+    reference - (ADOM, Device Name, VDOM) with the reference Entry List, default is the largest group of identical lists
+
+    Returns:
+    groups - List of {'digest', 'count', 'devices', 'resource', 'reference', 'missing', 'extra'}, one per distinct Entry List,
+             reference group first. resource is the feed URL configured on the group's first device, missing/extra are the
+             entries of the group's list missing/extra against the reference list
+    failed - Devices whose Entry List could not be pulled or without the Threat Feed
+    '''
+    ## Threat Feed config of every device, after a fan-out pull of the same devices it is read from the proxy cache
+    feeds = {}
+    for device, result in threatfeedFANOUT(fmg, devices).items():
+        response = result['response'].get('results') if result['code'] == 0 and isinstance(result['response'], dict) else None
+        if isinstance(response, list):
+            feeds[device] = next((feed for feed in response if isinstance(feed, dict) and feed.get('name') == tfENTRYNAME), None)
+    ## Pass 1, digest of every Entry List while it is streamed, nothing is kept
+    digests = {}
+    failed = []
+    for device in devices:
+        if device in feeds and feeds[device] is None:
+            #Config was read & has no such Threat Feed, no Entry List to pull
+            print ('<-- Threat Feed %s is not configured on FortiGate Device Name %s VDOM %s' % (tfENTRYNAME, device[1], device[2]))
+            failed.append(device)
+            continue
+        digest = FeedDigest()
+        if threatfeedstreamPROXYFMG(fmg, device[0], device[1], tfENTRYNAME, device[2], digest.add) is None:
+            failed.append(device)
+            continue
+        digests.setdefault(digest.hexdigest(), {'digest': digest.hexdigest(), 'count': digest.count, 'devices': [],
+                                                'resource': (feeds.get(device) or {}).get('resource')})['devices'].append(device)
+    groups = sorted(digests.values(), key=lambda group: (reference not in group['devices'], -len(group['devices']), group['digest']))
+    if not groups:
+        return groups, failed
+    ## Pass 2, compact entry sets of the reference & of one device per differing group, one group at a time
+    for group in groups:
+        group.update({'reference': False, 'missing': [], 'extra': []})
+    groups[0]['reference'] = True
+    if len(groups) > 1:
+        ADOM, fgtDEVNAME, VDOM = groups[0]['devices'][0]
+        try:
+            reference_set = EntrySet(streamentriesPROXYFMG(fmg, ADOM, fgtDEVNAME, tfENTRYNAME, VDOM))
+        except (requests.exceptions.RequestException, ValueError) as e:
+            print ('<-- ERROR! Unable to pull the reference Entry List from %s: %s' % (fgtDEVNAME, e))
+            return groups, failed
+        for group in groups[1:]:
+            ADOM, fgtDEVNAME, VDOM = group['devices'][0]
+            try:
+                group['missing'], group['extra'] = EntrySet(streamentriesPROXYFMG(fmg, ADOM, fgtDEVNAME, tfENTRYNAME, VDOM)).diff(reference_set)
+            except (requests.exceptions.RequestException, ValueError) as e:
+                print ('<-- ERROR! Unable to pull the Entry List from %s: %s' % (fgtDEVNAME, e))
+    return groups, failed
+
+def print_compare_results(groups, failed, tfENTRYNAME):
+    '''Print the groups of threatfeedCOMPARE'''
+    for group in groups:
+        names = ', '.join('%s(%s)' % (fgtDEVNAME, VDOM) for ADOM, fgtDEVNAME, VDOM in group['devices'])
+        if group['resource']:
+            names += ' from ' + group['resource']
+        if group['reference']:
+            print('--> Threat Feed %s reference list, %d entries: %s' % (tfENTRYNAME, group['count'], names))
+        else:
+            print('<-- Threat Feed %s differs, %d entries, %d missing, %d extra: %s' % (tfENTRYNAME, group['count'], len(group['missing']), len(group['extra']), names))
+            for entry in group['missing']:
+                print('    - %s' % entry)
+            for entry in group['extra']:
+                print('    + %s' % entry)
+    for ADOM, fgtDEVNAME, VDOM in failed:
+        print('<-- ERROR! Threat Feed %s Entry List of FortiGate Device Name %s VDOM %s could not be pulled' % (tfENTRYNAME, fgtDEVNAME, VDOM))
+
+def entry_line(entry):
+    '''One line of the Entry List file, IP/domain entries as is, other entries as JSON'''
+    return (entry if isinstance(entry, str) else json.dumps(entry, sort_keys=True)) + '\n'
+
+def threatfeedFANOUT(fmg, devices, tfENTRYNAME=None, chunk_size=PROXY_CHUNK_SIZE):
+    '''FortiManager Proxy to many FortiGates pull Threat Feed Information, or the Entries of one Threat Feed
+    Arguments:
+    fmg - Logged in FMGClient
+    devices - (ADOM, FortiGate Device Name, VDOM) of every FortiGate/VDOM
+    tfENTRYNAME - Name of the Threat Feed to pull the Populated Entry List from, None pulls the Threat Feed Information
+    chunk_size - Max FortiGates/VDOMs per proxy request
+
+    Returns:
+    results - {(ADOM, Device Name, VDOM): {'code', 'message', 'response'}}, see proxy_fanout
+    '''
+    #The VDOM is part of the resource, one proxy request per VDOM name & chunk of FortiGates
+    vdom_devices = {}
+    for ADOM, fgtDEVNAME, VDOM in devices:
+        vdom_devices.setdefault(VDOM, []).append((ADOM, fgtDEVNAME, VDOM))
+    results = {}
+    for VDOM, vdevices in vdom_devices.items():
+        if tfENTRYNAME is None:
+            resource = "/api/v2/cmdb/system/external-resource/?vdom=" + VDOM
+        else:
+            resource = "/api/v2/monitor/system/external-resource/entry-list?mkey=" + tfENTRYNAME + "&vdom=" + VDOM
+        targets = {"adom/" + ADOM + "/device/" + fgtDEVNAME: (ADOM, fgtDEVNAME, VDOM) for ADOM, fgtDEVNAME, VDOM in vdevices}
+        print('--> Retrieving Threat Feed information from %d FortiGates in VDOM %s...' % (len(targets), VDOM))
+        for target, result in proxy_fanout(fmg, resource, list(targets), chunk_size).items():
+            results[targets[target]] = result
+    return results
+
+def print_fanout_results(results, tfENTRYNAME=None):
+    '''Print the result of every FortiGate/VDOM of threatfeedFANOUT, errors do not stop the others'''
+    for (ADOM, fgtDEVNAME, VDOM), result in sorted(results.items()):
+        if result['code'] == 0:
+            print('--> FortiGate Device Name %s VDOM %s Threat Feed %s' % (fgtDEVNAME, VDOM, tfENTRYNAME or 'information'))
+            response = result['response'].get('results') if isinstance(result['response'], dict) else result['response']
+            if tfENTRYNAME is not None and isinstance(response, dict):
+                response = response.get('entries')
+            print(json.dumps(response, indent = 4, sort_keys=True))
+        else:
+            print ('<-- ERROR! FortiGate Device Name %s VDOM %s Code: %s Mesg: %s' % (fgtDEVNAME, VDOM, result['code'], result['message']))
+    failed = sum(1 for result in results.values() if result['code'] != 0)
+    print('--> %d FortiGates/VDOMs, %d OK, %d failed' % (len(results), len(results) - failed, failed))
+
 def main():
     ''' The main function/program '''
     ## User Input Section ##
@@ -246,8 +318,8 @@ def main():
         print('Error, Please Enter the ADOM Name where your Device and/or VDOM exsts:')
         hostADOM = input()
 
-    # Prompt for Device
-    print('Please Enter the FortiGate Device Name you would like pull Threat Feed Info from:')
+    # Prompt for Device, many devices are pulled with one fan-out proxy request
+    print('Please Enter the FortiGate Device Name you would like pull Threat Feed Info from (comma separated for many, Device:VDOM for a VDOM):')
     fgtDEVNAME = input()
     while not fgtDEVNAME:
         print('Error, Please Enter the FortiGate Device Name you would like to Import Policy From:')
@@ -269,19 +341,49 @@ def main():
         print('Error, Please Enter the FortiGate Device Name you would like to Import Policy From:')
         ENTRYNAME = input()
 
+    # Prompt for Entry List file, large feeds are streamed to it instead of printed
+    print('Please Enter a file name to stream the Threat Feed Entries to one per line, or just hit Enter to print them:')
+    ENTRYFILE = input()
+
     ## End User Input Section ##
 
-    ## Call fmg_login Function
-    fmg_login(hostAPIUSER, hostPASSWD, hostIP)
+    ## Login to FortiManager
+    fmg = FMGClient(hostIP)
+    fmg.login(hostAPIUSER, hostPASSWD)
+
+    devices = []
+    for name in fgtDEVNAME.split(','):
+        name, sep, VDOM = name.strip().partition(':')
+        if name:
+            devices.append((hostADOM, name, VDOM or vdomNAME))
 
-    ## Call Threat Feed pull all
-    threatfeedgetPROXYFMG(hostADOM, fgtDEVNAME, vdomNAME)
+    if len(devices) > 1:
+        ## Fan-out Threat Feed pull all, then compare the Entries of every device
+        print_fanout_results(threatfeedFANOUT(fmg, devices))
+        print_compare_results(*threatfeedCOMPARE(fmg, devices, ENTRYNAME), ENTRYNAME)
+        print('--> Proxy cache: %d reads served from the cache, %d sent to the FortiGates' % (PROXY_CACHE.hits, PROXY_CACHE.misses))
+    else:
+        #Test HTTPS connection to host then Capture and output any errors
+        try:
+            ## Call Threat Feed pull all
+            threatfeedgetPROXYFMG(fmg, hostADOM, devices[0][1], devices[0][2])
 
-    ## Call Threat Feed pull Entries
-    threatfeedgetlistPROXYFMG(hostADOM, fgtDEVNAME, ENTRYNAME, vdomNAME)
+            ## Call Threat Feed pull Entries
+            if ENTRYFILE:
+                with open(ENTRYFILE, 'w') as entry_file:
+                    count = threatfeedstreamPROXYFMG(fmg, hostADOM, devices[0][1], ENTRYNAME, devices[0][2],
+                                                     lambda entry: entry_file.write(entry_line(entry)))
+                if count is not None:
+                    print('--> %d Threat Feed Entries written to %s' % (count, ENTRYFILE))
+            else:
+                threatfeedgetlistPROXYFMG(fmg, hostADOM, devices[0][1], ENTRYNAME, devices[0][2])
+        except requests.exceptions.RequestException as e:
+            print (SystemError(e))
+            #Exit Program, Connection was not Successful
+            sys.exit(1)
 
-    ## Call fmg_logout Function
-    fmg_logout(hostIP)
+    ## Logout of FortiManager
+    fmg.logout()
 
     ''' End main function/program '''
 
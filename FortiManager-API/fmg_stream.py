@@ -0,0 +1,136 @@
+#!/usr/bin/python
+'''Project: FortiManager API Streaming JSON
+   Details: Incremental parser for large API responses, ex: a proxied FortiGate external-resource/entry-list with hundreds of
+            thousands of IPs/domains. The response body is read in chunks (requests stream=True) & the items of one JSON list
+            (default "entries") are decoded & yielded one by one, so memory stays bounded by the chunk size & the largest item
+            instead of the whole response plus its json.loads copy.
+   Date: 2026
+   Functions: iter_json_list, iter_response_list
+   Python Version: 3.10.11
+   Usage:
+        from fmg_stream import iter_response_list
+        r = fmg.stream('exec', '/sys/proxy/json', data=data)
+        for entry in iter_response_list(r, 'entries'):
+            out_file.write(entry + '\n')
+'''
+
+## Define Modules
+#Decode the JSON items one by one
+import json
+#Find the list key in the stream
+import re
+#UTF-8 characters split between two chunks
+import codecs
+
+#Max characters kept while looking for the list key, enough for the FortiManager status of an error response
+HEAD_LIMIT = 65536
+
+
+def iter_json_list(chunks, key='entries'):
+    '''Yield the items of the first JSON list named key in a stream of JSON text
+    Arguments:
+    chunks - Iterable of bytes (or str) chunks of one JSON document, ex: Response.iter_content(65536)
+    key - Name of the list, the first "key": [ in the stream is used
+
+    Returns:
+    items - Generator of the decoded list items. Raises ValueError when the list is not in the stream or the JSON is
+            cut short, the message has the FortiManager status when the response was an error
+    '''
+    decoder = json.JSONDecoder()
+    utf8 = codecs.getincrementaldecoder('utf-8')()
+    #A JSON string with quotes is escaped, so an unescaped "key" followed by : is always an object key
+    start = re.compile(r'"%s"\s*:\s*\[' % re.escape(key))
+    chunks = iter(chunks)
+    buf = ''
+    head = ''
+    eof = False
+
+    def read():
+        nonlocal buf, eof
+        chunk = next(chunks, None)
+        if chunk is None:
+            eof = True
+            buf += utf8.decode(b'', final=True)
+        else:
+            buf += utf8.decode(chunk) if isinstance(chunk, bytes) else chunk
+    ## Find the start of the list
+    while True:
+        match = start.search(buf)
+        if match is not None:
+            buf = buf[match.end():]
+            break
+        if eof:
+            raise ValueError('No "%s" list in the response: %s' % (key, response_status(head + buf)))
+        #Keep the end of the buffer, the key can be split between two chunks
+        keep = len(key) + 64
+        if len(head) < HEAD_LIMIT:
+            head += buf[:-keep]
+        buf = buf[-keep:]
+        read()
+    ## Decode the items one by one
+    pos = 0
+    while True:
+        while True:
+            while pos < len(buf) and buf[pos] in ' \t\r\n,':
+                pos += 1
+            if pos < len(buf) or eof:
+                break
+            buf = ''
+            pos = 0
+            read()
+        if pos >= len(buf):
+            raise ValueError('Response ended inside the "%s" list' % key)
+        if buf[pos] == ']':
+            return
+        try:
+            item, end = decoder.raw_decode(buf, pos)
+        except json.JSONDecodeError:
+            if eof:
+                raise ValueError('Response ended inside the "%s" list' % key)
+            buf = buf[pos:]
+            pos = 0
+            read()
+            continue
+        #Only an item followed by , or ] is complete, a number cut by the chunk (ex: -1.5 of -1.5e3) goes on in the next chunk
+        after = end
+        while after < len(buf) and buf[after] in ' \t\r\n':
+            after += 1
+        if after >= len(buf) or buf[after] not in ',]':
+            if eof:
+                raise ValueError('Response ended inside the "%s" list' % key)
+            buf = buf[pos:]
+            pos = 0
+            read()
+            continue
+        yield item
+        pos = end
+        #Drop the decoded items, the buffer only holds the items not decoded yet
+        if pos > 65536:
+            buf = buf[pos:]
+            pos = 0
+
+
+def response_status(text):
+    '''FortiManager status of a small JSON response, the text itself when it is not one'''
+    try:
+        result = json.loads(text)['result'][0]
+        status = result['status']
+        for entry in result.get('data') or []:
+            if isinstance(entry, dict) and entry.get('status', {}).get('code', 0) != 0:
+                status = entry['status']
+        return 'code %s: %s' % (status.get('code'), status.get('message'))
+    except (ValueError, KeyError, IndexError, TypeError, AttributeError):
+        return text[:200]
+
+
+def iter_response_list(r, key='entries', chunk_size=65536):
+    '''Yield the items of the list named key from a streamed requests Response, the response is closed when done
+    Arguments:
+    r - requests Response sent with stream=True, ex: FMGClient.stream
+    key - Name of the list, see iter_json_list
+    chunk_size - Bytes read from the connection at a time
+    '''
+    try:
+        yield from iter_json_list(r.iter_content(chunk_size), key)
+    finally:
+        r.close()
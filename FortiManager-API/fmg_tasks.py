@@ -0,0 +1,390 @@
+#!/usr/bin/python
+'''Project: FortiManager Task Watcher
+   Details: Wait for FortiManager tasks (policy import, script execute, install, etc.) to finish. Replaces the poll_taskid
+            loop that slept a fixed 3 seconds between /task/task/<id> requests and kept the task state in a global,
+            so short tasks spent most of their time sleeping, long tasks were polled far more than needed and only
+            one task could be watched at a time.
+            TaskWatcher starts polling fast then backs off, using the task tot_percent to estimate how long is left
+            when the task reports progress, honors an overall deadline & reports each poll through callbacks.
+            TaskMultiplexer watches many tasks at once (fleet imports, script executions) from one background thread,
+            refreshing all of them with a single filtered task/task request per poll instead of one request per task.
+   Date: 2026
+   Classes: TaskWatcher, TaskMultiplexer, TaskTimeout, TaskFailed, TaskMissing
+   Python Version: 3.10.11
+   FortiManager Version: v7.0.8, should be compatible with 6.x & 7.x branch.
+   Usage:
+        from fmg_tasks import TaskWatcher, TASK_DONE
+        watcher = TaskWatcher(fmg, deadline=1800, on_progress=lambda taskID, task: print(task['tot_percent']))
+        task = watcher.wait(taskID)
+        if task['state'] != TASK_DONE:
+            print('--> Task %s is DIRTY' % taskID)
+
+        from fmg_tasks import TaskMultiplexer
+        with TaskMultiplexer(fmg, on_event=lambda taskID, event, task: print(taskID, event)) as mux:
+            futures = [mux.watch(taskID) for taskID in taskID_list]
+            tasks = [future.result() for future in futures]
+'''
+
+## Define Modules
+#For sleep between polls & measuring the deadline
+import time
+#Background polling thread of the TaskMultiplexer
+import threading
+#Per task result of the TaskMultiplexer
+from concurrent.futures import Future
+#For making HTTPS Connections to the FortiManager API Server
+import requests
+#Shared FortiManager API client
+from fmg_client import FMGError
+
+#FortiManager task states, json_resp['result'][0]['data']['state']
+TASK_STATES = {
+    0: 'pending',
+    1: 'running',
+    2: 'cancelling',
+    3: 'cancelled',
+    4: 'done',
+    5: 'error',
+    6: 'aborting',
+    7: 'aborted',
+    8: 'warning',
+    9: 'to_continue',
+    10: 'unknown'
+}
+TASK_DONE = 4
+TASK_WARNING = 8
+#States a task does not leave, polling stops when the task reaches one of them
+TASK_FINISHED_STATES = (3, 4, 5, 7, 8)
+#Event sent by the TaskMultiplexer for each finished state
+TASK_EVENTS = {
+    3: 'cancelled',
+    4: 'done',
+    5: 'error',
+    7: 'aborted',
+    8: 'warning'
+}
+
+
+class TaskTimeout(Exception):
+    '''Task did not finish before the deadline
+    Attributes:
+    taskID - Task ID that was being watched
+    task - Last task data returned by FortiManager, None if never read
+    '''
+    def __init__(self, taskID, task=None):
+        self.taskID = taskID
+        self.task = task
+        super().__init__('FortiManager task %s did not finish before the deadline' % taskID)
+
+
+class TaskFailed(Exception):
+    '''Task finished in a state that is not done or warning, ex: error, cancelled, aborted
+    Attributes:
+    taskID - Task ID that was being watched
+    task - Last task data returned by FortiManager
+    '''
+    def __init__(self, taskID, task):
+        self.taskID = taskID
+        self.task = task
+        super().__init__('FortiManager task %s finished with state %s' % (taskID, task_state_name(task.get('state'))))
+
+class TaskMissing(Exception):
+    '''Task is not returned by FortiManager, ex: purged, wrong Task ID or a task of another ADOM
+    Attributes:
+    taskID - Task ID that was being watched
+    error - FMGError of the /task/task/<id> request, None if it returned no task
+    '''
+    def __init__(self, taskID, error=None):
+        self.taskID = taskID
+        self.error = error
+        super().__init__('FortiManager task %s not found%s' % (taskID, ': %s' % error if error is not None else ''))
+
+def task_state_name(state):
+    '''Name of a FortiManager task state number, ex: 4 -> done'''
+    return TASK_STATES.get(state, 'unknown')
+
+
+class TaskWatcher:
+    '''Poll FortiManager tasks until they finish with an adaptive interval
+    Arguments:
+    fmg - Logged in FMGClient
+    min_interval - Seconds before the first poll & the shortest wait between polls, short tasks finish in a few polls
+    max_interval - Longest wait between polls, so long tasks are still checked regularly
+    backoff - Multiply the wait by this after every poll, used when the task does not report a percentage
+    deadline - Default seconds to wait for a task to finish, None waits forever
+    on_progress - Function called after every successful poll: on_progress(taskID, task), task is the task data dict
+    on_error - Function called when a poll fails: on_error(taskID, exception), polling continues until the deadline
+    '''
+    def __init__(self, fmg, min_interval=0.5, max_interval=15, backoff=1.5, deadline=None, on_progress=None, on_error=None):
+        self.fmg = fmg
+        self.min_interval = min_interval
+        self.max_interval = max_interval
+        self.backoff = backoff
+        self.deadline = deadline
+        self.on_progress = on_progress
+        self.on_error = on_error
+
+    def status(self, taskID):
+        '''Read the task from FortiManager
+        Arguments:
+        taskID - The Task ID returned from JSON API Response json_resp['result'][0]['data']['task']
+
+        Returns:
+        task - Task data, ex: {'id': 123, 'state': 1, 'tot_percent': 40, ...}. Raises FMGError on a JSON error code
+        '''
+        json_url = "/task/task/" + str(taskID)
+        http_code, json_resp = self.fmg.get(json_url)
+        status = json_resp['result'][0]['status']
+        if status['code'] != 0:
+            raise FMGError(status['code'], status['message'], json_url)
+        return json_resp['result'][0]['data']
+
+    def next_interval(self, interval, elapsed, percent):
+        '''Seconds to wait before the next poll
+        Arguments:
+        interval - Seconds waited before this poll
+        elapsed - Seconds since the task started being watched
+        percent - Task tot_percent, 0 when the task has not reported progress yet
+
+        Returns:
+        interval - Exponential backoff of the last wait. When the task reports a percentage, no longer than half of
+                   the estimated time left, so the poll lands near the end of the task instead of long after it.
+        '''
+        interval = interval * self.backoff
+        if 0 < percent < 100:
+            remaining = elapsed * (100 - percent) / percent
+            interval = min(interval, remaining / 2)
+        return max(self.min_interval, min(interval, self.max_interval))
+
+    def wait(self, taskID, deadline=None):
+        '''Poll a task until it reaches a finished state (cancelled, done, error, aborted, warning)
+        Arguments:
+        taskID - The Task ID returned from JSON API Response json_resp['result'][0]['data']['task']
+        deadline - Seconds to wait for this task, default is the watcher deadline
+
+        Returns:
+        task - Last task data read, task['state'] is one of TASK_FINISHED_STATES. Raises TaskTimeout after the deadline
+        '''
+        if deadline is None:
+            deadline = self.deadline
+        start = time.monotonic()
+        interval = self.min_interval
+        task = None
+        while True:
+            elapsed = time.monotonic() - start
+            if deadline is not None:
+                if elapsed >= deadline:
+                    raise TaskTimeout(taskID, task)
+                #Do not sleep past the deadline, take a last look at the task instead
+                interval = min(interval, deadline - elapsed)
+            time.sleep(interval)
+            try:
+                task = self.status(taskID)
+            except (requests.exceptions.RequestException, FMGError) as e:
+                if self.on_error is not None:
+                    self.on_error(taskID, e)
+                interval = self.next_interval(interval, time.monotonic() - start, 0)
+                continue
+            if self.on_progress is not None:
+                self.on_progress(taskID, task)
+            if task.get('state') in TASK_FINISHED_STATES:
+                return task
+            interval = self.next_interval(interval, time.monotonic() - start, task.get('tot_percent') or 0)
+
+
+class TaskMultiplexer(TaskWatcher):
+    '''Watch many FortiManager tasks with one task/task request per poll, from a background thread.
+       Every watched task gets a concurrent.futures.Future, set to the task data when the task reaches a finished state
+       (cancelled, done, error, aborted, warning), to TaskTimeout after its deadline or to TaskMissing when FortiManager does not
+       return the task. The poll interval backs off like TaskWatcher & is reset to min_interval when a new task is watched.
+       Use as a context manager to stop the thread.
+    Arguments:
+    fmg - Logged in FMGClient, shared with the threads starting the tasks
+    on_event - Function called when a task finishes: on_event(taskID, event, task), event is one of TASK_EVENTS
+    max_misses - Polls a task can be missing from the task/task response before it is read alone with /task/task/<id>,
+                 the future fails with TaskMissing if it is still not found
+    Other arguments are the same as TaskWatcher, on_progress & on_error are called from the polling thread
+    '''
+    def __init__(self, fmg, min_interval=0.5, max_interval=15, backoff=1.5, deadline=None, on_progress=None, on_error=None, on_event=None,
+                 max_misses=3):
+        super().__init__(fmg, min_interval, max_interval, backoff, deadline, on_progress, on_error)
+        self.on_event = on_event
+        self.max_misses = max_misses
+        #Watched tasks not finished yet, taskID: [future, start time, deadline, last task data, polls missing from the response]
+        self.tasks = {}
+        self.interval = min_interval
+        self.condition = threading.Condition()
+        self.thread = None
+        self.closed = False
+
+    def watch(self, taskID, deadline=None):
+        '''Start watching a task, watching the same task twice returns the same future
+        Arguments:
+        taskID - The Task ID returned from JSON API Response json_resp['result'][0]['data']['task']
+        deadline - Seconds to wait for this task, default is the multiplexer deadline
+
+        Returns:
+        future - concurrent.futures.Future, future.result() returns the finished task data or raises TaskTimeout/TaskMissing
+        '''
+        with self.condition:
+            if self.closed:
+                raise RuntimeError('TaskMultiplexer is closed')
+            if taskID in self.tasks:
+                return self.tasks[taskID][0]
+            future = Future()
+            self.tasks[taskID] = [future, time.monotonic(), deadline if deadline is not None else self.deadline, None, 0]
+            #New task, poll fast again
+            self.interval = self.min_interval
+            if self.thread is None:
+                self.thread = threading.Thread(target=self.run, name='fmg-task-multiplexer', daemon=True)
+                self.thread.start()
+            self.condition.notify()
+        return future
+
+    def wait(self, taskID, deadline=None):
+        '''Watch a task & wait for it to finish, see TaskWatcher.wait'''
+        return self.watch(taskID, deadline).result()
+
+    def wait_all(self, taskID_list, deadline=None):
+        '''Watch many tasks & wait for all of them to finish
+
+        Returns:
+        tasks - Dict of taskID: finished task data, or the TaskTimeout/TaskMissing exception for tasks that did not finish
+        '''
+        futures = {taskID: self.watch(taskID, deadline) for taskID in taskID_list}
+        tasks = {}
+        for taskID, future in futures.items():
+            try:
+                tasks[taskID] = future.result()
+            except (TaskTimeout, TaskMissing) as e:
+                tasks[taskID] = e
+        return tasks
+
+    def finish(self, taskID, task=None, error=None):
+        '''Stop watching a task & set its future, called with the condition held'''
+        future = self.tasks.pop(taskID)[0]
+        if error is not None:
+            future.set_exception(error)
+        else:
+            if self.on_event is not None:
+                self.on_event(taskID, TASK_EVENTS[task['state']], task)
+            future.set_result(task)
+
+    def poll(self):
+        '''Refresh every watched task with one filtered task/task request, then finish the tasks that are done.
+           Raises requests.exceptions.RequestException or FMGError if the request failed.
+        '''
+        with self.condition:
+            taskID_list = list(self.tasks)
+        if not taskID_list:
+            return
+        json_url = "/task/task"
+        http_code, json_resp = self.fmg.get(json_url, filter=["id", "in"] + taskID_list)
+        status = json_resp['result'][0]['status']
+        if status['code'] != 0:
+            raise FMGError(status['code'], status['message'], json_url)
+        #Task IDs can come back as int or str, match them on the str value
+        returned = {str(task.get('id')): task for task in json_resp['result'][0].get('data') or []}
+        missing = []
+        with self.condition:
+            for taskID in taskID_list:
+                if taskID not in self.tasks:
+                    continue
+                task = returned.get(str(taskID))
+                if task is None:
+                    self.tasks[taskID][4] += 1
+                    if self.tasks[taskID][4] >= self.max_misses:
+                        missing.append(taskID)
+                    continue
+                self.update(taskID, task)
+        #Not in the filtered response for max_misses polls, ex: purged, wrong Task ID or a task of another ADOM. Ask for it alone,
+        #without a deadline the future would otherwise never be set
+        for taskID in missing:
+            try:
+                task = self.status(taskID)
+                error = None
+            except FMGError as e:
+                task = None
+                error = e
+            with self.condition:
+                if taskID not in self.tasks:
+                    continue
+                if isinstance(task, dict) and task.get('state') is not None:
+                    self.update(taskID, task)
+                else:
+                    self.finish(taskID, error=TaskMissing(taskID, error))
+
+    def update(self, taskID, task):
+        '''Store the task data read by a poll & finish the task when it is done, called with the condition held'''
+        self.tasks[taskID][3] = task
+        self.tasks[taskID][4] = 0
+        if self.on_progress is not None:
+            self.on_progress(taskID, task)
+        if task.get('state') in TASK_FINISHED_STATES:
+            self.finish(taskID, task)
+
+    def expire(self):
+        '''Fail the tasks that passed their deadline with TaskTimeout'''
+        now = time.monotonic()
+        with self.condition:
+            for taskID, (future, start, deadline, task, misses) in list(self.tasks.items()):
+                if deadline is not None and now - start >= deadline:
+                    self.finish(taskID, error=TaskTimeout(taskID, task))
+
+    def run(self):
+        '''Polling thread, sleeps while no task is watched. An unexpected error (ex: raised by a callback) is set on the future
+           of every watched task before the thread stops, the next watch starts a new thread
+        '''
+        try:
+            self.run_polls()
+        except Exception as e:
+            with self.condition:
+                for taskID in list(self.tasks):
+                    self.finish(taskID, error=e)
+                self.thread = None
+            raise
+
+    def run_polls(self):
+        '''Poll loop of the polling thread, returns when the multiplexer is closed'''
+        while True:
+            with self.condition:
+                while not self.tasks and not self.closed:
+                    self.condition.wait()
+                if self.closed:
+                    return
+                self.condition.wait(self.interval)
+                if self.closed:
+                    return
+            try:
+                self.poll()
+            except (requests.exceptions.RequestException, FMGError) as e:
+                if self.on_error is not None:
+                    #Snapshot, watch can add tasks from other threads while the callbacks run
+                    with self.condition:
+                        taskID_list = list(self.tasks)
+                    for taskID in taskID_list:
+                        self.on_error(taskID, e)
+            self.expire()
+            #Next wait is the shortest any running task needs, percent aware like TaskWatcher
+            now = time.monotonic()
+            with self.condition:
+                intervals = [self.next_interval(self.interval, now - start, (task or {}).get('tot_percent') or 0)
+                             for future, start, deadline, task, misses in self.tasks.values()]
+                self.interval = min(intervals) if intervals else self.min_interval
+
+    def close(self):
+        '''Stop the polling thread, futures of tasks still running are cancelled'''
+        with self.condition:
+            self.closed = True
+            for future, start, deadline, task, misses in self.tasks.values():
+                future.cancel()
+            self.tasks = {}
+            self.condition.notify_all()
+        if self.thread is not None:
+            self.thread.join()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
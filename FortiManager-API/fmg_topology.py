@@ -0,0 +1,376 @@
+#!/usr/bin/python
+'''Project: FortiManager Device/VDOM/ADOM Topology Index
+   Details: In memory index of every FortiGate device, its VDOMs & the ADOM each VDOM belongs to, built from two bulk
+            calls sent in one multi-params request: dvmdb/device (devices with their vdom sub-objects) & dvmdb/adom with
+            option "object member" (the device/VDOM members of every ADOM).
+            FMG_GET_ADOM-to-VDOM_Mapping.py get_adom/get_vdoms need one get_adom plus one VDOM query per ADOM for each device,
+            the index answers any device's VDOM to ADOM mapping, or any ADOM's devices, from dicts without another API call.
+            TopologySnapshot keeps the topology in a local SQLite file so repeated queries & other scripts can read it
+            without the FortiManager. Refresh is incremental: a light dvmdb/device pull of only the revision fields
+            (conf_status, db_status, os_ver, etc.) & VDOM list is digested per device with the ADOM of each VDOM, only new
+            or changed devices are pulled in full,
+            ADOM member lists are digested & only changed ADOMs rewritten.
+            DeviceResolver resolves device names to OID/serial/ADOMs for many names in one multi-params request, either one
+            fields restricted pull of every device or chunks of "name in" filters, kept in a TTL/LRU cache shared by every
+            resolver of the same FortiManager instead of one filtered dvmdb/device request per device.
+   Date: 2026
+   Classes: TopologyIndex, TopologySnapshot, DeviceResolver
+   Python Version: 3.10.11
+   FortiManager Version: v7.0.8, should be compatible with 6.x & 7.x branch.
+   Usage:
+        from fmg_topology import TopologyIndex
+        topology = TopologyIndex.fetch(fmg)
+        topology.device_vdoms('FGT-01')         #{'root': 'ADOM1', 'vdom2': 'ADOM2'}
+        topology.adom_devices('ADOM2')          #[('FGT-01', 'vdom2'), ...]
+
+        from fmg_topology import TopologySnapshot
+        snapshot = TopologySnapshot('fmg_topology.db')
+        snapshot.refresh(fmg)                    #Only new/changed devices & ADOMs are pulled
+        topology = snapshot.index()              #TopologyIndex read from the SQLite file, no API call
+
+        from fmg_topology import DeviceResolver
+        resolver = DeviceResolver(fmg)
+        resolver.resolve(device_names)           #{name: {'name', 'oid', 'sn', 'adoms'}}, one request for every name
+        resolver.oid('FGT-01')                   #From the cache
+'''
+
+## Define Modules
+#Device & ADOM data stored as JSON in the snapshot
+import json
+#Digest of the revision fields of a device/ADOM
+import hashlib
+#Snapshot refresh time
+import time
+#Local topology snapshot file
+import sqlite3
+#Snapshot shared between threads
+import threading
+#Shared FortiManager API client
+from fmg_client import FMGError
+#Device name resolver cache
+from fmg_cache import TTLCache, MISSING
+
+#dvmdb/device fields that change when a device config, database, firmware or HA mode changes,
+#digested to find the devices to pull again. Fields missing in a FortiManager version are digested as None
+DEVICE_REVISION_FIELDS = ["name", "oid", "conf_status", "db_status", "dev_status", "os_ver", "mr", "patch", "build", "ha_mode", "sn"]
+
+
+class TopologyIndex:
+    '''Device -> VDOM -> ADOM & ADOM -> devices index of a FortiManager
+    Arguments:
+    devices - dvmdb/device data, list of devices with their vdom sub-objects
+    adoms - dvmdb/adom data with option "object member", list of ADOMs with their "object member" list
+    '''
+    def __init__(self, devices, adoms):
+        #Device name: device data from dvmdb/device
+        self.devices = {}
+        #Device name: {VDOM name: ADOM name, None if the VDOM is in no ADOM}
+        self.device_vdom_adom = {}
+        #ADOM name: [(device name, VDOM name)] in FortiManager order
+        self.adom_members = {}
+        #ADOM name: ADOM data from dvmdb/adom
+        self.adoms = {}
+        for device in devices:
+            name = device.get('name')
+            self.devices[name] = device
+            self.device_vdom_adom[name] = {vdom.get('name'): None for vdom in device.get('vdom') or []}
+        for adom in adoms:
+            adom_name = adom.get('name')
+            self.adoms[adom_name] = adom
+            members = self.adom_members.setdefault(adom_name, [])
+            for member in adom.get('object member') or []:
+                device_name = member.get('name')
+                #Devices without VDOMs are members with the root VDOM
+                vdom_name = member.get('vdom') or 'root'
+                members.append((device_name, vdom_name))
+                self.device_vdom_adom.setdefault(device_name, {})[vdom_name] = adom_name
+
+    @classmethod
+    def fetch(cls, fmg):
+        '''Build the index from the FortiManager with dvmdb/device & dvmdb/adom sent in one multi-params request
+        Arguments:
+        fmg - Logged in FMGClient
+
+        Returns:
+        topology - TopologyIndex. Raises FMGError if FortiManager returned an error for either call
+        '''
+        with fmg.batch() as batch:
+            devices = batch.get("dvmdb/device")
+            adoms = batch.get("dvmdb/adom", fields=["name", "oid"], option=["object member"])
+        for result in (devices, adoms):
+            if not result.ok:
+                raise FMGError(result.code, result.message, result.url)
+        return cls(devices.data or [], adoms.data or [])
+
+    def device_vdoms(self, device_name):
+        '''VDOM to ADOM mapping of a device
+
+        Returns:
+        vdoms - {VDOM name: ADOM name}, ADOM is None for a VDOM in no ADOM, empty dict for an unknown device
+        '''
+        return dict(self.device_vdom_adom.get(device_name, {}))
+
+    def device_adoms(self, device_name):
+        '''Sorted list of the ADOMs a device has VDOMs in'''
+        return sorted(set(adom for adom in self.device_vdom_adom.get(device_name, {}).values() if adom is not None))
+
+    def vdom_adom(self, device_name, vdom_name='root'):
+        '''ADOM a device VDOM belongs to, None if unknown or in no ADOM'''
+        return self.device_vdom_adom.get(device_name, {}).get(vdom_name)
+
+    def adom_devices(self, adom_name):
+        '''List of (device name, VDOM name) members of an ADOM'''
+        return list(self.adom_members.get(adom_name, []))
+
+    def device_oid(self, device_name):
+        '''FortiManager OID of a device, None if unknown'''
+        device = self.devices.get(device_name)
+        return device.get('oid') if device is not None else None
+
+
+class TopologySnapshot:
+    '''Local SQLite snapshot of the FortiManager device/VDOM/ADOM topology with incremental refresh
+    Arguments:
+    db_file - SQLite file, created if it does not exist
+    '''
+    def __init__(self, db_file):
+        self.db_file = db_file
+        self.lock = threading.Lock()
+        self.db = sqlite3.connect(db_file, check_same_thread=False)
+        with self.db:
+            self.db.executescript('''
+                CREATE TABLE IF NOT EXISTS device (name TEXT PRIMARY KEY, oid INTEGER, digest TEXT, data TEXT, updated REAL);
+                CREATE TABLE IF NOT EXISTS vdom (device TEXT, name TEXT, oid INTEGER, PRIMARY KEY (device, name));
+                CREATE TABLE IF NOT EXISTS adom (name TEXT PRIMARY KEY, oid INTEGER, digest TEXT, updated REAL);
+                CREATE TABLE IF NOT EXISTS adom_member (adom TEXT, device TEXT, vdom TEXT);
+                CREATE INDEX IF NOT EXISTS adom_member_device ON adom_member (device);
+                CREATE INDEX IF NOT EXISTS adom_member_adom ON adom_member (adom);
+                CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT);
+            ''')
+
+    @staticmethod
+    def digest(values):
+        '''Digest of JSON values, same values in the same order give the same digest'''
+        return hashlib.sha1(json.dumps(values, sort_keys=True).encode()).hexdigest()
+
+    def refresh(self, fmg, full=False):
+        '''Refresh the snapshot from the FortiManager, only new or changed devices & ADOMs are pulled/rewritten.
+           Two requests when nothing changed: the revision fields of every device with the ADOM member lists,
+           then one multi-params request for the changed devices.
+        Arguments:
+        fmg - Logged in FMGClient
+        full - Pull every device in full, ex: when the revision fields are not enough for a change
+
+        Returns:
+        stats - {'devices_changed': n, 'devices_removed': n, 'adoms_changed': n, 'adoms_removed': n}. Raises FMGError on API errors
+        '''
+        with fmg.batch() as batch:
+            revisions = batch.get("dvmdb/device", fields=DEVICE_REVISION_FIELDS)
+            adoms = batch.get("dvmdb/adom", fields=["name", "oid"], option=["object member"])
+        for result in (revisions, adoms):
+            if not result.ok:
+                raise FMGError(result.code, result.message, result.url)
+        with self.lock:
+            known_devices = dict(self.db.execute('SELECT name, digest FROM device'))
+            known_adoms = dict(self.db.execute('SELECT name, digest FROM adom'))
+        ## Devices, pull the new or changed ones in full with their vdom sub-objects. The digest covers the VDOMs & the
+        ## ADOM of each VDOM too, a VDOM added, removed or moved to another ADOM does not always change a revision field
+        vdom_adoms = {}
+        for adom in adoms.data or []:
+            for member in adom.get('object member') or []:
+                vdom_adoms.setdefault(member.get('name'), {})[member.get('vdom') or 'root'] = adom.get('name')
+        device_digests = {}
+        for device in revisions.data or []:
+            vdoms = dict.fromkeys((vdom.get('name') for vdom in device.get('vdom') or []), None)
+            vdoms.update(vdom_adoms.get(device.get('name'), {}))
+            device_digests[device.get('name')] = self.digest([[device.get(field) for field in DEVICE_REVISION_FIELDS],
+                                                              sorted(vdoms.items(), key=lambda item: item[0])])
+        changed = [name for name, digest in device_digests.items() if full or known_devices.get(name) != digest]
+        removed_devices = [name for name in known_devices if name not in device_digests]
+        device_results = {}
+        if changed:
+            with fmg.batch() as batch:
+                device_results = {name: batch.get("dvmdb/device/" + name) for name in changed}
+        ## ADOMs, rewrite the member list of the new or changed ones
+        adom_digests = {}
+        adom_data = {}
+        for adom in adoms.data or []:
+            members = sorted((member.get('name'), member.get('vdom') or 'root') for member in adom.get('object member') or [])
+            adom_digests[adom.get('name')] = self.digest([adom.get('oid'), members])
+            adom_data[adom.get('name')] = (adom.get('oid'), members)
+        changed_adoms = [name for name, digest in adom_digests.items() if full or known_adoms.get(name) != digest]
+        removed_adoms = [name for name in known_adoms if name not in adom_digests]
+        now = time.time()
+        with self.lock, self.db:
+            for name, result in device_results.items():
+                #Device removed between the two requests, picked up by the next refresh
+                if not result.ok:
+                    continue
+                device = result.data
+                self.db.execute('INSERT OR REPLACE INTO device VALUES (?, ?, ?, ?, ?)',
+                                (name, device.get('oid'), device_digests[name], json.dumps(device), now))
+                self.db.execute('DELETE FROM vdom WHERE device = ?', (name,))
+                self.db.executemany('INSERT INTO vdom VALUES (?, ?, ?)',
+                                    [(name, vdom.get('name'), vdom.get('oid')) for vdom in device.get('vdom') or []])
+            for name in removed_devices:
+                self.db.execute('DELETE FROM device WHERE name = ?', (name,))
+                self.db.execute('DELETE FROM vdom WHERE device = ?', (name,))
+            for name in changed_adoms:
+                oid, members = adom_data[name]
+                self.db.execute('INSERT OR REPLACE INTO adom VALUES (?, ?, ?, ?)', (name, oid, adom_digests[name], now))
+                self.db.execute('DELETE FROM adom_member WHERE adom = ?', (name,))
+                self.db.executemany('INSERT INTO adom_member VALUES (?, ?, ?)', [(name, device, vdom) for device, vdom in members])
+            for name in removed_adoms:
+                self.db.execute('DELETE FROM adom WHERE name = ?', (name,))
+                self.db.execute('DELETE FROM adom_member WHERE adom = ?', (name,))
+            self.db.execute('INSERT OR REPLACE INTO meta VALUES (?, ?)', ('refreshed', str(now)))
+        return {'devices_changed': len(changed), 'devices_removed': len(removed_devices),
+                'adoms_changed': len(changed_adoms), 'adoms_removed': len(removed_adoms)}
+
+    @property
+    def refreshed(self):
+        '''time.time() of the last refresh, None if never refreshed'''
+        with self.lock:
+            row = self.db.execute('SELECT value FROM meta WHERE key = ?', ('refreshed',)).fetchone()
+        return float(row[0]) if row else None
+
+    def index(self):
+        '''TopologyIndex built from the snapshot, no API call'''
+        with self.lock:
+            devices = [json.loads(data) for data, in self.db.execute('SELECT data FROM device ORDER BY name')]
+            adoms = {name: {'name': name, 'oid': oid, 'object member': []} for name, oid in self.db.execute('SELECT name, oid FROM adom ORDER BY name')}
+            for adom, device, vdom in self.db.execute('SELECT adom, device, vdom FROM adom_member ORDER BY rowid'):
+                if adom in adoms:
+                    adoms[adom]['object member'].append({'name': device, 'vdom': vdom})
+        return TopologyIndex(devices, list(adoms.values()))
+
+    def device_oid(self, device_name):
+        '''FortiManager OID of a device from the snapshot, None if unknown'''
+        with self.lock:
+            row = self.db.execute('SELECT oid FROM device WHERE name = ?', (device_name,)).fetchone()
+        return row[0] if row else None
+
+    def device_vdoms(self, device_name):
+        '''{VDOM name: ADOM name} of a device from the snapshot, see TopologyIndex.device_vdoms'''
+        with self.lock:
+            vdoms = {name: None for name, in self.db.execute('SELECT name FROM vdom WHERE device = ?', (device_name,))}
+            vdoms.update(self.db.execute('SELECT vdom, adom FROM adom_member WHERE device = ?', (device_name,)))
+        return vdoms
+
+    def close(self):
+        with self.lock:
+            self.db.close()
+
+
+#Device names resolved by every DeviceResolver, keyed by (FortiManager host, device name)
+DEVICE_CACHE = TTLCache(maxsize=50000, ttl=300)
+
+
+class DeviceResolver:
+    '''Resolve many device names to OID, serial & ADOMs with one multi-params request & a shared TTL/LRU cache
+    Arguments:
+    fmg - Logged in FMGClient
+    cache - TTLCache of resolved devices, default DEVICE_CACHE is shared by every resolver
+    fields - dvmdb/device fields pulled for each device, name & oid are always pulled
+    full_pull_threshold - Pull every device in one request when at least this many names are not cached,
+                          fewer names are pulled with "name in" filters
+    chunk_size - Names per "name in" filter, the chunks are sent together in one multi-params request
+    '''
+    def __init__(self, fmg, cache=None, fields=None, full_pull_threshold=100, chunk_size=100):
+        self.fmg = fmg
+        self.cache = cache if cache is not None else DEVICE_CACHE
+        self.fields = ["name", "oid"] + [field for field in fields or ["sn"] if field not in ("name", "oid")]
+        self.full_pull_threshold = full_pull_threshold
+        self.chunk_size = chunk_size
+
+    def key(self, device_name):
+        return (self.fmg.host, device_name)
+
+    def store(self, devices, adom_results, names=None):
+        '''Cache devices with their ADOMs, names not returned by FortiManager are cached as None
+
+        Returns:
+        resolved - {name: device entry}
+        '''
+        adoms = {}
+        for result in adom_results:
+            for adom in result.data or []:
+                for member in adom.get('expand member', adom.get('object member')) or []:
+                    adoms.setdefault(member.get('name'), []).append(adom.get('name'))
+        resolved = {}
+        for device in devices:
+            entry = dict(device)
+            entry['adoms'] = sorted(set(adoms.get(device.get('name'), [])))
+            resolved[device.get('name')] = entry
+            self.cache.set(self.key(device.get('name')), entry)
+        for name in names or []:
+            if name not in resolved:
+                #Unknown device, cached too so it is not looked up again until it expires
+                self.cache.set(self.key(name), None)
+        return resolved
+
+    def load_all(self):
+        '''Pull & cache every device with dvmdb/device (fields restricted) & the ADOM members, in one multi-params request
+
+        Returns:
+        devices - {name: {'name', 'oid', fields..., 'adoms': [ADOM names]}}. Raises FMGError on API errors
+        '''
+        with self.fmg.batch() as batch:
+            devices = batch.get("dvmdb/device", fields=self.fields, option=["no loadsub"])
+            adoms = batch.get("dvmdb/adom", fields=["name"], option=["object member"])
+        for result in (devices, adoms):
+            if not result.ok:
+                raise FMGError(result.code, result.message, result.url)
+        return self.store(devices.data or [], [adoms])
+
+    def resolve(self, device_names):
+        '''Resolve device names, only the names not cached are pulled
+        Arguments:
+        device_names - Device names to resolve
+
+        Returns:
+        devices - {name: device entry, None for a device not in the FortiManager}. Raises FMGError on API errors
+        '''
+        devices = {}
+        missing = []
+        for name in device_names:
+            entry = self.cache.get(self.key(name), MISSING)
+            if entry is MISSING:
+                missing.append(name)
+            else:
+                devices[name] = entry
+        if not missing:
+            return devices
+        if len(missing) >= self.full_pull_threshold:
+            resolved = self.load_all()
+            for name in missing:
+                if name not in resolved:
+                    self.cache.set(self.key(name), None)
+        else:
+            #Every chunk of names & the ADOMs of those names in one multi-params request
+            chunks = [missing[start:start + self.chunk_size] for start in range(0, len(missing), self.chunk_size)]
+            with self.fmg.batch() as batch:
+                device_results = [batch.get("dvmdb/device", fields=self.fields, option=["no loadsub"], filter=["name", "in"] + chunk)
+                                  for chunk in chunks]
+                adom_results = [batch.get("dvmdb/adom", fields=["name"],
+                                          **{"expand member": [{"fields": ["name"], "filter": ["name", "in"] + chunk, "url": "/device"}]})
+                                for chunk in chunks]
+            for result in device_results + adom_results:
+                if not result.ok:
+                    raise FMGError(result.code, result.message, result.url)
+            resolved = self.store([device for result in device_results for device in result.data or []], adom_results, missing)
+        for name in missing:
+            devices[name] = resolved.get(name)
+        return devices
+
+    def oid(self, device_name):
+        '''OID of one device, None if it is not in the FortiManager'''
+        entry = self.resolve([device_name])[device_name]
+        return entry.get('oid') if entry is not None else None
+
+    def invalidate(self, device_name=None):
+        '''Drop one device, or every device of this FortiManager, from the cache'''
+        if device_name is not None:
+            self.cache.invalidate(self.key(device_name))
+        else:
+            self.cache.invalidate_if(lambda key: key[0] == self.fmg.host)
@@ -2,17 +2,28 @@
 '''Project: FortiManager Pull Web Filter Profiles per ADOM and list Local & FortiGuard Categories and their Action - Block, Warning, Auth, Allow, etc.
    Details: Customers or Security Engineers might need to display (on Screen & CSV) FortiManager ADOM(customer) Web Profile Local & FortiGuard Categories.
             There is multiple Section & Sub Level for FortiGuard Categories and hard to screenshot (expand sections, etc) then share.
-            The get_webfiltercat function will use Prettytable Python Module to display via screen & output to CSV to share in a readable format.
+            The get_webfiltercat function will use Prettytable Python Module to display via screen & Text file, and writes a CSV (or TSV) file with
+            one row per ADOM, Profile, Category & Action to share in a readable format or load into other tools.
             This could be done by changing the API and pointed to FortiGate directly.
             Biggest challenge was understanding first you grab the Web Profile, then grab the ID, then map the ID to FortiGuard Profile & Category names.
             This could probably be built out automatically but it is static per FortiOS version and if new Category is added in future FortiOS Releases
-            easy to pull new ID then add it.
+            easy to pull new ID then add it to fortiguard_categories.json, keep that file in the same folder as this script.
    Date: 12-26-2020
-   Functions: def get_webfiltercat
+   Classes: ActionMatrix, CategoryCSVWriter
+   Functions: def load_category_catalog, def category_layout, def profile_actions, def profile_rows, def get_local_categories,
+              def fetch_webfilter_profiles, def fetch_webfilter_profiles_async, def write_webfilter_report, def get_webfiltercat, def csv_extension,
+              def list_adoms, def get_webfiltercat_adoms
    Python Version: 3.7.4
    FortiManager Version: v6.2.3 on Azure, compatible and tested with v6.0.9 GA
    Fortigate Version: FortiOS 6.2 & 6.0 compatible and tested.
    IDE: Visual Studio
+   Usage: Interactive, prompts for FortiManager, API User & one ADOM:
+                python fmg_webprofile_cat_list-report.py
+          Non interactive, many ADOMs fetched at the same time (asyncio, --workers requests in flight), one combined report plus per ADOM files.
+          Password from FMG_PASSWD or prompted:
+                python fmg_webprofile_cat_list-report.py --host 1.1.1.1 --user apiuser --adoms ADOM1,ADOM2 --workers 8
+                python fmg_webprofile_cat_list-report.py --host 1.1.1.1 --user apiuser --adoms all
+          Add --debug to write every raw API response to a DEBUG-CONSOLE-OUTPUT file, rotated & gzip compressed at --debug-max-bytes.
    Instructions for Creating API User Account, for get_webfiltercat functions ReadOnly user Profile is the minimum: 
         - Add an API user in your FortiManager
             -Log into FortiManager with admin account, Go To:
@@ -31,652 +42,587 @@
 import sys
 #To use getpass to hide passwd when user is inputting it
 import getpass
-#For making HTTPS Connections to the FortiManager API Server
-import requests
-import urllib3
-#To ignore the FortiManager Self Signed Certificate warnings.
-urllib3.disable_warnings(urllib3.exceptions.InsecureRequestWarning)
 #To receive and format JSON requests as FortiManager uses JSON formatting in their API
 import json
 #Time - help to generate unique file
 import time
-#Pretty Tables to display in a readable format via screen & to help output to a CSV format.
+#Pretty Tables to display in a readable format via screen & Text file.
 from prettytable import PrettyTable
+#Streaming CSV/TSV output, one row per ADOM, Profile & Category
+import csv
+#To find the FortiGuard Category catalog file next to this script
+import os
+#Compact signed byte arrays for the Web Profile x Category action matrix
+from array import array
+#Command line options for the non interactive multi ADOM report
+import argparse
+#Fetch several ADOMs at the same time over the pooled FortiManager connection
+import asyncio
+#ADOMs fetched ahead of the one being written
+from collections import deque
+#For the connection errors of the FortiManager API Server
+import requests
+#Shared FortiManager API client, pooled HTTPS connection & session handling
+from fmg_client import FMGClient, FMGError
+#Opt-in debug output of the raw API responses
+from fmg_debug import DebugSink, DEBUG
+#asyncio client with bounded concurrency for the multi ADOM report
+from fmg_async_client import AsyncFMGClient
+
+## Global Vars
+#FortiGuard Category groups, IDs & names. Static per FortiOS version, if a new Category is added in a future FortiOS Release
+#add its ID & name to this file, or point CATEGORY_CATALOG_FILE to a catalog file for that FortiOS version.
+CATEGORY_CATALOG_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fortiguard_categories.json")
+#Actions - Webfilter Profile Action type Index to Text. Categories without a filter entry take the default action Allow.
+ACTION_ALLOW = -1
+ACTION_NAMES = {0: 'Block', 2: 'Monitor', 3: 'Warning', 4: 'Authenticate', ACTION_ALLOW: 'Allow'}
+#Action matrix cell of a Local Category of another ADOM, the Web Profile can not use it
+ACTION_NONE = -2
 
 ## Functions
-def fmg_login(hostAPIUSER, hostPASSWD, hostIP):
-    '''FortiManager Login & Create Session
+def load_category_catalog(catalog_file=CATEGORY_CATALOG_FILE):
+    '''Load the FortiGuard Category catalog & precompute the report row layout
     Arguments:
-    hostAPIUSER - API User Account Name
-    hostPASSWD - API User Passwd
-    hostIP - IP addres of FortiManager. Note, if not on default HTTPS(443) port can input: 1.1.1.1:8080
+    catalog_file - JSON file with the catalog version & groups of [CATEGORY-ID, Name]
+
+    Returns:
+    catalog - dict with version, groups, rows - list of (Row Name, CATEGORY-ID or None for a group heading) & max_id
     '''
-    #Global Save Session ID
-    global session
-    #Create HTTPS URL
-    global url
-    url = 'https://' + hostIP + '/jsonrpc'
-    #JSON Body to sent to API request
-    body = {
-    "id": 1,
-            "method": "exec",
-            "params": [{
-                    "url": "sys/login/user",
-                    "data": [{
-                            "user": hostAPIUSER,
-                            "passwd": hostPASSWD
-                    }]
-            }],
-            "session": 1
-    }
-    #Test HTTPS connection to host then Capture and output any errors
     try:
-        r = requests.post(url, json=body, verify=False)
-    except requests.exceptions.RequestException as e: 
-        print (SystemError(e))
-        #Exit Program, Connection was not Successful
-        sys.exit(1)
-    #Save JSON response from FortiManager
-    json_resp = json.loads(r.text)
-    #Check if User & Passwd was valid, no code -11 means invalid
-    if json_resp['result'][0]['status']['code'] != -11:
-        session = json_resp['session']
-        print ('--> Logging into FortiManager: %s' % hostIP)
-        #HTTP & JSON code & message
-        print ('<-- HTTPcode: %d JSONmesg: %s' % (r.status_code, json_resp['result'][0]['status']['message']))
-        print
-    else:
-        print ('<--Username or password is not valid, please try again, exiting...')
-        #HTTP & JSON code & message
-        print ('<-- HTTPcode: %d JSONmesg: %s' % (r.status_code, json_resp['result'][0]['status']['message']))
-        print
-        #Exit Program, Username or Password is not valided or internal FortiManager error review Hcode & Jmesg
+        with open(catalog_file) as catalog_json:
+            catalog = json.load(catalog_json)
+    except (OSError, ValueError) as e:
+        print("Unable to load FortiGuard Category catalog %s, exiting... %s" % (catalog_file, e))
         sys.exit(1)
+    rows = []
+    max_id = 0
+    for group in catalog['groups']:
+        rows.append((group['name'], None))
+        for cat_id, cat_name in group['categories']:
+            rows.append(("    " + cat_name, cat_id))
+            max_id = max(max_id, cat_id)
+    catalog['rows'] = rows
+    catalog['max_id'] = max_id
+    return catalog
+
+def category_layout(catalog, local_cats):
+    '''Row layout of a Web Profile table for one ADOM, the ADOM Local Categories followed by the catalog rows
+    Arguments:
+    catalog - FortiGuard Category catalog from load_category_catalog
+    local_cats - ADOM Local Categories from get_local_categories
+
+    Returns:
+    layout - list of (Row Name, CATEGORY-ID or None for a group heading)
+    size - Length of the action array needed to index every CATEGORY-ID in the layout
+    '''
+    layout = [("Local Categories", None)]
+    max_id = catalog['max_id']
+    for local_id, local_desc in local_cats:
+        layout.append(("    " + local_desc, local_id))
+        max_id = max(max_id, local_id)
+    layout.extend(catalog['rows'])
+    return layout, max_id + 1
 
-def fmg_logout(hostIP):
-    '''FortiManager logout
+def profile_actions(filters, size):
+    '''Web Profile action of every Category, in an array indexed by CATEGORY-ID
     Arguments:
-    hostIP - IP addres of FortiManager. Note, if not on default HTTPS(443) port can input: 1.1.1.1:8080
+    filters - ftgd-wf/filters data of the Web Profile, list of {'category': [CATEGORY-ID], 'action': action}
+    size - Array length, from category_layout
+
+    Returns:
+    actions - array of action codes, one byte each, ACTION_ALLOW for Categories without a filter entry
     '''
-    body = {
-       "id": 1,
-        "method": "exec",
-        "params": [{
-                "url": "sys/logout"
-        }],
-        "session": session
-    }
-    #Test HTTPS connection to host then Capture and output any errors
-    try:
-        r = requests.post(url, json=body, verify=False)
-    except requests.exceptions.RequestException as e:
-        print (SystemError(e))
-        #Exit Program, Connection was not Successful
-        sys.exit(1)
-    #Save JSON response from FortiManager    
-    json_resp = json.loads(r.text)
-    #Check if any API Errors returned
-    if json_resp['result'][0]['status']['code'] != -11:    
-        print ('--> Logging out of FMG: %s' % hostIP)
-        #HTTP & JSON code & message
-        print ('<-- HTTPcode: %d JSONmesg: %s' % (r.status_code, json_resp['result'][0]['status']['message']))
-        print
-    else:
-        print ('<--Error Occured, check Hcode & Jmesg')
-        #Exit Program, internal FortiManager error review Hcode & Jmesg
-        print ('<-- HTTPcode: %d JSONmesg: %s' % (r.status_code, json_resp['result'][0]['status']['message']))
-        print
-        sys.exit(1)   
+    actions = array('b', [ACTION_ALLOW]) * size
+    for cats in filters or []:
+        category = cats['category']
+        for cat_id in (category if isinstance(category, list) else [category]):
+            cat_id = int(cat_id)
+            if cat_id < size:
+                actions[cat_id] = cats['action']
+    return actions
+
+def profile_rows(layout, actions):
+    '''Table rows [Category, Setting] of a Web Profile
+    Arguments:
+    layout - Row layout from category_layout
+    actions - Action array from profile_actions
+    '''
+    return [[name, ACTION_NAMES.get(actions[cat_id], str(actions[cat_id])) if cat_id is not None else ""] for name, cat_id in layout]
+
+class ActionMatrix:
+    '''Web Profile x Category action matrix, one signed byte per cell. Row = Web Profile, columns = the FortiGuard CATEGORY-IDs
+       followed by one column per (ADOM, Local CATEGORY-ID), Local Categories with the same ID in two ADOMs are different Categories.
+       It answers fleet questions across Profiles & ADOMs, ex: which Profiles allow Category 26 (Malicious Websites):
+       matrix.profiles_with_action(26, ACTION_ALLOW), or block Local Category 140 of ADOM1: matrix.profiles_with_action(('ADOM1', 140), 0)
+    Arguments:
+    categories - Number of FortiGuard CATEGORY-ID columns, catalog max_id + 1 from load_category_catalog
+    '''
+    def __init__(self, categories=0):
+        self.categories = categories
+        self.width = categories
+        #List of (ADOM, Profile Name), index is the matrix row
+        self.profiles = []
+        #(ADOM, Local CATEGORY-ID): column
+        self.local_columns = {}
+        #Row major cells, row i is cells[i * width:(i + 1) * width]
+        self.cells = array('b')
+
+    def __len__(self):
+        return len(self.profiles)
+
+    def ensure_width(self, width):
+        '''Grow the matrix to at least width columns, the existing rows take ACTION_NONE in the new columns'''
+        if width <= self.width:
+            return
+        cells = array('b')
+        pad = array('b', [ACTION_NONE]) * (width - self.width)
+        for index in range(len(self.profiles)):
+            cells.extend(self.row(index))
+            cells.extend(pad)
+        self.cells = cells
+        self.width = width
+
+    def add_local_categories(self, adom, local_cats):
+        '''Add a column for every ADOM Local Category not in the matrix yet, see get_local_categories'''
+        new_columns = [(adom, local_id) for local_id, local_desc in local_cats if (adom, local_id) not in self.local_columns]
+        for offset, key in enumerate(new_columns):
+            self.local_columns[key] = self.width + offset
+        self.ensure_width(self.width + len(new_columns))
+
+    def add_profile(self, adom, profile_name, actions, local_cats):
+        '''Add a Web Profile row
+        Arguments:
+        adom - Name of the ADOM of the Web Profile
+        profile_name - Web Profile Name
+        actions - Action array of the Web Profile indexed by CATEGORY-ID, from profile_actions
+        local_cats - ADOM Local Categories, from get_local_categories
+
+        Returns:
+        index - Row of the Web Profile in the matrix
+        '''
+        self.add_local_categories(adom, local_cats)
+        row = array('b', [ACTION_NONE]) * self.width
+        fortiguard = min(self.categories, len(actions))
+        row[:fortiguard] = actions[:fortiguard]
+        for local_id, local_desc in local_cats:
+            row[self.local_columns[(adom, local_id)]] = actions[local_id]
+        self.cells.extend(row)
+        self.profiles.append((adom, profile_name))
+        return len(self.profiles) - 1
+
+    def row(self, index):
+        '''Action array of one Web Profile, in matrix column order'''
+        return self.cells[index * self.width:(index + 1) * self.width]
+
+    def column(self, category):
+        '''Action of every Web Profile for one Category, in matrix row order
+        Arguments:
+        category - FortiGuard CATEGORY-ID or (ADOM, Local CATEGORY-ID)
+        '''
+        if isinstance(category, tuple):
+            index = self.local_columns.get(category)
+        else:
+            index = category if category < self.categories else None
+        if index is None:
+            return array('b', [ACTION_NONE]) * len(self.profiles)
+        return self.cells[index::self.width]
+
+    def profiles_with_action(self, category, actions):
+        '''Web Profiles that take one of the actions for a Category
+        Arguments:
+        category - FortiGuard CATEGORY-ID, ex: 26 Malicious Websites, or (ADOM, Local CATEGORY-ID)
+        actions - Action code or list of action codes, ex: ACTION_ALLOW or [ACTION_ALLOW, 2]
+
+        Returns:
+        profiles - list of (ADOM, Profile Name), in matrix row order
+        '''
+        if isinstance(actions, int):
+            actions = [actions]
+        #Search the column bytes for each action code, the scan runs in C instead of a Python loop over the rows
+        column = self.column(category).tobytes()
+        found = []
+        for action in set(actions):
+            code = array('b', [action]).tobytes()
+            index = column.find(code)
+            while index >= 0:
+                found.append(index)
+                index = column.find(code, index + 1)
+        return [self.profiles[index] for index in sorted(found)]
+
+    def action_counts(self, category):
+        '''Number of Web Profiles per action for a Category, dict of Action Name to count. Profiles of other ADOMs are not
+           counted for a Local Category
+        '''
+        column = self.column(category)
+        return dict((ACTION_NAMES.get(action, str(action)), column.count(action)) for action in set(column) if action != ACTION_NONE)
+
+class CategoryCSVWriter:
+    '''Streaming CSV/TSV writer, one row per (ADOM, Profile, Category) with its Action. Each Web Profile rows are written &
+       flushed as soon as the Profile is rendered, so memory stays the same for any number of Profiles & other tools can read
+       the file while the report is still running.
+    Arguments:
+    csv_file - Open file, opened with newline=''
+    delimiter - ',' for CSV or '\t' for TSV
+    '''
+    header = ["ADOM", "Profile", "Category Group", "Category ID", "Category", "Action"]
+
+    def __init__(self, csv_file, delimiter=','):
+        self.csv_file = csv_file
+        self.writer = csv.writer(csv_file, delimiter=delimiter)
+        self.writer.writerow(self.header)
+
+    def write_profile(self, adom, profile_name, layout, actions):
+        '''Write the rows of one Web Profile
+        Arguments:
+        adom - Name of the ADOM
+        profile_name - Web Profile Name
+        layout - Row layout from category_layout
+        actions - Action array from profile_actions
+        '''
+        group = ""
+        for name, cat_id in layout:
+            if cat_id is None:
+                group = name
+                continue
+            action = actions[cat_id]
+            self.writer.writerow([adom, profile_name, group, cat_id, name.strip(), ACTION_NAMES.get(action, str(action))])
+        self.csv_file.flush()
+
+def get_local_categories(fmg, adom):
+    '''FortiManager ADOM Web Filter Local Categories, fetched once per ADOM
+    Arguments:
+    fmg - Logged in FMGClient
+    adom - Name of the ADOM in FortiManager
+
+    Returns:
+    local_cats - list of (CATEGORY-ID, Description) of the ADOM Local Categories
+    '''
+    json_url = "pm/config/adom/" + adom + "/obj/webfilter/ftgd-local-cat"
+    http_code, json_resp = fmg.get(json_url)
+    local_cats = []
+    if json_resp['result'][0].get('data') != None:
+        for entry in json_resp['result'][0]['data']:
+            local_cats.append((int(entry['id']), entry['desc']))
+    return local_cats
+
+def fetch_webfilter_profiles(fmg, adom):
+    '''FortiManager ADOM Web Profiles & their FortiGuard Category filters. Only API calls, safe to run for several ADOMs in threads.
+    Arguments:
+    fmg - Logged in FMGClient
+    adom - Name of the ADOM in FortiManager
+
+    Returns:
+    local_cats - ADOM Local Categories, see get_local_categories
+    profiles - list of (Profile Name, ftgd-wf/filters data), empty if the ADOM has no Web Profiles
+    Raises FMGError if the ADOM does not exist
+    '''
+    #Get ADOM URL Profiles using the ADOM passed to Function. API URL
+    json_url = "pm/config/adom/" + adom + "/obj/webfilter/profile"
+    http_code, json_resp = fmg.get(json_url)
+    #Error Check then report if not found.
+    if json_resp['result'][0]['status']['code'] < 0:
+        raise FMGError(json_resp['result'][0]['status']['code'], json_resp['result'][0]['status']['message'], json_url)
+    if json_resp['result'][0].get('data') == None:
+        return [], []
+
+    ###Get the ADOM Local Categories once, the same list is used by every Web Profile table
+    local_cats = get_local_categories(fmg, adom)
+
+    ###Get each Web Profile FortiGuard Categories, batched as multi-params requests instead of one request per profile
+    with fmg.batch() as batch:
+        filter_results = []
+        for entry in json_resp['result'][0]['data']:
+            json_url = "pm/config/adom/" + adom + "/obj/webfilter/profile/" + entry['name'] + "/ftgd-wf/filters"
+            filter_results.append(batch.get(json_url))
+
+    profiles = [(entry['name'], filter_result.data) for entry, filter_result in zip(json_resp['result'][0]['data'], filter_results)]
+    return local_cats, profiles
+
+async def fetch_webfilter_profiles_async(afmg, adom):
+    '''asyncio fetch_webfilter_profiles, the Web Profiles & Local Categories in one multi-params request,
+       then the FortiGuard Category filters of every Web Profile in another
+    Arguments:
+    afmg - AsyncFMGClient
+    adom - Name of the ADOM in FortiManager
+
+    Returns:
+    local_cats, profiles - See fetch_webfilter_profiles. Raises FMGError if the ADOM does not exist
+    '''
+    json_url = "pm/config/adom/" + adom + "/obj/webfilter/profile"
+    profile_result, local_cat_result = await afmg.batch([('get', json_url, {}),
+                                                         ('get', "pm/config/adom/" + adom + "/obj/webfilter/ftgd-local-cat", {})])
+    #Error Check then report if not found.
+    if profile_result.code < 0:
+        raise FMGError(profile_result.code, profile_result.message, json_url)
+    if profile_result.data == None:
+        return [], []
+    local_cats = [(int(entry['id']), entry['desc']) for entry in local_cat_result.data or []]
+    filter_results = await afmg.batch([('get', json_url + "/" + entry['name'] + "/ftgd-wf/filters", {}) for entry in profile_result.data])
+    profiles = [(entry['name'], filter_result.data) for entry, filter_result in zip(profile_result.data, filter_results)]
+    return local_cats, profiles
+
+def write_webfilter_report(adom, local_cats, profiles, catalog, matrix, text_files, csv_writers, console=True):
+    '''Render each ADOM Web Profile table to Console & Text files & its rows to CSV, and add the Profile to the action matrix
+    Arguments:
+    adom - Name of the ADOM in FortiManager
+    local_cats, profiles - From fetch_webfilter_profiles
+    catalog - FortiGuard Category catalog from load_category_catalog
+    matrix - ActionMatrix to add the Web Profiles to
+    text_files - list of open Text files to print the tables to
+    csv_writers - list of CategoryCSVWriter to write the Category rows to
+    console - Print the tables to the Console
+    '''
+    ###Row layout of every Web Profile table: Local Categories first, then the FortiGuard Category groups
+    layout, layout_size = category_layout(catalog, local_cats)
+
+    #Create using PrettyTable the Report Tables, Columns
+    #Main loop to render each Web Filter Profile Local & FortiGuard Categories
+    for profile_name, filters in profiles:
+        ###Web Profile action of every CATEGORY-ID, added to the Web Profile x Category action matrix.
+        ###If a CATEGORY-ID has no filter entry, that means it is taking the default action "Allow". In FortiOS CLI (FortiGate) this is like when
+        ###you do not see it in the default "show config".
+        actions = profile_actions(filters, layout_size)
+        matrix.add_profile(adom, profile_name, actions, local_cats)
+
+        table = PrettyTable()
+        table.title = "Profile Name: " + profile_name
+
+        ###Create the Tables for Category to print, one row per Category in the precomputed row layout
+        table.field_names = ["Category", "Setting"]
+        table.align["Category"] = "l"
+        table.align["Setting"] = "l"
+        for row in profile_rows(layout, actions):
+            table.add_row(row)
 
-def get_webfiltercat(adom):
+        ###Print to Console
+        if console:
+            print('\n')
+            print(table)
+            print('\n')
+
+        ###Print to File
+        for outputFILE in text_files:
+            print(table, file = outputFILE)
+
+        ###CSV Format, one row per Category
+        for csv_writer in csv_writers:
+            csv_writer.write_profile(adom, profile_name, layout, actions)
+
+def get_webfiltercat(fmg, adom, catalog=None, matrix=None, delimiter=','):
     '''FortiManager ADOM Web Profile Local & FortiGuard Category Display via Console & CSV file
     Arguments:
+    fmg - Logged in FMGClient
     ADOM - Name of the ADOM in FortiManager you would like pull & generate console & CSV report file for.
+    catalog - Optional FortiGuard Category catalog from load_category_catalog, loaded from CATEGORY_CATALOG_FILE if not set
+    matrix - Optional ActionMatrix to add this ADOM Web Profiles to, shared across ADOMs in one run
+    delimiter - ',' writes a .csv file, '\t' writes a .tsv file
+
+    Returns:
+    matrix - ActionMatrix with this ADOM Web Profiles added
     '''
-    #Global Vars for function
-    #Actions - Webfilter Profile Action type Index to Text
-    actionWF = {'0': 'Block',  '2': 'Monitor', '3': 'Warning', '4': 'Authenicate'}
+    #FortiGuard Category groups, IDs & names
+    if catalog is None:
+        catalog = load_category_catalog()
+    if matrix is None:
+        matrix = ActionMatrix(catalog['max_id'] + 1)
     #Generate Timestamp for all output files
     timestr = time.strftime("%Y%m%d-%H%M%S")
 
-    #Create and open file to write for Debug & console output of report
     try:
-        fileNAMEOUTPUT = timestr + "_" + adom + "_" + "FMG_Web-Filter-Profile_Categories-DEBUG-CONSOLE-OUTPUT_LOG.txt"
-        outputFILECONSOLE = open(fileNAMEOUTPUT, "w")
-    except:
-        #Output error & exit
-        print("Unable to create DEBUG-OUTPUT file for Web Filter Profile Category, exiting...")
+        local_cats, profiles = fetch_webfilter_profiles(fmg, adom)
+    except FMGError as e:
+        print ('\nUnable to find ADOM: ' + adom + ". Please check ADOM exists. " + str(e))
         sys.exit(1)
 
-    #Get ADOM URL Profiles using the ADOM passed to Function. API URL
-    json_url = "pm/config/adom/" + adom + "/obj/webfilter/profile"
-    body = {
-    "id": 1,
-        "method": "get",
-        "params": [{
-           "url": json_url
-        }],
-        "session": session
-    }
-    r = requests.post(url, json=body, verify=False)
-    json_resp = json.loads(r.text)
-    #Error Check then report if not found.
-    if json_resp['result'][0]['status']['code'] == -6:
-        print ('\nUnable to find ADOM: ' + adom + ". Please check ADOM exists. Debug file created.", file = outputFILECONSOLE )
-        outputFILECONSOLE.close()
-        sys.exit(1)
-
-    if json_resp['result'][0]['data'] != None:
+    if profiles:
         #Print to file TXT & CSV
         try:
             fileNAME = timestr + "_ADOM_" + adom + "_Web-Filter-Profile_Categories.txt"
-            fileNAMECSV = timestr + "_ADOM_" + adom + "_Web-Filter-Profile_Categories.csv"
+            fileNAMECSV = timestr + "_ADOM_" + adom + "_Web-Filter-Profile_Categories" + csv_extension(delimiter)
             outputFILE = open(fileNAME, 'w')
-            outputFILECSV = open(fileNAMECSV, 'w')
+            outputFILECSV = open(fileNAMECSV, 'w', newline='')
         except:
             #Output error & exit
             print("Unable to create Text & CSV output files for Web Filter Profile Category, exiting...")
             sys.exit(1)
 
-        #Create using PrettyTable the Report Tables, Columns
-        #Main loop to pull each Web Filter Profile Local & FortiGuard Categories
-        for entry in json_resp['result'][0]['data']:
-            table = PrettyTable()
-            table.title = "Profile Name: " + entry['name']
-            print ("Profile Name: " + entry['name'], file = outputFILECONSOLE)
-            
-            ###Get each Web Profile FortiGuard Categories
-            json_url = "pm/config/adom/" + adom + "/obj/webfilter/profile/" + entry['name'] + "/ftgd-wf/filters"
-            body = {
-            "id": 1,
-                "method": "get",
-                "params": [{
-                    "url": json_url
-                }],
-                "session": session
-            }
-            r = requests.post(url, json=body, verify=False)
-            json_resp = json.loads(r.text)
-            #Print to DEBUG-OUTPUT file raw JSON
-            print (json.dumps(json_resp, indent=2), file = outputFILECONSOLE)
-
-            
-            ###Get each FortiGuard Category & it's associated action. Put it into a key pair CATEGORY-ID:ACTION
-            cataction = {}
-            for cats in json_resp['result'][0]['data']:
-                cataction[str(cats['category']).strip('[\']')] = cats['action']
-            #print(cataction)
-
-            ###Create the Tables for Category to print
-            table.field_names = ["Category", "Setting"]
-            table.align["Category"] = "l"
-            table.align["Setting"] = "l"
-
-            ###Find Local Categories
-            table.add_row(["Local Categories", ""])
-
-            json_url = "pm/config/adom/" + adom + "/obj/webfilter/ftgd-local-cat"
-            body = {
-                "id": 1,
-                "method": "get",
-                "params": [{
-                   "url": json_url
-                }],
-                "session": session
-            }
-            r = requests.post(url, json=body, verify=False)
-            json_resp = json.loads(r.text)
-            #Print to DEBUG-OUTPUT file raw JSON
-            print (json.dumps(json_resp, indent=2), file = outputFILECONSOLE)
-            if json_resp['result'][0]['data'] != None:
-                for entry in json_resp['result'][0]['data']:
-                    ##Enable below coments if you want to see the raw results, the ID & the Category Name
-                    #print('---id: %s', entry['id'])
-                    #print('---name: %s', actionWF[str(cataction[str(entry['id'])])])
-                    if str(entry['id']) in cataction:
-                        table.add_row(["    " + entry['desc'], actionWF[str(cataction[str(entry['id'])])]])
-                    else:
-                        table.add_row(["    " + entry['desc'], "Allow"])
-
-            ##Here we start to take each cataction IP and Mapp it to the Human Readable Name. 
-            ##We do not need a loop as cataction is a list with CATEGORY-ID:ACTION, so we can use Python 'in' that will search the List to find it.
-            ##If that CATEGORY-ID does not exist, that means it is taking the default action "Allow". In FortiOS CLI (FortiGate) this is like when
-            ##you do not see it in the default "show config".
-
-            #Potentially Liable Section & all subsections
-            table.add_row(["Potentially Liable", ""])
-            if '83' in cataction:
-                table.add_row(["    Child Abuse", actionWF[str(cataction['83'])]])
-            else:
-                table.add_row(["    Child Abuse", "Allow"])
-            if '5' in cataction:
-                table.add_row(["    Discrimination", actionWF[str(cataction['5'])]])
-            else:
-                table.add_row(["    Discrimination", "Allow"])
-            if '1' in cataction:
-                table.add_row(["    Drug Abuse", actionWF[str(cataction['1'])]])
-            else:
-                table.add_row(["    Drug Abuse", "Allow"])
-            if '6' in cataction:
-                table.add_row(["    Explicit Violence", actionWF[str(cataction['6'])]])
-            else:
-               table.add_row(["    Explicit Violence", "Allow"])   
-            if '12' in cataction:
-                table.add_row(["    Extremist Groups", actionWF[str(cataction['12'])]])
-            else:
-                table.add_row(["    Extremist Groups", "Allow"])   
-            if '3' in cataction:
-                table.add_row(["    Hacking", actionWF[str(cataction['3'])]])
-            else:
-                table.add_row(["    Hacking", "Allow"])   
-            if '4' in cataction:
-                table.add_row(["    Illegal or Unethical", actionWF[str(cataction['4'])]])
-            else:
-                table.add_row(["    Illegal or Unethical", "Allow"])   
-            if '62' in cataction:
-                table.add_row(["    Plagiarim", actionWF[str(cataction['62'])]])
-            else:
-                table.add_row(["    Plagiarim", "Allow"])   
-            if '59' in cataction:
-                table.add_row(["    Proxy Avoidance", actionWF[str(cataction['59'])]])
-            else:
-                table.add_row(["    Proxy Avoidance", "Allow"])
-  
-            #Adult/Mature Content Section & all the subsections
-            table.add_row(["Adult/Mature Content", ""])
-            if '7' in cataction:
-                table.add_row(["    Abortion", actionWF[str(cataction['7'])]])
-            else:
-                table.add_row(["    Aboration", "Allow"])
-            if '9' in cataction:
-                table.add_row(["    Advocacy Organization", actionWF[str(cataction['9'])]])
-            else:
-                table.add_row(["    Advocacy Organization", "Allow"])
-            if '64' in cataction:
-                table.add_row(["    Alcohol", actionWF[str(cataction['64'])]])
-            else:
-                table.add_row(["    Alcohol", "Allow"])
-            if '2' in cataction:
-                table.add_row(["    Alternative Beliefs", actionWF[str(cataction['2'])]])
-            else:
-                table.add_row(["    Alternative Beliefs", "Allow"])
-            if '15' in cataction:
-                table.add_row(["    Dating",actionWF[str(cataction['15'])]])
-            else:
-                table.add_row(["    Dating", "Allow"])
-            if '11' in cataction:
-                table.add_row(["    Gambling", actionWF[str(cataction['11'])]])
-            else:
-                table.add_row(["    Gambling", "Allow"])
-            if '66' in cataction:
-                table.add_row(["    Lingerie and Swimsuit", actionWF[str(cataction['66'])]])
-            else:
-                table.add_row(["    Lingerie and Swimsuit", "Allow"])
-            if '57' in cataction:
-                table.add_row(["    Marijuana", actionWF[str(cataction['57'])]])
-            else:
-                table.add_row(["    Marijuana", "Allow"])
-            if '13' in cataction:
-                table.add_row(["    Nudity and Risque", actionWF[str(cataction['13'])]])
-            else:
-                table.add_row(["    Nudity and Risque", "Allow"])
-            if '8' in cataction:
-                table.add_row(["    Other Adult Materials", actionWF[str(cataction['8'])]])
-            else:
-                table.add_row(["    Other Adult Materials", "Allow"])
-            if '14' in cataction:
-                table.add_row(["    Pornography", actionWF[str(cataction['14'])]])
-            else:
-                table.add_row(["    Pornography", "Allow"])
-            if '63' in cataction:
-                table.add_row(["    Sex Education", actionWF[str(cataction['63'])]])
-            else:
-                table.add_row(["    Sex Education", "Allow"])
-            if '67' in cataction:
-                table.add_row(["    Sports Hunting and War Games", actionWF[str(cataction['67'])]])
-            else:
-                table.add_row(["    Sports Hunting and War Game", "Allow"])
-            if '65' in cataction:
-                table.add_row(["    Tobacco", actionWF[str(cataction['65'])]])
-            else:
-                table.add_row(["    Tobacco", "Allow"])
-            if '16' in cataction:
-                table.add_row(["    Weapons Sales", actionWF[str(cataction['16'])]])
-            else:
-                table.add_row(["    Weapons Sales", "Allow"])
-
-            #Bandwidth Consuming Section & all the subsections
-            table.add_row(["Bandwidth Consuming", ""])
-            if '24' in cataction:
-                table.add_row(["    File Sharing and Storage", actionWF[str(cataction['24'])]])
-            else:
-                table.add_row(["    File Sharing and Storage", "Allow"])
-            if '19' in cataction:
-                table.add_row(["    Freeware and Software Downloads", actionWF[str(cataction['19'])]])
-            else:
-                table.add_row(["    Freeware and Software Downloads", "Allow"])
-            if '75' in cataction:
-                table.add_row(["    Internet Radio and TV", actionWF[str(cataction['75'])]])
-            else:
-                table.add_row(["    Internet Radio and TV", "Allow"])
-            if '76' in cataction:
-                table.add_row(["    Internet Telephony", actionWF[str(cataction['76'])]])
-            else:
-                table.add_row(["    Internet Telephony", "Allow"])
-            if '72' in cataction:
-                table.add_row(["    Peer to Peer File Sharing",actionWF[str(cataction['72'])]])
-            else:
-                table.add_row(["    Peer to Peer File Sharing", "Allow"])
-            if '25' in cataction:
-                table.add_row(["    Streaming Media and Download", actionWF[str(cataction['25'])]])
-            else:           
-                table.add_row(["    Streaming Media and Download", "Allow"])
-
-            #Security Risks Section & all the subsections
-            table.add_row(["Security Risks", ""])
-            if '88' in cataction:
-                table.add_row(["    Dynamic DNS", actionWF[str(cataction['88'])]])
-            else:
-                table.add_row(["    Dynamic DNS", "Allow"])
-            if '26' in cataction:
-                table.add_row(["    Malicious Websites", actionWF[str(cataction['26'])]])
-            else:
-                table.add_row(["    Malicious Websites", "Allow"])
-            if '90' in cataction:
-                table.add_row(["    Newly Observed Domain", actionWF[str(cataction['90'])]])
-            else:
-                table.add_row(["    Newly Observed Domain", "Allow"])
-            if '91' in cataction:
-                table.add_row(["    Newly Registered Domain", actionWF[str(cataction['91'])]])
-            else:
-                table.add_row(["    Newly Registered Domain", "Allow"])
-            if '61' in cataction:
-                table.add_row(["    Phishing", actionWF[str(cataction['61'])]])
-            else:
-                table.add_row(["    Phishing", "Allow"])
-            if '86' in cataction:
-                table.add_row(["    Spam URLs", actionWF[str(cataction['86'])]])
-            else:           
-                table.add_row(["    Spam URLs", "Allow"])
-
-            #General Interest - Personal Section & all the subsections
-            table.add_row(["General Interest - Personal", ""])
-            if '17' in cataction:
-                table.add_row(["    Advertising", actionWF[str(cataction['17'])]])
-            else:
-                table.add_row(["    Advertising", "Allow"])
-            if '29' in cataction:
-                table.add_row(["    Arts and Culture", actionWF[str(cataction['29'])]])
-            else:
-                table.add_row(["    Arts and Culture", "Allow"])
-            if '89' in cataction:
-                table.add_row(["    Auction", actionWF[str(cataction['89'])]])
-            else:
-                table.add_row(["    Auction", "Allow"])
-            if '18' in cataction:
-                table.add_row(["    Brokerage and Trading", actionWF[str(cataction['18'])]])
-            else:
-                table.add_row(["    Brokerage and Trading", "Allow"])
-            if '77' in cataction:
-                table.add_row(["    Child Education",actionWF[str(cataction['77'])]])
-            else:
-                table.add_row(["    Child Education", "Allow"])
-            if '82' in cataction:
-                table.add_row(["    Content Servers", actionWF[str(cataction['82'])]])
-            else:
-                table.add_row(["    Content Servers", "Allow"])
-            if '71' in cataction:
-                table.add_row(["    Digital Post Cards", actionWF[str(cataction['71'])]])
-            else:
-                table.add_row(["    Digital Post Cards", "Allow"])
-            if '85' in cataction:
-                table.add_row(["    Domain Parking", actionWF[str(cataction['85'])]])
-            else:
-                table.add_row(["    Domain Parking", "Allow"])
-            if '54' in cataction:
-                table.add_row(["    Dynamic Content", actionWF[str(cataction['54'])]])
-            else:
-                table.add_row(["    Dynamic Content", "Allow"])
-            if '30' in cataction:
-                table.add_row(["    Education", actionWF[str(cataction['30'])]])
-            else:
-                table.add_row(["    Education", "Allow"])
-            if '28' in cataction:
-                table.add_row(["    Entertainment", actionWF[str(cataction['28'])]])
-            else:
-                table.add_row(["    Entertainment", "Allow"])
-            if '58' in cataction:
-                table.add_row(["    Folklore", actionWF[str(cataction['58'])]])
-            else:
-                table.add_row(["    Folklore", "Allow"])
-            if '20' in cataction:
-                table.add_row(["    Games", actionWF[str(cataction['20'])]])
-            else:
-                table.add_row(["    Games", "Allow"])
-            if '40' in cataction:
-                table.add_row(["    Global Religion", actionWF[str(cataction['40'])]])
-            else:
-                table.add_row(["    Global Religion", "Allow"])
-            if '33' in cataction:
-                table.add_row(["    Health and Wellness", actionWF[str(cataction['33'])]])
-            else:
-                table.add_row(["    Health and Wellness", "Allow"])
-            if '69' in cataction:
-                table.add_row(["    Instant Messaging", actionWF[str(cataction['69'])]])
-            else:
-                table.add_row(["    Instant Messaging", "Allow"])
-            if '34' in cataction:
-                table.add_row(["    Job Search", actionWF[str(cataction['34'])]])
-            else:
-                table.add_row(["    Job Search", "Allow"])
-            if '55' in cataction:
-                table.add_row(["    Meaningless Content", actionWF[str(cataction['55'])]])
-            else:
-                table.add_row(["    Meaningless Content", "Allow"])
-            if '35' in cataction:
-                table.add_row(["    Medicine", actionWF[str(cataction['35'])]])
-            else:
-                table.add_row(["    Medicine", "Allow"])
-            if '36' in cataction:
-                table.add_row(["    News and Media", actionWF[str(cataction['36'])]])
-            else:
-                table.add_row(["    News and Media", "Allow"])
-            if '70' in cataction:
-                table.add_row(["    Newsgroups and Message Boards", actionWF[str(cataction['70'])]])
-            else:
-                table.add_row(["    Newsgroups and Message Boards", "Allow"])
-            if '87' in cataction:
-                table.add_row(["    Personal Privacy", actionWF[str(cataction['87'])]])
-            else:
-                table.add_row(["    Personal Privacy", "Allow"])
-            if '48' in cataction:
-                table.add_row(["    Personal Vehicles", actionWF[str(cataction['48'])]])
-            else:
-                table.add_row(["    Personal Vehicles", "Allow"])
-            if '80' in cataction:
-                table.add_row(["    Personal Websites and Blogs", actionWF[str(cataction['80'])]])
-            else:
-                table.add_row(["    Personal Websites and Blogs", "Allow"])
-            if '38' in cataction:
-                table.add_row(["    Political Organizations", actionWF[str(cataction['38'])]])
-            else:
-                table.add_row(["    Political Organizations", "Allow"])
-            if '78' in cataction:
-                table.add_row(["    Real Estate", actionWF[str(cataction['78'])]])
-            else:
-                table.add_row(["    Real Estate", "Allow"])
-            if '39' in cataction:
-                table.add_row(["    Reference", actionWF[str(cataction['39'])]])
-            else:
-                table.add_row(["    Reference", "Allow"])
-            if '79' in cataction:
-                table.add_row(["    Restaurant and Dining", actionWF[str(cataction['79'])]])
-            else:
-                table.add_row(["    Restaurant and Dining", "Allow"])
-            if '42' in cataction:
-                table.add_row(["    Shopping", actionWF[str(cataction['42'])]])
-            else:
-                table.add_row(["    Shopping", "Allow"])
-            if '37' in cataction:
-                table.add_row(["    Social Networking", actionWF[str(cataction['37'])]])
-            else:
-                table.add_row(["    Social Networking", "Allow"])
-            if '44' in cataction:
-                table.add_row(["    Society and Lifestyles", actionWF[str(cataction['44'])]])
-            else:
-                table.add_row(["    Society and Lifestyles", "Allow"])
-            if '46' in cataction:
-                table.add_row(["    Sports", actionWF[str(cataction['46'])]])
-            else:
-                table.add_row(["    Sports", "Allow"])
-            if '47' in cataction:
-                table.add_row(["    Travel", actionWF[str(cataction['47'])]])
-            else:
-                table.add_row(["    Travel", "Allow"])
-            if '68' in cataction:
-                table.add_row(["    Web Chat", actionWF[str(cataction['68'])]])
-            else:
-                table.add_row(["    Web Chat", "Allow"])
-            if '23' in cataction:
-                table.add_row(["    Web-based Email", actionWF[str(cataction['23'])]])
-            else:
-                table.add_row(["    Web-based Email", "Allow"])
-
-            #General Interest - Business Section & all the subsections
-            table.add_row(["General Interest - Business", ""])
-            if '53' in cataction:
-                table.add_row(["    Armed Forces", actionWF[str(cataction['53'])]])
-            else:
-                table.add_row(["    Armed Forces", "Allow"])
-            if '49' in cataction:
-                table.add_row(["    Business", actionWF[str(cataction['49'])]])
-            else:
-                table.add_row(["    Business", "Allow"])
-            if '92' in cataction:
-                table.add_row(["    Charitable Organizations", actionWF[str(cataction['92'])]])
-            else:
-                table.add_row(["    Charitable Organizations", "Allow"])
-            if '31' in cataction:
-                table.add_row(["    Finance and Banking", actionWF[str(cataction['31'])]])
-            else:
-                table.add_row(["    Finance and Banking", "Allow"])
-            if '43' in cataction:
-                table.add_row(["    General Organizations",actionWF[str(cataction['43'])]])
-            else:
-                table.add_row(["    General Organizations", "Allow"])
-            if '51' in cataction:
-                table.add_row(["    Government and Legal Organizations", actionWF[str(cataction['51'])]])
-            else:
-                table.add_row(["    Government and Legal Organizations", "Allow"])
-            if '52' in cataction:
-                table.add_row(["    Information Technology", actionWF[str(cataction['52'])]])
-            else:
-                table.add_row(["    Information Technology", "Allow"])
-            if '50' in cataction:
-                table.add_row(["    Information and Computer Security", actionWF[str(cataction['50'])]])
-            else:
-                table.add_row(["    Information and Computer Security", "Allow"])
-            if '95' in cataction:
-                table.add_row(["    Online Meetings", actionWF[str(cataction['95'])]])
-            else:
-                table.add_row(["    Online Meetings", "Allow"])
-            if '93' in cataction:
-                table.add_row(["    Remote Access", actionWF[str(cataction['93'])]])
-            else:
-                table.add_row(["    Remote Access", "Allow"])
-            if '41' in cataction:
-                table.add_row(["    Search Engines and Portals", actionWF[str(cataction['41'])]])
-            else:
-                table.add_row(["    Search Engines and Portals", "Allow"])
-            if '81' in cataction:
-                table.add_row(["    Secure Websites", actionWF[str(cataction['81'])]])
-            else:
-                table.add_row(["    Secure Websites", "Allow"])
-            if '94' in cataction:
-                table.add_row(["    Web Analytics", actionWF[str(cataction['94'])]])
-            else:
-                table.add_row(["    Web Analytics", "Allow"])
-            if '56' in cataction:
-                table.add_row(["    Web Hosting", actionWF[str(cataction['56'])]])
-            else:
-                table.add_row(["    Web Hosting", "Allow"])
-            if '84' in cataction:
-                table.add_row(["    Web-based Applications", actionWF[str(cataction['84'])]])
-            else:
-                table.add_row(["    Web-based Applications", "Allow"])
-
-            #Unrated Section & all the subsections
-            table.add_row(["Unrated", ""])
-            if '1' in cataction:
-                table.add_row(["    Unrated", actionWF[str(cataction['1'])]])
-            else:
-                table.add_row(["    Unrated", "Allow"])
+        try:
+            write_webfilter_report(adom, local_cats, profiles, catalog, matrix, [outputFILE], [CategoryCSVWriter(outputFILECSV, delimiter)])
+        finally:
+            ##Close Text & CSV file
+            outputFILE.close()
+            outputFILECSV.close()
+    return matrix
 
-            print('\n')
-            ###Print to Console
-            print(table)
+def csv_extension(delimiter):
+    '''File extension for the CSV writer delimiter'''
+    return ".tsv" if delimiter == '\t' else ".csv"
 
-            ###Print to File
-            print(table, file = outputFILE)
-            print('\n')
+def list_adoms(fmg):
+    '''All ADOM names in the FortiManager, for the "all" ADOMs report mode'''
+    http_code, json_resp = fmg.get("dvmdb/adom", fields=["name"])
+    return [entry['name'] for entry in json_resp['result'][0].get('data') or []]
 
+def get_webfiltercat_adoms(fmg, adoms, workers=8, catalog=None, delimiter=','):
+    '''FortiManager Web Profile Local & FortiGuard Category report for many ADOMs, non interactive.
+       The ADOMs Web Profiles & filter lists are fetched concurrently with AsyncFMGClient over the pooled FortiManager connection.
+       Each ADOM is written to one combined Text & CSV report plus per ADOM Text & CSV files as soon as it & the ADOMs before it
+       are fetched, then released, so only about 2 x workers ADOMs are held in memory. The report keeps the ADOM order given.
+    Arguments:
+    fmg - Logged in FMGClient, create it with pool_maxsize=workers so each request in flight has its own connection
+    adoms - list of ADOM names
+    workers - Number of requests in flight at the same time
+    catalog - Optional FortiGuard Category catalog from load_category_catalog
+    delimiter - ',' writes .csv files, '\t' writes .tsv files
 
-            ###CSV Format
-            table.vertical_char = ','
-            table.junction_char = ','
-            #table.hortizontal_char = ''
-            print(table, file = outputFILECSV)
-        
-            #Print Profile Report Cats
-            #Local Cats
-            #FortiGuard Cats
-    
-    ##Close Text & CSV file
-    outputFILE.close()
-    outputFILECSV.close()
+    Returns:
+    matrix - ActionMatrix with the Web Profiles of every ADOM
+    '''
+    if catalog is None:
+        catalog = load_category_catalog()
+    matrix = ActionMatrix(catalog['max_id'] + 1)
+    #Generate Timestamp for all output files
+    timestr = time.strftime("%Y%m%d-%H%M%S")
+
+    try:
+        allFILE = open(timestr + "_ALL-ADOMS_Web-Filter-Profile_Categories.txt", 'w')
+        allFILECSV = open(timestr + "_ALL-ADOMS_Web-Filter-Profile_Categories" + csv_extension(delimiter), 'w', newline='')
+    except OSError:
+        #Output error & exit
+        print("Unable to create Text & CSV output files for Web Filter Profile Category, exiting...")
+        sys.exit(1)
+
+    try:
+        all_writer = CategoryCSVWriter(allFILECSV, delimiter)
+
+        def write_adom(adom, local_cats, profiles):
+            if not profiles:
+                print('--> ADOM %s has no Web Profiles, skipping...' % adom)
+                return
+            print('--> ADOM %s: %d Web Profiles' % (adom, len(profiles)))
+            with open(timestr + "_ADOM_" + adom + "_Web-Filter-Profile_Categories.txt", 'w') as outputFILE, \
+                 open(timestr + "_ADOM_" + adom + "_Web-Filter-Profile_Categories" + csv_extension(delimiter), 'w', newline='') as outputFILECSV:
+                print("ADOM: " + adom, file = allFILE)
+                write_webfilter_report(adom, local_cats, profiles, catalog, matrix,
+                                       [outputFILE, allFILE], [CategoryCSVWriter(outputFILECSV, delimiter), all_writer], console=False)
+
+        async def write_next(pending):
+            adom, task = pending.popleft()
+            try:
+                local_cats, profiles = await task
+            except (FMGError, requests.exceptions.RequestException) as e:
+                print('<-- Unable to pull Web Profiles for ADOM %s, skipping... %s' % (adom, e))
+                return
+            write_adom(adom, local_cats, profiles)
+
+        async def fetch_adoms():
+            #No per request timeout, same as the interactive report
+            async with AsyncFMGClient(fmg=fmg, concurrency=workers, timeout=None) as afmg:
+                #ADOMs are written & released in order as soon as they are fetched. At most window ADOMs are fetched ahead of
+                #the next one to write, the reorder buffer of the combined report
+                window = 2 * max(1, workers)
+                pending = deque()
+                try:
+                    for adom in adoms:
+                        pending.append((adom, asyncio.ensure_future(fetch_webfilter_profiles_async(afmg, adom))))
+                        if len(pending) >= window:
+                            await write_next(pending)
+                    while pending:
+                        await write_next(pending)
+                finally:
+                    for adom, task in pending:
+                        task.cancel()
+
+        asyncio.run(fetch_adoms())
+    finally:
+        ##Close combined Text & CSV file, also when an ADOM failed
+        allFILE.close()
+        allFILECSV.close()
+    return matrix
 
 def main():
     ''' The main function/program '''
+    ## Command line options for the non interactive multi ADOM report, no options keeps the interactive prompts
+    parser = argparse.ArgumentParser(description='FortiManager Web Filter Profile Local & FortiGuard Category report')
+    parser.add_argument('--host', help='FortiManager IP Address, ex: 1.1.1.1 or 1.1.1.1:8080')
+    parser.add_argument('--user', help='FortiManager API User name, password is read from FMG_PASSWD or prompted')
+    parser.add_argument('--adoms', help='Comma separated ADOM names, or "all" for every ADOM in the FortiManager')
+    parser.add_argument('--workers', type=int, default=8, help='Number of API requests in flight at the same time (default 8)')
+    parser.add_argument('--tsv', action='store_true', help='Write Tab separated .tsv files instead of .csv')
+    parser.add_argument('--debug', action='store_true', help='Write every raw API response to a DEBUG-CONSOLE-OUTPUT file, off by default')
+    parser.add_argument('--debug-max-bytes', type=int, default=10485760, help='Rotate & gzip the debug file at this size (default 10MB)')
+    args = parser.parse_args()
+
     ## User Input Section ##
     # Prompt for IP Address of FortiManager
-    print('Please Enter FortiManager IP Address:')
-    hostIP = input()
+    hostIP = args.host
+    if not hostIP:
+        print('Please Enter FortiManager IP Address:')
+        hostIP = input()
     #Check User put in data
     while not hostIP:
         print('Error, Please Enter FortiManager IP Address:')
         hostIP = input()
     
     # Prompt for API User Name
-    print('Please Enter FortiManager API User name:')
-    hostAPIUSER = input()
+    hostAPIUSER = args.user
+    if not hostAPIUSER:
+        print('Please Enter FortiManager API User name:')
+        hostAPIUSER = input()
     #Check User put in data
     while not hostAPIUSER:
         print('Error, Please Enter FortiManager API User name:')
         hostAPIUSER = input()
     
     # Prompt for API User password. use getpass() module to hide it being displayed
-    hostPASSWD = getpass.getpass('Please Enter FortiManager API User password:')
+    hostPASSWD = os.environ.get('FMG_PASSWD')
+    if not hostPASSWD:
+        hostPASSWD = getpass.getpass('Please Enter FortiManager API User password:')
     #Check User put in data
     while not hostPASSWD:
         hostPASSWD = getpass.getpass('Error, Please Enter FortiManager API User password:')
 
     # Prompt for ADOM Name
-    print('Please Enter ADOM name as seen in FortiManager:')
-    ADOMname = input()
+    ADOMname = args.adoms
+    if not ADOMname:
+        print('Please Enter ADOM name as seen in FortiManager:')
+        ADOMname = input()
     #Check User put in data
     while not ADOMname:
         print('Error, Please Enter ADOM name as seen in FortiManager:')
         ADOMname = input()   
     ## End User Input Section ##
 
-    ## Call fmg_login Function
-    fmg_login(hostAPIUSER, hostPASSWD, hostIP)
+    ## Debug output of the raw API responses, nothing is serialized or written without --debug
+    debug_sink = None
+    if args.debug:
+        debug_sink = DebugSink(time.strftime("%Y%m%d-%H%M%S") + "_FMG_Web-Filter-Profile_Categories-DEBUG-CONSOLE-OUTPUT_LOG.txt",
+                               level=DEBUG, max_bytes=args.debug_max_bytes)
+
+    ## Login to FortiManager, one pooled connection per worker
+    fmg = FMGClient(hostIP, pool_maxsize=args.workers, debug_sink=debug_sink)
+    fmg.login(hostAPIUSER, hostPASSWD)
+    delimiter = '\t' if args.tsv else ','
+
+    if args.adoms:
+        ## Multi ADOM report, combined & per ADOM Text & CSV of Web Profiles
+        if args.adoms.lower() == 'all':
+            adoms = list_adoms(fmg)
+        else:
+            adoms = [adom.strip() for adom in args.adoms.split(',') if adom.strip()]
+        matrix = get_webfiltercat_adoms(fmg, adoms, args.workers, delimiter=delimiter)
+    else:
+        ## Call & pass ADOM name to our get_webfiltercat function to output Text & CSV of Web Profiles
+        matrix = get_webfiltercat(fmg, ADOMname, delimiter=delimiter)
 
-    ## Call & pass ADOM name to our get_webfiltercat function to output Text & CSV of Web Profiles
-    get_webfiltercat(ADOMname)
+    ## Web Profiles that Allow Malicious Websites (Category 26), answered from the Profile x Category action matrix
+    for adom_name, profile_name in matrix.profiles_with_action(26, ACTION_ALLOW):
+        print('--> WARNING: ADOM %s Web Profile %s allows Malicious Websites' % (adom_name, profile_name))
 
-    ## Call fmg_logout Function
-    fmg_logout(hostIP)
+    ## Logout of FortiManager
+    fmg.logout()
+    if debug_sink is not None:
+        debug_sink.close()
 
     ''' End main function/program '''
 